@@ -0,0 +1,264 @@
+"""
+A stand-in for `minium.Minium` with configurable latency and payload sizes.
+
+Only the parts of the minium API used by `session.py` and `commands.py` are
+implemented. Every call sleeps for the configured latency of its method, so
+the benchmark measures the servers' own overhead on top of a predictable
+devtools.
+"""
+import copy
+import json
+import time
+import zlib
+import random
+import struct
+import itertools
+from dataclasses import dataclass, field
+
+
+@dataclass
+class FakeConfig:
+    # 方法名 -> 模拟耗时（秒），未列出的方法使用 default_latency
+    latency: dict[str, float] = field(default_factory=dict)
+    default_latency: float = 0.005
+    # 页面 wxml 的节点数、data 中列表的长度、截图的近似字节数
+    wxml_nodes: int = 200
+    data_items: int = 100
+    screenshot_bytes: int = 200_000
+    pages: tuple[str, ...] = ("pages/index/index", "pages/list/list", "pages/detail/detail")
+    seed: int = 0
+
+    def delay(self, method: str) -> None:
+        seconds = self.latency.get(method, self.default_latency)
+        if seconds:
+            time.sleep(seconds)
+
+
+class Message(dict):
+    """Event payload with attribute access, like minium's DevToolMessage."""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def make_png(size: int, seed: int) -> bytes:
+    """A valid grayscale PNG of roughly `size` bytes with random pixels."""
+    rng = random.Random(seed)
+    width = 256
+    height = max(1, size // (width + 1))
+    rows = b"".join(b"\x00" + rng.randbytes(width) for _ in range(height))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows, 1)) + chunk(b"IEND", b"")
+
+
+def make_wxml(nodes: int, page_id: int, revision: int) -> str:
+    items = "".join(
+        f'<view class="item" data-index="{index}" bindtap="onTap">'
+        f'<text class="title">Item {index} rev {revision if index == 0 else 0}</text></view>'
+        for index in range(max(nodes - 2, 0) // 2)
+    )
+    markup = f'<page><view id="root-{page_id}" class="container">{items}</view></page>'
+    return markup + ".container{display:flex}.item{padding:8px}.title{font-size:14px}"
+
+
+class FakeElement:
+
+    def __init__(self, config: FakeConfig, selector: str):
+        self.config = config
+        self.selector = selector
+
+    def tap(self):
+        self.config.delay("tap")
+
+    def long_press(self):
+        self.config.delay("long_press")
+
+    def move(self, left, top):
+        self.config.delay("move")
+
+    def input(self, text):
+        self.config.delay("input")
+
+    def switch(self):
+        self.config.delay("switch")
+
+    def slide_to(self, value):
+        self.config.delay("slide_to")
+
+    def pick(self, option):
+        self.config.delay("pick")
+
+    @property
+    def size(self):
+        self.config.delay("size")
+        return {"width": 375, "height": 48}
+
+    @property
+    def inner_text(self):
+        self.config.delay("inner_text")
+        return f"Text of {self.selector}"
+
+    def styles(self, names):
+        self.config.delay("styles")
+        return ["block" if name == "display" else "visible" for name in names]
+
+
+class FakePage:
+
+    def __init__(self, config: FakeConfig, page_id: int, path: str, query: dict | None = None):
+        self.config = config
+        self.page_id = page_id
+        self.path = path
+        self.query = query or {}
+        self.revision = 0
+        self._data = {
+            "title": path,
+            "list": [{"id": index, "name": f"item {index}", "tags": ["a", "b"]} for index in range(config.data_items)],
+        }
+
+    @property
+    def data(self):
+        self.config.delay("data")
+        return copy.deepcopy(self._data)
+
+    @data.setter
+    def data(self, value):
+        self.config.delay("set_data")
+        self._data.update(value)
+        self.revision += 1
+
+    @property
+    def wxml(self):
+        self.config.delay("wxml")
+        return make_wxml(self.config.wxml_nodes, self.page_id, self.revision)
+
+    def get_element(self, selector):
+        self.config.delay("get_element")
+        return FakeElement(self.config, selector)
+
+    def get_elements(self, selector, max_timeout=0, text_contains=None):
+        self.config.delay("get_elements")
+        element = FakeElement(self.config, selector)
+        if text_contains is not None and text_contains not in element.inner_text:
+            return []
+        return [element]
+
+    def call_method(self, method, params):
+        self.config.delay("call_method")
+        return {"method": method, "params": params}
+
+    def scroll_to(self, top, duration):
+        self.config.delay("scroll_to")
+
+
+class FakeApp:
+    platform = "ide"
+
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self.observers: dict[str, list] = {}
+        self._ids = itertools.count(1)
+        self._screens = [make_png(config.screenshot_bytes, config.seed + index) for index in range(4)]
+        self._shots = itertools.cycle(self._screens)
+        self.stack = [self._new_page(config.pages[0])]
+
+    def _new_page(self, path: str, query: dict | None = None) -> FakePage:
+        return FakePage(self.config, next(self._ids), path.lstrip("/"), query)
+
+    def _route(self, page: FakePage, open_type: str) -> FakePage:
+        message = Message(args=[{"webviewId": page.page_id, "path": page.path, "query": page.query, "openType": open_type}])
+        for callback in self.observers.get("onAppRouteDone", ()):
+            callback(message)
+        for callback in self.observers.get("App.logAdded", ()):
+            callback(Message(type="log", args=[f"route {open_type} {page.path}"]))
+        return page
+
+    def enable_log(self):
+        self.config.delay("enable_log")
+
+    def add_observer(self, event, callback):
+        self.observers.setdefault(event, []).append(callback)
+
+    def screen_shot(self, path=None):
+        self.config.delay("screen_shot")
+        raw = next(self._shots)
+        if path:
+            with open(path, "wb") as file:
+                file.write(raw)
+        return raw
+
+    def get_all_pages_path(self):
+        self.config.delay("get_all_pages_path")
+        return list(self.config.pages)
+
+    def get_current_page(self):
+        self.config.delay("get_current_page")
+        return self.stack[-1]
+
+    def get_page_stack(self):
+        self.config.delay("get_page_stack")
+        return list(self.stack)
+
+    def go_home(self):
+        return self.relaunch(self.config.pages[0])
+
+    def navigate_to(self, path, params=None):
+        self.config.delay("navigate_to")
+        self.stack.append(self._new_page(path, params))
+        return self._route(self.stack[-1], "navigateTo")
+
+    def navigate_back(self):
+        self.config.delay("navigate_back")
+        if len(self.stack) > 1:
+            self.stack.pop()
+        return self._route(self.stack[-1], "navigateBack")
+
+    def redirect_to(self, path, params=None):
+        self.config.delay("redirect_to")
+        self.stack[-1] = self._new_page(path, params)
+        return self._route(self.stack[-1], "redirectTo")
+
+    def switch_tab(self, path):
+        self.config.delay("switch_tab")
+        self.stack = [self._new_page(path)]
+        return self._route(self.stack[-1], "switchTab")
+
+    def relaunch(self, path, params=None):
+        self.config.delay("relaunch")
+        self.stack = [self._new_page(path, params)]
+        return self._route(self.stack[-1], "reLaunch")
+
+
+class FakeMinium:
+
+    def __init__(self, project_path: str, config: FakeConfig):
+        config.delay("launch")
+        self.project_path = project_path
+        self.config = config
+        self.app = FakeApp(config)
+
+    def get_system_info(self):
+        self.config.delay("get_system_info")
+        return {"platform": "devtools", "SDKVersion": "3.0.0", "pixelRatio": 2}
+
+    def shutdown(self):
+        self.config.delay("shutdown")
+
+
+def factory(config: FakeConfig):
+    """A `Session` factory creating fake instances with `config`."""
+    return lambda project_path: FakeMinium(project_path, config)
+
+
+def load_config(text: str | None) -> FakeConfig:
+    values = json.loads(text) if text else {}
+    if "pages" in values:
+        values["pages"] = tuple(values["pages"])
+    return FakeConfig(**values)
@@ -0,0 +1,381 @@
+"""
+Benchmarks of the MCP servers against a fake devtools.
+
+    python bench/run.py
+    python bench/run.py --target stdio --iterations 100 --latency 0.01
+    python bench/run.py --target web asgi --concurrency 4
+    python bench/run.py --compare bench/results/20250101-120000.json
+
+Targets, each driven in-process through an MCP client session:
+
+    stdio  the stdio server and its driver thread
+    web    the webapi server -> HTTP -> web.py (Flask)
+    asgi   the webapi server -> WebSocket channel -> asgi.py (uvicorn)
+
+Every target runs in its own process because both packages are named
+`minium_mcp_server`. Each worker runs `--concurrency` copies of a fixed
+scenario (one session each on the web bridges) and records the latency of
+every tool call. Results, including p50/p99 latency, throughput and process
+memory, are written to `bench/results/<timestamp>.json`; `--compare` reports
+changes against an earlier result file.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+TARGETS = ("stdio", "web", "asgi")
+
+# (标签, 工具名, 参数)：按顺序执行的场景，模拟一次典型的页面操作
+SCENARIO = [
+    ("get_system_info", "minium_get_system_info", {}),
+    ("get_all_pages", "minium_get_all_pages_path_and_method", {}),
+    ("navigate_to", "minium_navigate_to", {"path": "/pages/list/list", "params": {"id": 1}}),
+    ("get_current_page", "minium_get_current_page", {}),
+    ("wait_for", "minium_wait_for", {"condition": "data_equals", "path": "title", "value": "pages/list/list"}),
+    ("wxml_compact", "page_get_wxml", {"format": "compact"}),
+    ("wxml_diff", "page_get_wxml", {"format": "compact", "diff": True}),
+    ("page_get_css", "page_get_css", {}),
+    ("page_get_data", "minium_page_get_data", {}),
+    ("page_get_data_slice", "minium_page_get_data", {"path": "$.list[*].id", "offset": 10, "limit": 20}),
+    ("page_set_data", "minium_page_set_data", {"key": "title", "value": "bench"}),
+    ("tap", "minium_tap", {"selector": ".item"}),
+    ("input", "minium_input", {"selector": ".title", "text": "hello"}),
+    ("screen_shot", "minium_screen_shot", {"skip_unchanged": False}),
+    ("get_logs", "minium_get_logs", {"limit": 20}),
+    ("batch", "minium_batch", {"commands": [
+        {"name": "minium_tap", "arguments": {"selector": ".item"}},
+        {"name": "page_get_wxml", "arguments": {"format": "compact", "diff": True}},
+    ]}),
+    ("navigate_back", "minium_navigate_back", {}),
+]
+SCENARIO_JPEG = ("screen_shot_jpeg", "minium_screen_shot", {"format": "jpeg", "max_width": 375, "skip_unchanged": False})
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_project(directory: str, pages) -> str:
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "app.json"), "w", encoding="utf-8") as file:
+        json.dump({"pages": list(pages), "tabBar": {"list": [{"pagePath": pages[0]}]}}, file)
+    return directory
+
+
+class Recorder:
+    """Latency samples, errors and memory of one worker."""
+
+    def __init__(self):
+        import psutil
+        self.process = psutil.Process()
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.rss_start = self.rss_peak = self.process.memory_info().rss
+        self.elapsed = 0.0
+
+    def sample_memory(self) -> None:
+        self.rss_peak = max(self.rss_peak, self.process.memory_info().rss)
+
+    def result(self, concurrency: int) -> dict:
+        tools = {}
+        for label, samples in self.samples.items():
+            total = sum(samples)
+            tools[label] = {
+                "calls": len(samples),
+                "errors": self.errors[label],
+                "mean_ms": round(total / len(samples) * 1000, 3),
+                "p50_ms": round(percentile(samples, 0.5) * 1000, 3),
+                "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+                "max_ms": round(max(samples) * 1000, 3),
+                # 并发执行时按并发数折算
+                "throughput_per_s": round(len(samples) / total * concurrency, 1) if total else None,
+            }
+        calls = sum(len(samples) for samples in self.samples.values())
+        return {
+            "tools": tools,
+            "calls": calls,
+            "elapsed_s": round(self.elapsed, 3),
+            "throughput_per_s": round(calls / self.elapsed, 1) if self.elapsed else None,
+            "memory": {
+                "rss_start_mb": round(self.rss_start / 2 ** 20, 1),
+                "rss_end_mb": round(self.process.memory_info().rss / 2 ** 20, 1),
+                "rss_peak_mb": round(self.rss_peak / 2 ** 20, 1),
+            },
+        }
+
+
+@asynccontextmanager
+async def mcp_client(server):
+    """An MCP client session connected to `server` in memory."""
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    async with create_connected_server_and_client_session(server) as client:
+        # 客户端把收到的通知（路由、日志事件）放入 incoming_messages，不读取会阻塞接收循环
+        async def drain():
+            async for _ in client.incoming_messages:
+                pass
+
+        task = asyncio.create_task(drain())
+        try:
+            yield client
+        finally:
+            task.cancel()
+
+
+async def run_scenarios(client, options, recorder: Recorder, sessions: list[str | None]) -> None:
+    scenario = list(SCENARIO)
+    try:
+        import PIL  # noqa: F401
+        scenario.append(SCENARIO_JPEG)
+    except ImportError:
+        pass
+
+    async def call(label, tool, arguments, session, record):
+        if session is not None:
+            arguments = {**arguments, "session": session}
+        started = time.perf_counter()
+        result = await client.call_tool(tool, arguments)
+        if record:
+            recorder.samples[label].append(time.perf_counter() - started)
+            text = result.content[0].text if result.content and result.content[0].type == "text" else ""
+            if result.isError or text.startswith("Error:"):
+                recorder.errors[label] += 1
+
+    async def scenario_loop(session):
+        for iteration in range(options.warmup + options.iterations):
+            for label, tool, arguments in scenario:
+                await call(label, tool, arguments, session, iteration >= options.warmup)
+            recorder.sample_memory()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(scenario_loop(session) for session in sessions))
+    recorder.elapsed = time.perf_counter() - started
+
+
+async def bench_stdio(options, config, workdir) -> dict:
+    sys.path.insert(0, os.path.join(ROOT, "stdio", "src"))
+    from fake_minium import factory
+    from minium_mcp_server import server
+    from minium_mcp_server.driver import MiniumDriver
+    from minium_mcp_server.session import Session
+
+    recorder = Recorder()
+    project = make_project(os.path.join(workdir, "project"), config.pages)
+    driver = MiniumDriver(Session(project, factory=factory(config)))
+    await driver.start()
+    try:
+        async with mcp_client(server.create_server(driver, project)) as client:
+            await run_scenarios(client, options, recorder, [None] * options.concurrency)
+    finally:
+        driver.close()
+    return recorder.result(options.concurrency)
+
+
+async def open_sessions(client, options, config, workdir) -> list[str]:
+    sessions = []
+    for index in range(options.concurrency):
+        session = f"bench-{index}"
+        project = make_project(os.path.join(workdir, session), config.pages)
+        await client.call_tool("minium_open", {"path": project, "session": session})
+        sessions.append(session)
+    return sessions
+
+
+async def bench_web(options, config, workdir) -> dict:
+    sys.path[:0] = [os.path.join(ROOT, "webapi", "src"), os.path.join(ROOT, "webapi")]
+    from werkzeug.serving import make_server
+    from fake_minium import factory
+    from minium_mcp_server import server
+    from minium_mcp_server.bridge import BridgeClient
+    from minium_mcp_server.pool import SessionPool
+    import web
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    recorder = Recorder()
+    web.pool = SessionPool(max_sessions=options.concurrency, idle_timeout=0, factory=factory(config))
+    http = make_server("127.0.0.1", 0, web.app, threaded=True)
+    loop = asyncio.get_running_loop()
+    serving = loop.run_in_executor(None, http.serve_forever)
+    try:
+        async with BridgeClient(f"http://127.0.0.1:{http.server_port}", transport="http") as bridge, \
+                mcp_client(server.create_server(bridge)) as client:
+            sessions = await open_sessions(client, options, config, workdir)
+            await run_scenarios(client, options, recorder, sessions)
+    finally:
+        http.shutdown()
+        await serving
+        web.pool.close_all()
+    return recorder.result(options.concurrency)
+
+
+async def bench_asgi(options, config, workdir) -> dict:
+    sys.path[:0] = [os.path.join(ROOT, "webapi", "src"), os.path.join(ROOT, "webapi")]
+    import uvicorn
+    from fake_minium import factory
+    from minium_mcp_server import server
+    from minium_mcp_server.bridge import BridgeClient
+    from minium_mcp_server.pool import SessionPool
+    from minium_mcp_server.warmpool import WarmPool
+    import asgi
+
+    recorder = Recorder()
+    asgi.pool = SessionPool(max_sessions=options.concurrency, idle_timeout=0,
+                            warm_pool=WarmPool(factory(config), size=0, projects={}), factory=factory(config))
+    bridge_server = uvicorn.Server(uvicorn.Config(asgi.app, host="127.0.0.1", port=0, log_level="warning"))
+    serving = asyncio.create_task(bridge_server.serve())
+    while not bridge_server.started:
+        await asyncio.sleep(0.01)
+    port = bridge_server.servers[0].sockets[0].getsockname()[1]
+    try:
+        async with BridgeClient(f"http://127.0.0.1:{port}") as bridge, \
+                mcp_client(server.create_server(bridge)) as client:
+            sessions = await open_sessions(client, options, config, workdir)
+            await run_scenarios(client, options, recorder, sessions)
+    finally:
+        bridge_server.should_exit = True
+        await serving
+    return recorder.result(options.concurrency)
+
+
+def run_worker(options) -> None:
+    """Benchmark one target in this process and write its result to `options.output`."""
+    sys.path.insert(0, BENCH_DIR)
+    from fake_minium import load_config
+
+    config = load_config(options.fake_config)
+    bench = {"stdio": bench_stdio, "web": bench_web, "asgi": bench_asgi}[options.worker]
+    with tempfile.TemporaryDirectory(prefix="minium-bench-") as workdir:
+        result = asyncio.run(bench(options, config, workdir))
+    with open(options.output, "w", encoding="utf-8") as file:
+        json.dump(result, file)
+
+
+def compare(previous: dict, current: dict, tolerance: float) -> list[str]:
+    """Lines describing p50/p99 changes; regressions are marked with `!`."""
+    lines = []
+    if previous.get("options") != current["options"]:
+        lines.append(f"Note: options differ from the earlier run: {json.dumps(previous.get('options'))}")
+    for target, result in current["targets"].items():
+        before = previous.get("targets", {}).get(target)
+        if not before or "tools" not in before or "tools" not in result:
+            continue
+        lines.append(f"{target}:")
+        for label, stats in result["tools"].items():
+            old = before["tools"].get(label)
+            if old is None:
+                continue
+            cells = []
+            regressed = False
+            for key in ("p50_ms", "p99_ms"):
+                change = (stats[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+                # 低于 1ms 的变化视为噪声
+                regressed |= change > tolerance * 100 and stats[key] - old[key] > 1
+                cells.append(f"{key[:3]} {old[key]:8.2f} -> {stats[key]:8.2f} ms ({change:+6.1f}%)")
+            lines.append(f"  {'!' if regressed else ' '} {label:<20} " + "  ".join(cells))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Minium MCP servers against a fake devtools")
+    parser.add_argument("--target", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--iterations", type=int, default=30, help="Scenario runs measured per worker")
+    parser.add_argument("--warmup", type=int, default=2, help="Scenario runs before measuring")
+    parser.add_argument("--concurrency", type=int, default=1, help="Scenarios run in parallel")
+    parser.add_argument("--latency", type=float, default=0.005, help="Default simulated devtools latency (s)")
+    parser.add_argument("--method-latency", action="append", default=[], metavar="METHOD=SECONDS",
+                        help="Simulated latency of one devtools method, e.g. wxml=0.05")
+    parser.add_argument("--wxml-nodes", type=int, default=200)
+    parser.add_argument("--data-items", type=int, default=100)
+    parser.add_argument("--screenshot-bytes", type=int, default=200_000)
+    parser.add_argument("--output", help="Result file (default: bench/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Relative slowdown reported as a regression")
+    parser.add_argument("--worker", choices=TARGETS, help=argparse.SUPPRESS)
+    parser.add_argument("--fake-config", help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.worker:
+        run_worker(options)
+        return 0
+
+    fake_config = {
+        "default_latency": options.latency,
+        "latency": dict((key, float(value)) for key, _, value in
+                        (item.partition("=") for item in options.method_latency)),
+        "wxml_nodes": options.wxml_nodes,
+        "data_items": options.data_items,
+        "screenshot_bytes": options.screenshot_bytes,
+    }
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {
+            "iterations": options.iterations,
+            "warmup": options.warmup,
+            "concurrency": options.concurrency,
+            "fake": fake_config,
+        },
+        "targets": {},
+    }
+    for target in options.target:
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as output:
+            output_path = output.name
+        command = [
+            sys.executable, __file__, "--worker", target, "--output", output_path,
+            "--fake-config", json.dumps(fake_config),
+            "--iterations", str(options.iterations), "--warmup", str(options.warmup),
+            "--concurrency", str(options.concurrency),
+        ]
+        print(f"Benchmarking {target}...", file=sys.stderr)
+        # 服务会向 stdout 打印请求日志，丢弃以免干扰输出
+        completed = subprocess.run(command, stdout=subprocess.DEVNULL)
+        if completed.returncode == 0:
+            with open(output_path, encoding="utf-8") as file:
+                results["targets"][target] = json.load(file)
+        else:
+            results["targets"][target] = {"error": f"worker exited with {completed.returncode}"}
+        os.remove(output_path)
+
+    output_path = options.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+
+    for target, result in results["targets"].items():
+        if "error" in result:
+            print(f"{target}: {result['error']}")
+            continue
+        memory = result["memory"]
+        print(f"{target}: {result['calls']} calls in {result['elapsed_s']}s, {result['throughput_per_s']}/s, "
+              f"rss {memory['rss_start_mb']} -> {memory['rss_end_mb']} MB (peak {memory['rss_peak_mb']})")
+        for label, stats in result["tools"].items():
+            print(f"  {label:<20} p50 {stats['p50_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms  "
+                  f"{stats['throughput_per_s']:8.1f}/s  errors {stats['errors']}")
+    print(f"Results written to {output_path}")
+
+    if options.compare:
+        with open(options.compare, encoding="utf-8") as file:
+            lines = compare(json.load(file), results, options.tolerance)
+        print("\n".join(lines))
+        if any(line.lstrip().startswith("!") for line in lines):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 共享模块在两个包中相同，测试使用 webapi 中的副本
+sys.path[:0] = [os.path.join(ROOT, "bench"), os.path.join(ROOT, "webapi", "src")]
+
+from fake_minium import FakeConfig, FakeMinium  # noqa: E402
+
+
+class Launcher:
+    """A fake Minium factory that remembers every instance it launched."""
+
+    def __init__(self, **config):
+        self.config = FakeConfig(default_latency=0, **config)
+        self.instances: list[FakeMinium] = []
+
+    def __call__(self, project_path: str) -> FakeMinium:
+        instance = FakeMinium(project_path, self.config)
+        instance.closed = False
+        original = instance.shutdown
+
+        def shutdown():
+            original()
+            instance.closed = True
+
+        instance.shutdown = shutdown
+        self.instances.append(instance)
+        return instance
+
+    def live(self, project_path: str) -> list[FakeMinium]:
+        return [instance for instance in self.instances if instance.project_path == project_path and not instance.closed]
+
+
+@pytest.fixture
+def launcher():
+    return Launcher()
+
+
+@pytest.fixture
+def project(tmp_path):
+    from run import make_project
+    return make_project(str(tmp_path / "project"), FakeConfig().pages)
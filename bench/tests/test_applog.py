@@ -0,0 +1,53 @@
+from minium_mcp_server.applog import LogBuffer
+from minium_mcp_server.commands import dispatch
+from minium_mcp_server.session import Session
+
+
+def make_buffer(**limits):
+    buffer = LogBuffer(**limits)
+    buffer.append("log", ["page loaded", {"id": 1}])
+    buffer.append("warn", ["slow request"])
+    buffer.append("error", ["request failed: 500"])
+    buffer.append("debug", ["request done"])
+    return buffer
+
+
+def texts(entries):
+    return [entry.text for entry in entries]
+
+
+def test_filters():
+    buffer = make_buffer()
+    assert texts(buffer.query(level="warn")[0]) == ["slow request", "request failed: 500"]
+    assert texts(buffer.query(contains="request")[0]) == ["slow request", "request failed: 500", "request done"]
+    assert texts(buffer.query(pattern=r"failed: \d+")[0]) == ["request failed: 500"]
+    assert texts(buffer.query(limit=1)[0]) == ["request done"]
+    assert buffer.query()[0][0].text == 'page loaded {"id": 1}'
+
+
+def test_since_pages_forward():
+    buffer = make_buffer()
+    entries, cursor, missed = buffer.query(since=1, limit=2)
+    assert texts(entries) == ["slow request", "request failed: 500"]
+    assert (cursor, missed) == (3, 0)
+    entries, cursor, _ = buffer.query(since=cursor)
+    assert texts(entries) == ["request done"]
+    assert cursor == 4
+
+
+def test_eviction_is_reported_as_missed():
+    buffer = make_buffer(max_entries=2)
+    entries, cursor, missed = buffer.query(since=0)
+    assert texts(entries) == ["request failed: 500", "request done"]
+    assert (cursor, missed) == (4, 2)
+
+
+def test_invalid_pattern_is_an_error_result(launcher, project):
+    session = Session(project, factory=launcher)
+    session.open()
+    try:
+        result = dispatch(session, "get_logs", {"pattern": "request ("})
+        assert result["status"] == "error"
+        assert result["message"].startswith("Invalid pattern 'request ('")
+    finally:
+        session.shutdown()
@@ -0,0 +1,61 @@
+import os
+import sys
+import asyncio
+
+import anyio
+import pytest
+
+from conftest import ROOT
+from minium_mcp_server.pool import SessionPool
+
+sys.path.insert(0, os.path.join(ROOT, "webapi"))
+asgi = pytest.importorskip("asgi")
+
+
+@pytest.fixture
+def bridge(launcher, project, monkeypatch):
+    pool = SessionPool(factory=launcher, health_interval=0)
+    monkeypatch.setattr(asgi, "pool", pool)
+    assert pool.run({"name": "open", "arguments": {"path": project}})["status"] == "success"
+    yield
+    pool.close_all()
+
+
+def test_cancel_a_queued_request(bridge):
+    async def scenario():
+        asgi.limiter = anyio.CapacityLimiter(4)
+        # 模拟正在执行的命令占用会话
+        lock = asgi.session_locks["default"] = asyncio.Lock()
+        await lock.acquire()
+        task = asyncio.create_task(asgi.run_command({"name": "get_current_page", "request_id": "r1"}))
+        await asyncio.sleep(0.05)
+        assert asgi.cancel_request("r1") is True
+        result = await task
+        assert not task.cancelled()
+        assert result["error"] == "cancelled"
+        assert asgi.cancel_request("r1") is False
+        # 被取消的请求离开队列，会话锁仍可正常使用
+        lock.release()
+        result = await asgi.run_command({"name": "get_current_page", "request_id": "r2"})
+        assert result["status"] == "success"
+        assert not lock.locked()
+
+    asyncio.run(scenario())
+
+
+def test_cancel_an_unknown_request(bridge):
+    assert asgi.cancel_request("missing") is False
+
+
+def test_queue_timeout_leaves_the_lock_usable(bridge):
+    async def scenario():
+        asgi.limiter = anyio.CapacityLimiter(4)
+        lock = asgi.session_locks["default"] = asyncio.Lock()
+        await lock.acquire()
+        result = await asgi.run_command({"name": "get_current_page", "timeout": 0.1})
+        assert result["error"] == "timeout"
+        lock.release()
+        assert (await asgi.run_command({"name": "get_current_page"}))["status"] == "success"
+        assert not lock.locked()
+
+    asyncio.run(scenario())
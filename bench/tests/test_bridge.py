@@ -0,0 +1,62 @@
+import json
+import asyncio
+
+import httpx
+
+from minium_mcp_server import bridge
+from minium_mcp_server.bridge import BridgeChannel, BridgeClient
+from websockets.asyncio.server import serve
+
+
+def port_of(server) -> int:
+    return server.sockets[0].getsockname()[1]
+
+
+def test_channel_matches_results_and_survives_bad_messages():
+    async def handler(connection):
+        requests = [json.loads(await connection.recv()) for _ in range(2)]
+        await connection.send("not json")
+        await connection.send(json.dumps({"event": "route_changed"}))
+        # 结果按与请求相反的顺序返回
+        for request in reversed(requests):
+            await connection.send(json.dumps({"id": request["id"], "result": {"value": request["value"]}}))
+        await connection.wait_closed()
+
+    def on_event(message):
+        raise RuntimeError("handler failed")
+
+    async def scenario():
+        async with serve(handler, "127.0.0.1", 0) as server:
+            channel = BridgeChannel(f"ws://127.0.0.1:{port_of(server)}", on_event)
+            await channel.connect()
+            results = await asyncio.wait_for(
+                asyncio.gather(channel.request({"value": 1}), channel.request({"value": 2})), 5)
+            assert results == [{"value": 1}, {"value": 2}]
+            assert channel.connected
+            await channel.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_client_falls_back_to_http_and_remembers_missing_channel(monkeypatch):
+    monkeypatch.setattr(bridge, "RECONNECT_INTERVAL", 0)
+    handshakes = []
+
+    def process_request(connection, request):
+        handshakes.append(request.path)
+        return connection.respond(404, "Not Found\n")
+
+    def handle(request):
+        payload = json.loads(request.content)
+        return httpx.Response(200, json={"status": "success", "name": payload["name"]})
+
+    async def scenario():
+        async with serve(lambda connection: None, "127.0.0.1", 0, process_request=process_request) as server:
+            base_url = f"http://127.0.0.1:{port_of(server)}"
+            async with BridgeClient(base_url, timeout=5) as client:
+                client._client = httpx.AsyncClient(base_url=base_url, transport=httpx.MockTransport(handle))
+                for name in ("get_current_page", "get_page_stack"):
+                    assert (await client.command(name))["name"] == name
+        assert handshakes == ["/api/channel"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,48 @@
+import json
+import threading
+
+import pytest
+
+from minium_mcp_server.commands import dispatch
+from minium_mcp_server.session import Session
+
+
+@pytest.fixture
+def session(launcher, project):
+    session = Session(project, factory=launcher)
+    session.open()
+    yield session
+    session.shutdown()
+
+
+def wait_for(session, **arguments):
+    result = dispatch(session, "wait_for", arguments)
+    return result["status"], json.loads(result["message"])
+
+
+def test_wait_for_polls_until_the_condition_holds(session):
+    page = session.app.stack[-1]
+    timer = threading.Timer(0.3, lambda: setattr(page, "data", {"ready": True}))
+    timer.start()
+    status, result = wait_for(session, condition="data_equals", path="ready", value=True, timeout=5)
+    timer.join()
+    assert status == "success"
+    assert result["met"] is True
+    assert result["polls"] > 1
+    assert 0.3 <= result["elapsed"] < 2
+
+
+def test_wait_for_returns_the_last_observation_before_the_deadline(session):
+    status, result = wait_for(session, condition="route_equals", path="/pages/list/list", timeout=0.5)
+    assert status == "error"
+    assert result["met"] is False
+    assert result["value"] == "/pages/index/index"
+    # 截止时间之前留出返回结果的余量
+    assert result["elapsed"] < 0.5
+
+
+def test_wait_for_checks_condition_arguments(session):
+    result = dispatch(session, "wait_for", {"condition": "selector_visible"})
+    assert result == {"status": "error", "message": "Condition selector_visible requires selector"}
+    status, result = wait_for(session, condition="selector_visible", selector=".item")
+    assert (status, result["polls"]) == ("success", 1)
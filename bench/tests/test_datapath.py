@@ -0,0 +1,42 @@
+import pytest
+
+from minium_mcp_server.datapath import diff, paginate, parse_path, select
+
+DATA = {"list": [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}, {"id": 3}], "user": {"name": "x"}}
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("$.list[0].name", "a"),
+    ("list.1.name", "b"),
+    ("list[-1].id", 3),
+    ("$.list[*].id", [1, 2, 3]),
+    ("$.list[1:].id", [2, 3]),
+    # 通配时跳过没有该字段的元素
+    ("$.list[*].name", ["a", "b"]),
+    ("$['user'].name", "x"),
+    ("$", DATA),
+])
+def test_select(path, expected):
+    assert select(DATA, parse_path(path)) == expected
+
+
+def test_select_missing_path():
+    with pytest.raises(ValueError, match="Path not found: list\\[5\\]"):
+        select(DATA, parse_path("list[5].id"))
+    with pytest.raises(ValueError, match="Invalid data path"):
+        parse_path("list[")
+
+
+def test_paginate():
+    assert paginate([1, 2, 3, 4], 1, 2) == ([2, 3], {"offset": 1, "limit": 2, "total": 4})
+    assert paginate([1, 2], 0, None) == ([1, 2], None)
+
+
+def test_diff_produces_json_patch():
+    new = {"list": [{"id": 1, "name": "c"}, {"id": 2, "name": "b"}], "user": {"name": "x", "a/b": 1}}
+    assert diff(DATA, new) == [
+        {"op": "replace", "path": "/list/0/name", "value": "c"},
+        {"op": "remove", "path": "/list/2"},
+        {"op": "add", "path": "/user/a~1b", "value": 1},
+    ]
+    assert diff(DATA, DATA) == []
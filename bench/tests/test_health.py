@@ -0,0 +1,112 @@
+import json
+import time
+import threading
+
+import pytest
+
+from minium_mcp_server.commands import dispatch
+from minium_mcp_server.health import Health, Watchdog
+from minium_mcp_server.pool import SessionPool
+from minium_mcp_server.session import Session
+from test_warmpool import wait_until
+
+
+def test_gate_waits_for_the_recovery():
+    health = Health(wait=5)
+    health.lost("no response")
+    threading.Timer(0.1, health.restored).start()
+    assert health.gate("tap") is True
+
+
+def test_gate_gives_up_at_the_callers_deadline():
+    health = Health(wait=60)
+    health.lost("no response")
+    started = time.monotonic()
+    assert health.gate("tap", time.monotonic() + 0.2) is False
+    assert time.monotonic() - started < 1
+
+
+def test_gate_stops_waiting_when_cancelled():
+    health = Health(wait=60)
+    health.lost("no response")
+    cancelled = threading.Event()
+    threading.Timer(0.1, cancelled.set).start()
+    started = time.monotonic()
+    assert health.gate("tap", None, cancelled) is False
+    assert time.monotonic() - started < 1
+
+
+def test_gate_raises_when_the_recovery_takes_too_long():
+    health = Health(wait=0.1)
+    health.lost("no response")
+    with pytest.raises(RuntimeError, match="still reconnecting"):
+        health.gate("tap", time.monotonic() + 5)
+    # 打开和关闭项目不等待恢复
+    assert health.gate("open") is True
+
+
+@pytest.fixture
+def pool(launcher, project):
+    pool = SessionPool(factory=launcher, health_interval=0)
+    assert pool.run({"name": "open", "arguments": {"path": project}})["status"] == "success"
+    yield pool
+    pool.close_all()
+
+
+def test_pool_call_times_out_while_recovering(pool):
+    pool.get("default").session.health.lost("no response")
+    started = time.monotonic()
+    result = pool.run({"name": "get_current_page", "timeout": 0.2})
+    assert time.monotonic() - started < 1
+    assert json.loads(result["message"])["phase"] == "recovery"
+
+
+def test_pool_call_is_cancelled_while_recovering(pool):
+    pool.get("default").session.health.lost("no response")
+    threading.Timer(0.1, pool.cancel, args=("r1",)).start()
+    result = pool.run({"name": "get_current_page", "request_id": "r1"})
+    assert result["error"] == "cancelled"
+
+
+@pytest.fixture
+def session(launcher, project):
+    session = Session(project, factory=launcher)
+    session.open()
+    yield session
+    session.shutdown()
+
+
+def watchdog_for(session, pings):
+    def ping():
+        pings.append(time.monotonic())
+        raise RuntimeError("no response")
+
+    session.ping = ping
+    return Watchdog(lambda: [("s", session)], lambda name, session: session.reconnect(), interval=30, timeout=1)
+
+
+def test_busy_session_is_not_pinged(session):
+    pings = []
+    watchdog = watchdog_for(session, pings)
+    with session.health.command():
+        watchdog.check()
+    # 刚成功执行过命令的会话也不检查
+    dispatch(session, "get_current_page", {})
+    watchdog.check()
+    assert pings == []
+    assert session.health.healthy
+
+
+def test_relaunch_after_consecutive_failures_and_restore_the_route(session, launcher):
+    dispatch(session, "navigate_to", {"path": "/pages/list/list"})
+    session.health.answered_at = float("-inf")
+    pings = []
+    watchdog = watchdog_for(session, pings)
+    watchdog.check()
+    assert len(pings) == 1 and session.health.missed == 1
+    assert session.health.healthy and len(launcher.instances) == 1
+    watchdog.check()
+    assert wait_until(lambda: not any(thread.name == "minium-recovery" for thread in threading.enumerate()))
+    assert len(launcher.instances) == 2 and session.health.healthy
+    assert launcher.instances[0].closed
+    assert session.current_page().path == "pages/list/list"
@@ -0,0 +1,78 @@
+import json
+import time
+
+import pytest
+
+from minium_mcp_server import macro
+from minium_mcp_server.commands import dispatch
+from minium_mcp_server.session import Session
+from minium_mcp_server.tools import get_command
+
+STEPS = [
+    ("navigate_to", {"path": "/pages/list/list"}),
+    ("page_set_data", {"key": "title", "value": "replayed"}),
+    ("page_get_data", {"path": "title"}),
+]
+
+
+@pytest.fixture
+def make_session(launcher, project):
+    sessions = []
+
+    def make():
+        session = Session(project, factory=launcher)
+        session.open()
+        sessions.append(session)
+        return session
+
+    yield make
+    for session in sessions:
+        session.shutdown()
+
+
+def record(session, path):
+    recorder = macro.Recorder(str(path))
+    for name, arguments in STEPS:
+        command = get_command(name)
+        started = time.perf_counter()
+        recorder.record(command.name, command.tool_name, arguments, dispatch(session, name, arguments), started)
+    return macro.load(str(path))
+
+
+def replay(session, steps, assertion="hash", stop_on_failure=True):
+    result = dispatch(session, "replay", {"steps": steps, "assert": assertion, "stop_on_failure": stop_on_failure})
+    return result["status"], json.loads(result["message"].strip("`").removeprefix("json"))
+
+
+def test_recorded_macro_replays_with_matching_hashes(make_session, tmp_path):
+    steps = record(make_session(), tmp_path / "macro.jsonl")
+    assert [step["name"] for step in steps] == [get_command(name).tool_name for name, _ in STEPS]
+    status, report = replay(make_session(), steps)
+    assert status == "success"
+    assert (report["executed"], report["failed"]) == (3, 0)
+    assert all(step["drift_ms"] is not None for step in report["steps"])
+
+
+def test_changed_result_fails_the_hash_assertion_only(make_session, tmp_path):
+    steps = record(make_session(), tmp_path / "macro.jsonl")
+    steps[1]["arguments"]["value"] = "changed"
+    assert replay(make_session(), steps, "status")[0] == "success"
+    status, report = replay(make_session(), steps)
+    assert status == "error"
+    # 第二步的结果不同，默认在第一个失败处停止
+    assert (report["executed"], report["failed"], report["stopped"]) == (2, 1, True)
+    assert report["steps"][1]["failures"][0].startswith("hash ")
+
+
+def test_expectations_and_keep_going(make_session):
+    steps = [
+        {"name": "minium_page_get_data", "arguments": {"path": "missing.key"}},
+        {"name": "minium_get_current_page", "expect": {"contains": "pages/index/index"}},
+        {"name": "minium_get_current_page", "expect": {"contains": "pages/detail/detail"}},
+        {"name": "minium_replay", "arguments": {"steps": []}},
+    ]
+    status, report = replay(make_session(), steps, "status", stop_on_failure=False)
+    assert status == "error"
+    assert [step["ok"] for step in report["steps"]] == [False, True, False, False]
+    assert report["steps"][2]["failures"] == ["result does not contain 'pages/detail/detail'"]
+    assert report["steps"][3]["failures"][0] == "status error != success: Nested replay is not allowed"
@@ -0,0 +1,27 @@
+import pytest
+
+from minium_mcp_server.metrics import LATENCY_BUCKETS, Histogram
+
+
+def test_empty_quantile():
+    assert Histogram(LATENCY_BUCKETS).quantile(0.5) == 0.0
+
+
+def test_quantile_within_one_bucket_uses_observed_range():
+    histogram = Histogram(LATENCY_BUCKETS)
+    for value in (0.001, 0.002, 0.003, 0.004):
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == pytest.approx(0.0025)
+    assert histogram.quantile(1.0) == pytest.approx(0.004)
+
+
+def test_quantile_across_buckets():
+    histogram = Histogram(LATENCY_BUCKETS)
+    for _ in range(9):
+        histogram.observe(0.02)
+    histogram.observe(3.0)
+    assert histogram.count == 10
+    assert histogram.sum == pytest.approx(3.18)
+    assert 0.02 <= histogram.quantile(0.5) <= 0.025
+    # 最慢的一次落在 (2.5, 5] 桶中，上界收窄到实际最大值
+    assert 2.5 < histogram.quantile(0.99) <= 3.0
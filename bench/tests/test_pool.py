@@ -0,0 +1,137 @@
+import json
+import time
+import threading
+
+import pytest
+
+from conftest import Launcher
+from minium_mcp_server.pool import SessionPool
+from run import make_project
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(factory, **options):
+        pool = SessionPool(factory=factory, health_interval=0, **options)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close_all()
+
+
+@pytest.fixture
+def projects(tmp_path, launcher):
+    return [make_project(str(tmp_path / name), launcher.config.pages) for name in ("a", "b", "c")]
+
+
+def open_command(session, project):
+    return {"name": "open", "session": session, "arguments": {"path": project}}
+
+
+def open_sessions(pool):
+    return [session["session"] for session in pool.sessions()]
+
+
+def test_concurrent_opens_of_one_project(make_pool, project):
+    launcher = Launcher(latency={"launch": 0.2})
+    pool = make_pool(launcher)
+    results = {}
+    threads = [
+        threading.Thread(target=lambda session: results.update({session: pool.run(open_command(session, project))}),
+                         args=(session,))
+        for session in ("a", "b")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    statuses = sorted(result["status"] for result in results.values())
+    assert statuses == ["error", "success"]
+    assert len(launcher.instances) == 1
+    assert [session["session"] for session in pool.sessions()] == [pool.owner(project)]
+
+
+def test_failed_open_drops_the_session(make_pool, project, launcher, monkeypatch):
+    def failing(project_path):
+        raise RuntimeError("devtools did not start")
+
+    monkeypatch.setattr("minium_mcp_server.session.launch_with_retry", lambda factory, path: factory(path))
+    pool = make_pool(failing)
+    result = pool.run(open_command("a", project))
+    assert result["status"] == "error"
+    assert pool.sessions() == []
+    assert pool.owner(project) is None
+    # 项目没有被占用，其他会话可以打开
+    pool.factory = launcher
+    assert pool.run(open_command("b", project))["status"] == "success"
+
+
+def test_least_recently_used_session_is_evicted(make_pool, projects, launcher):
+    pool = make_pool(launcher, max_sessions=2)
+    for session, project in zip("ab", projects):
+        assert pool.run(open_command(session, project))["status"] == "success"
+    # 使用 a 之后 b 成为最久未使用的会话
+    assert pool.run({"name": "get_current_page", "session": "a"})["status"] == "success"
+    assert pool.run(open_command("c", projects[2]))["status"] == "success"
+    assert open_sessions(pool) == ["a", "c"]
+    assert launcher.live(projects[1]) == []
+    assert pool.owner(projects[1]) is None
+
+
+def test_busy_session_is_not_evicted(make_pool, projects, launcher):
+    pool = make_pool(launcher, max_sessions=2)
+    for session, project in zip("ab", projects):
+        assert pool.run(open_command(session, project))["status"] == "success"
+    # a 最久未使用，但正在执行命令
+    with pool._entries["a"].lock:
+        assert pool.run(open_command("c", projects[2]))["status"] == "success"
+    assert open_sessions(pool) == ["a", "c"]
+    assert len(launcher.live(projects[0])) == 1
+
+
+def test_idle_session_is_evicted_on_the_next_lookup(make_pool, projects, launcher):
+    pool = make_pool(launcher, idle_timeout=0.05)
+    assert pool.run(open_command("a", projects[0]))["status"] == "success"
+    time.sleep(0.1)
+    pool.evict_idle()
+    assert pool.sessions() == []
+    assert launcher.live(projects[0]) == []
+
+
+def test_queue_deadline_leaves_the_session_usable(make_pool, project, launcher):
+    pool = make_pool(launcher)
+    assert pool.run(open_command("a", project))["status"] == "success"
+    command = {"name": "get_current_page", "session": "a", "timeout": 0.1}
+    with pool.get("a").lock:
+        result = pool.run(command)
+    assert json.loads(result["message"])["phase"] == "queue"
+    assert pool.run(command)["status"] == "success"
+
+
+def test_command_past_its_deadline_releases_the_lock_when_done(make_pool, project):
+    pool = make_pool(Launcher(latency={"get_current_page": 0.3}))
+    assert pool.run(open_command("a", project))["status"] == "success"
+    command = {"name": "get_current_page", "session": "a"}
+    result = pool.run({**command, "timeout": 0.1})
+    assert json.loads(result["message"])["phase"] == "devtools"
+    # 命令在后台执行完后释放会话锁，下一个命令排队后正常执行
+    assert pool.run(command)["status"] == "success"
+
+
+def test_cancelled_command_releases_the_lock_when_done(make_pool, project):
+    pool = make_pool(Launcher(latency={"get_current_page": 0.3}))
+    assert pool.run(open_command("a", project))["status"] == "success"
+    command = {"name": "get_current_page", "session": "a"}
+    results = []
+    thread = threading.Thread(target=lambda: results.append(pool.run({**command, "request_id": "r1"})))
+    thread.start()
+    time.sleep(0.1)
+    assert pool.cancel("r1") is True
+    thread.join(1)
+    assert results[0]["error"] == "cancelled"
+    assert pool.cancel("r1") is False
+    assert pool.run(command)["status"] == "success"
@@ -0,0 +1,26 @@
+import os
+import json
+
+from minium_mcp_server import routes
+from minium_mcp_server.routes import RouteIndex
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+
+
+def test_app_json_location_is_resolved_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(routes, "CHECK_INTERVAL", 0)
+    write_json(tmp_path / "project.config.json", {"miniprogramRoot": "dist/"})
+    write_json(tmp_path / "dist" / "app.json", {"pages": ["pages/index/index"], "tabBar": {"list": [{"pagePath": "pages/index/index"}]}})
+    index = RouteIndex(str(tmp_path))
+    assert index.all_pages() == ["pages/index/index"]
+    assert index.is_tab("/pages/index/index")
+    # 之后的检查只比较 app.json 的修改时间，不再读取 project.config.json
+    os.remove(tmp_path / "project.config.json")
+    write_json(tmp_path / "dist" / "app.json", {"pages": ["pages/index/index", "pages/list/list"]})
+    os.utime(tmp_path / "dist" / "app.json", ns=(0, 1))
+    assert index.all_pages() == ["pages/index/index", "pages/list/list"]
+    assert index.app_json_path == os.path.join(str(tmp_path), "dist/", "app.json")
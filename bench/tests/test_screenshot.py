@@ -0,0 +1,51 @@
+import io
+import itertools
+
+import pytest
+
+from minium_mcp_server.commands import dispatch
+from minium_mcp_server.screenshot import ScreenHistory
+from minium_mcp_server.session import Session
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def gradient(shade=lambda x, y: x * 4) -> bytes:
+    image = Image.new("L", (64, 64))
+    image.putdata([shade(x, y) for y in range(64) for x in range(64)])
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_exact_repeats_need_no_threshold():
+    history = ScreenHistory()
+    raw = gradient()
+    assert not history.unchanged(raw)
+    history.record(raw, ("png",))
+    assert history.unchanged(raw, None, ("png",))
+    # 编码参数不同时不能复用上一张截图
+    assert not history.unchanged(raw, None, ("jpeg",))
+    assert not history.unchanged(gradient(lambda x, y: x * 4 + (x == 10 and y == 10)), None, ("png",))
+
+
+def test_threshold_tolerates_small_changes_only():
+    history = ScreenHistory()
+    history.record(gradient(), ())
+    # 一个像素的细微变化在阈值之内，反向渐变的差异位数远超阈值
+    assert history.unchanged(gradient(lambda x, y: x * 4 + (x == 10 and y == 10)), 8)
+    assert not history.unchanged(gradient(lambda x, y: 255 - x * 4), 8)
+
+
+def test_skip_unchanged_screenshot(launcher, project):
+    session = Session(project, factory=launcher)
+    session.open()
+    try:
+        session.app._shots = itertools.repeat(gradient())
+        arguments = {"skip_unchanged": True}
+        assert dispatch(session, "screen_shot", arguments)["type"] == "image"
+        assert dispatch(session, "screen_shot", arguments)["message"] == "Unchanged since screenshot 1"
+        # 不要求跳过时总是返回截图
+        assert dispatch(session, "screen_shot", {})["message"] == "Screenshot 2"
+    finally:
+        session.shutdown()
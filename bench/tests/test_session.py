@@ -0,0 +1,59 @@
+import json
+import threading
+
+from minium_mcp_server.commands import dispatch
+from minium_mcp_server.session import Session
+
+
+def current_page(session):
+    result = dispatch(session, "get_current_page", {})
+    assert result["status"] == "success", result
+    return json.loads(result["message"].strip("`").removeprefix("json"))
+
+
+def test_page_stack_follows_navigation(launcher, project):
+    session = Session(project, factory=launcher)
+    session.open()
+    try:
+        # 第一次导航之前没有读取过页面栈
+        dispatch(session, "navigate_to", {"path": "/pages/list/list"})
+        assert current_page(session)["stack"] == ["/pages/index/index", "/pages/list/list"]
+        dispatch(session, "navigate_to", {"path": "/pages/detail/detail"})
+        assert current_page(session)["stack"] == ["/pages/index/index", "/pages/list/list", "/pages/detail/detail"]
+        dispatch(session, "navigate_back", {})
+        page = current_page(session)
+        assert page["path"] == "/pages/list/list"
+        assert page["stack"] == ["/pages/index/index", "/pages/list/list"]
+    finally:
+        session.shutdown()
+
+
+def test_unknown_navigate_back_resyncs_the_page_stack(launcher, project):
+    session = Session(project, factory=launcher)
+    session.open()
+    try:
+        dispatch(session, "navigate_to", {"path": "/pages/list/list"})
+        dispatch(session, "navigate_to", {"path": "/pages/detail/detail"})
+        # 页面栈与开发者工具不一致时，无法应用的返回事件使下次读取重新同步
+        session.page_stack = [(999, "/pages/detail/detail")]
+        dispatch(session, "navigate_back", {})
+        assert current_page(session)["stack"] == ["/pages/index/index", "/pages/list/list"]
+    finally:
+        session.shutdown()
+
+
+def test_route_events_are_applied_by_the_calling_thread(launcher, project):
+    session = Session(project, factory=launcher)
+    session.open()
+    try:
+        page = session.current_page()
+        stack = list(session.page_stack)
+        # 模拟页面内的跳转：minium 在回调线程中通知，不修改会话状态
+        thread = threading.Thread(target=session.mini.app.navigate_to, args=("/pages/list/list",))
+        thread.start()
+        thread.join()
+        assert session.page is page and session.page_stack == stack
+        assert session.get_page_stack() == ["/pages/index/index", "/pages/list/list"]
+        assert session.current_page().path == "pages/list/list"
+    finally:
+        session.shutdown()
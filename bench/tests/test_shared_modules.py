@@ -0,0 +1,27 @@
+import os
+import filecmp
+
+import pytest
+
+from conftest import ROOT
+
+STDIO = os.path.join(ROOT, "stdio", "src", "minium_mcp_server")
+WEBAPI = os.path.join(ROOT, "webapi", "src", "minium_mcp_server")
+# 每个传输方式自己的入口，其余同名模块在两个包中必须相同
+ENTRY_POINTS = {"__init__.py", "server.py"}
+
+SHARED = sorted(
+    name for name in os.listdir(WEBAPI)
+    if name.endswith(".py") and name not in ENTRY_POINTS and os.path.isfile(os.path.join(STDIO, name))
+)
+
+
+def test_shared_modules_are_found():
+    assert {"commands.py", "session.py", "tools.py"} <= set(SHARED)
+
+
+@pytest.mark.parametrize("name", SHARED)
+def test_shared_module_copies_are_identical(name):
+    assert filecmp.cmp(os.path.join(WEBAPI, name), os.path.join(STDIO, name), shallow=False), (
+        f"stdio/src/minium_mcp_server/{name} differs from the webapi copy: edit webapi and copy it over"
+    )
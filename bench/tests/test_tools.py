@@ -0,0 +1,23 @@
+import pytest
+
+from minium_mcp_server.tools import get_command, parse_timeouts
+
+
+def test_validate_fills_defaults():
+    arguments = get_command("screen_shot").validate({"format": None})
+    assert arguments["format"] == "png"
+    assert arguments["skip_unchanged"] is False
+
+
+def test_validate_accepts_null_for_required_untyped_value():
+    command = get_command("page_set_data")
+    assert command.validate({"key": "a", "value": None}) == {"key": "a", "value": None}
+    with pytest.raises(ValueError, match="missing 'value'"):
+        command.validate({"key": "a"})
+    with pytest.raises(ValueError, match="'key' must be of type string"):
+        command.validate({"key": None, "value": 1})
+
+
+def test_parse_timeouts_skips_invalid_entries(caplog):
+    assert parse_timeouts("navigate_to=90; screen_shot=abc;tap=-1;;wait_for=2.5") == {"navigate_to": 90, "wait_for": 2.5}
+    assert "screen_shot=abc" in caplog.text
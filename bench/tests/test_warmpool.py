@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from minium_mcp_server.session import Session
+from minium_mcp_server.warmpool import WarmPool, parse_projects
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_parse_projects():
+    assert parse_projects("/a=2; /b=1;") == {"/a": 2, "/b": 1}
+
+
+def test_prelaunches_configured_projects(launcher, project):
+    pool = WarmPool(launcher, projects={project: 1})
+    try:
+        assert wait_until(lambda: pool.ready() == {project: 1})
+        assert len(launcher.instances) == 1
+    finally:
+        pool.close()
+    assert launcher.live(project) == []
+
+
+def test_no_refill_while_the_project_is_in_use(launcher, project):
+    pool = WarmPool(launcher, projects={project: 1})
+    try:
+        assert wait_until(lambda: pool.ready() == {project: 1})
+        session = Session(project, factory=launcher, warm_pool=pool)
+        assert session.open() is launcher.instances[0]
+        time.sleep(0.1)
+        # 使用中的项目不预热第二个实例，避免占用同一个自动化端口
+        assert len(launcher.instances) == 1
+        session.shutdown()
+        assert wait_until(lambda: pool.ready() == {project: 1})
+        assert len(launcher.live(project)) == 1
+    finally:
+        pool.close()
+
+
+def test_reopen_keeps_one_instance_per_project(launcher, project):
+    pool = WarmPool(launcher, size=1)
+    try:
+        session = Session(project, factory=launcher, warm_pool=pool)
+        session.open()
+        session.open()
+        time.sleep(0.1)
+        assert len(launcher.live(project)) == 1
+        assert pool.ready() == {}
+        session.shutdown()
+        assert wait_until(lambda: pool.ready() == {project: 1})
+    finally:
+        pool.close()
+
+
+def test_failed_launch_releases_the_project(launcher, project, monkeypatch):
+    def failing(project_path):
+        raise RuntimeError("devtools did not start")
+
+    monkeypatch.setattr("minium_mcp_server.session.launch_with_retry", lambda factory, path: factory(path))
+    pool = WarmPool(launcher, size=1)
+    try:
+        session = Session(project, factory=failing, warm_pool=pool)
+        with pytest.raises(RuntimeError):
+            session.open()
+        # 启动失败后项目不再被占用，预热池可以补充实例
+        assert wait_until(lambda: pool.ready() == {project: 1})
+    finally:
+        pool.close()
@@ -0,0 +1,40 @@
+from minium_mcp_server import wxml
+
+SOURCE = (
+    '<view id="root">'
+    '<text class="title">Hello</text>'
+    '<view class="item" bindtap="open">A</view>'
+    '<view class="item">B</view>'
+    '</view>\n'
+    '.title { color: red; }'
+)
+
+
+def test_parse_splits_markup_and_style():
+    document = wxml.parse(SOURCE)
+    assert document.markup.endswith("</view>")
+    assert document.style.strip() == ".title { color: red; }"
+    assert [node.path for _, node in document.walk()] == [
+        "view#root", "view#root/text.title[0]", "view#root/view.item[0]", "view#root/view.item[1]",
+    ]
+
+
+def test_compact_outline():
+    assert wxml.parse(SOURCE).compact().splitlines() == [
+        "view#root",
+        '  text.title "Hello"',
+        '  view.item [bindtap=open] "A"',
+        '  view.item "B"',
+    ]
+
+
+def test_diff_reports_changed_inserted_and_removed_nodes():
+    old = wxml.parse(SOURCE)
+    new = wxml.parse(SOURCE.replace("Hello", "Bye").replace('<view class="item">B</view>', '<image src="a.png"/>'))
+    assert wxml.diff(old, new).splitlines() == [
+        "- view#root/view.item[1]",
+        "~ view#root/text.title[0]: text: 'Hello' -> 'Bye'",
+        "+ view#root/image[0]",
+        "    image",
+    ]
+    assert wxml.diff(old, wxml.parse(SOURCE)) == ""
@@ -1,3 +1,8 @@
+import time
+import logging
+
+_started = time.perf_counter()
+
 from . import server
 import asyncio
 import argparse
@@ -10,6 +15,11 @@ def main():
                        help='Path to WeChat MiniProgram project')
     
     args = parser.parse_args()
+    # stdout 用于 MCP 协议，日志输出到 stderr
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logger = logging.getLogger('minium-mcp-server')
+    logger.setLevel(logging.INFO)
+    logger.info(f"Modules loaded in {(time.perf_counter() - _started) * 1000:.0f}ms")
     asyncio.run(server.main(args.path))
 
 
@@ -0,0 +1,38 @@
+import asyncio
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from .session import Session
+
+logger = logging.getLogger('minium-mcp-server')
+
+
+class MiniumDriver:
+    """Runs every Minium call on one dedicated worker thread.
+
+    The worker owns the session and its `minium.Minium` instance: the devtools
+    connection is opened there and all handlers go through `call()`, so
+    blocking devtools round trips never run on the asyncio loop. The
+    executor's queue serializes requests in arrival order; a request cancelled
+    before the worker picks it up is dropped without touching the devtools.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="minium-driver")
+
+    async def start(self) -> None:
+        """Launch and connect the devtools on the worker thread now, instead of on the first call."""
+        await asyncio.wrap_future(self._executor.submit(self.session.open))
+
+    async def call(self, fn: Callable, *args):
+        """Run `fn(session, *args)` on the worker thread and await its result."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Queue `fn(session, *args)` on the worker thread, from any thread."""
+        return self._executor.submit(fn, self.session, *args)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,234 @@
+"""
+Health checks of developer tool connections.
+
+`Watchdog` pings every open session on an interval, skipping sessions that
+are running a command or just ran one successfully. When the devtools miss
+several pings in a row, the session is marked as recovering and reconnected
+in the background: the devtools are relaunched, retried with exponential backoff,
+and the last known page is opened again. Commands arriving meanwhile wait for
+the recovery, or with `MINIUM_RECOVERY_MODE=fail` fail at once.
+"""
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Iterable
+
+logger = logging.getLogger('minium-mcp-server')
+
+# 检查连接的间隔（秒），0 表示不检查
+HEALTH_INTERVAL = float(os.environ.get('MINIUM_HEALTH_INTERVAL', 15))
+# 单次检查等待开发者工具响应的最长时间（秒）
+PING_TIMEOUT = float(os.environ.get('MINIUM_PING_TIMEOUT', 10))
+# 连续多少次检查失败后重新启动开发者工具
+PING_FAILURES = int(os.environ.get('MINIUM_PING_FAILURES', 2))
+# queue：恢复期间的命令等待恢复完成；fail：立即返回错误
+RECOVERY_MODE = os.environ.get('MINIUM_RECOVERY_MODE', 'queue')
+# queue 模式下命令等待恢复的最长时间（秒）
+RECOVERY_WAIT = float(os.environ.get('MINIUM_RECOVERY_WAIT', 60))
+# 恢复失败后再次尝试的最长间隔（秒），间隔从检查间隔开始每次翻倍
+MAX_RECOVERY_BACKOFF = 300
+# 等待恢复时检查取消的间隔（秒）
+GATE_POLL = 0.1
+
+HEALTHY = "healthy"
+RECOVERING = "recovering"
+DOWN = "down"
+
+# 这些命令自己会重新建立或关闭连接，恢复期间不拦截
+UNGATED = ("open", "shutdown")
+
+
+class Health:
+    """Connection state of one session, shared by the watchdog and the command path."""
+
+    def __init__(self, mode: str = RECOVERY_MODE, wait: float = RECOVERY_WAIT):
+        self.mode = mode
+        self.wait = wait
+        self.state = HEALTHY
+        self.error: str | None = None
+        self.failures = 0
+        self.retry_at = 0.0
+        # 连续失败的检查次数
+        self.missed = 0
+        # 正在执行的命令数，批量命令会嵌套
+        self.running = 0
+        # 最近一次命令成功结束的时间
+        self.answered_at = float("-inf")
+        self._lock = threading.Lock()
+        self._settled = threading.Event()
+        self._settled.set()
+
+    @property
+    def healthy(self) -> bool:
+        return self.state == HEALTHY
+
+    def lost(self, error: str) -> bool:
+        """Mark the connection as lost; returns False when a recovery is already running."""
+        with self._lock:
+            if self.state == RECOVERING:
+                return False
+            self.state = RECOVERING
+            self.error = error
+            self._settled.clear()
+            return True
+
+    @contextmanager
+    def command(self):
+        """Track a command using the devtools; a successful one counts as a heartbeat."""
+        with self._lock:
+            self.running += 1
+        try:
+            yield
+            self.answered_at = time.monotonic()
+            self.missed = 0
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def active(self, within: float) -> bool:
+        """Whether a command is running or one succeeded in the last `within` seconds."""
+        return self.running > 0 or time.monotonic() - self.answered_at < within
+
+    def restored(self) -> None:
+        with self._lock:
+            self.state = HEALTHY
+            self.error = None
+            self.failures = 0
+            self.missed = 0
+            self._settled.set()
+
+    def failed(self, error: str, interval: float) -> None:
+        """Record a failed recovery and schedule the next attempt."""
+        with self._lock:
+            self.state = DOWN
+            self.error = error
+            self.failures += 1
+            self.retry_at = time.monotonic() + min(interval * 2 ** (self.failures - 1), MAX_RECOVERY_BACKOFF)
+            self._settled.set()
+
+    def due(self) -> bool:
+        """Whether a failed session should be reconnected again."""
+        return self.state == DOWN and time.monotonic() >= self.retry_at
+
+    def gate(self, command: str, expires: float | None = None, cancelled: threading.Event | None = None) -> bool:
+        """Let `command` through, wait for a running recovery, or raise.
+
+        Returns False when the caller's deadline `expires` (`time.monotonic()`)
+        passes or `cancelled` is set before the recovery settles.
+        """
+        if self.state == HEALTHY or command in UNGATED:
+            return True
+        if self.state == RECOVERING:
+            if self.mode == "fail":
+                raise RuntimeError(f"Developer tool connection lost ({self.error}), reconnecting; try again later")
+            limit = time.monotonic() + self.wait
+            stop = limit if expires is None else min(limit, expires)
+            while not self._settled.wait(max(0.0, min(GATE_POLL, stop - time.monotonic()))):
+                if (cancelled is not None and cancelled.is_set()) or time.monotonic() >= stop:
+                    break
+            if self.state == HEALTHY:
+                return True
+            if self.state == RECOVERING:
+                if time.monotonic() < limit:
+                    # 调用方超时或取消，不再等待
+                    return False
+                raise RuntimeError(f"Developer tool is still reconnecting after {self.wait:.0f}s")
+        retry_in = max(0.0, self.retry_at - time.monotonic())
+        raise RuntimeError(
+            f"Developer tool is unreachable ({self.error}), next reconnect in {retry_in:.0f}s; "
+            f"call minium_open to retry now"
+        )
+
+
+class Watchdog:
+    """Pings open sessions on a background thread and reconnects dead ones.
+
+    Pings are not serialized with commands, so a session busy with a long
+    command is not pinged, and only `failures` consecutive failed pings
+    relaunch the devtools. `sessions()` returns `(name, session)` pairs to check. `recover(name,
+    session)` runs `session.reconnect()` serialized with the session's
+    commands: under its lock in the web bridge, on the driver thread in the
+    stdio server.
+    """
+
+    def __init__(self, sessions: Callable[[], Iterable[tuple[str, Any]]],
+                 recover: Callable[[str, Any], None],
+                 interval: float = HEALTH_INTERVAL, timeout: float = PING_TIMEOUT,
+                 failures: int = PING_FAILURES):
+        self.sessions = sessions
+        self.recover = recover
+        self.interval = interval
+        self.timeout = timeout
+        self.failures = max(failures, 1)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        # 检查在独立线程中执行，卡住的检查不会阻塞看门狗
+        self._pings = ThreadPoolExecutor(max_workers=4, thread_name_prefix="minium-ping")
+
+    def start(self) -> "Watchdog":
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="minium-watchdog", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+        self._pings.shutdown(wait=False, cancel_futures=True)
+
+    def check(self) -> None:
+        """Check every session once."""
+        for name, session in list(self.sessions()):
+            health = session.health
+            if health.due():
+                if health.lost(health.error or "unreachable"):
+                    self._start_recovery(name, session)
+                continue
+            if not health.healthy or session.mini is None or health.active(self.interval):
+                # 命令执行中的开发者工具可能暂时不响应检查
+                continue
+            error = self._ping(session)
+            if error is None:
+                health.missed = 0
+                continue
+            if health.active(self.interval):
+                # 检查期间开始了命令，失败不计入
+                continue
+            health.missed += 1
+            if health.missed < self.failures:
+                logger.info(f"Developer tool of {name} missed a health check ({health.missed}/{self.failures}): {error}")
+                continue
+            if health.lost(error):
+                logger.warning(f"Developer tool of {name} is not responding: {error}")
+                self._start_recovery(name, session)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Health check failed: {e}")
+
+    def _ping(self, session) -> str | None:
+        try:
+            self._pings.submit(session.ping).result(self.timeout)
+        except FutureTimeoutError:
+            return f"no response in {self.timeout:.0f}s"
+        except Exception as e:
+            return str(e) or type(e).__name__
+        return None
+
+    def _start_recovery(self, name: str, session) -> None:
+        threading.Thread(target=self._recover, args=(name, session), name="minium-recovery", daemon=True).start()
+
+    def _recover(self, name: str, session) -> None:
+        started = time.perf_counter()
+        try:
+            self.recover(name, session)
+        except Exception as e:
+            session.health.failed(str(e), self.interval)
+            logger.error(f"Failed to reconnect the developer tool of {name}: {e}")
+            return
+        logger.info(f"Reconnected the developer tool of {name} in {time.perf_counter() - started:.1f}s")
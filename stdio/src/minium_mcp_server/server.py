@@ -1,14 +1,26 @@
 import os
 import sys
+import time
+import asyncio
+import threading
 import logging
-import minium
-import base64
 from mcp.server import NotificationOptions, Server
 from mcp.server.models import InitializationOptions
 from mcp import types
 from typing import Any
 import mcp.server.stdio
 
+from . import metrics
+from .commands import dispatch, timed_out
+from .driver import MiniumDriver
+from .health import Watchdog
+from .macro import RECORDER
+from .metrics import METRICS, label, size_of
+from .session import Session, launch
+from .tools import TIMEOUTS, TOOLS, get_command, to_content
+from .tracing import TRACER
+from .warmpool import WarmPool
+
 # reconfigure UnicodeEncodeError prone default (i.e. windows-1252) to utf-8
 if sys.platform == "win32" and os.environ.get('PYTHONIOENCODING') is None:
     sys.stdin.reconfigure(encoding="utf-8")
@@ -16,326 +28,15 @@ if sys.platform == "win32" and os.environ.get('PYTHONIOENCODING') is None:
     sys.stderr.reconfigure(encoding="utf-8")
 
 logger = logging.getLogger('minium-mcp-server')
-logger.info("Starting Minium MCP Server")
 
-async def main(project_path: str):
+def create_server(driver: MiniumDriver, project_path: str) -> Server:
+    """The MCP server, running every tool call through `driver`."""
     server = Server("minium-mcp-server")
-    # 根据操作系统设置开发者工具cli路径
-    if sys.platform == 'darwin':  # macOS
-        dev_tool_path = '/Applications/wechatwebdevtools.app/Contents/MacOS/cli'
-    elif sys.platform == 'win32':  # Windows
-        dev_tool_path = 'C:/Program Files (x86)/Tencent/微信web开发者工具/cli.bat'
-    else:
-        raise Exception("Unsupported operating system")
-
-    mini = minium.Minium({
-        "project_path": project_path, # 替换成你的【小程序项目目录地址】
-        "dev_tool_path": dev_tool_path,
-        "debug_mode": "error"
-    })
-    mini.app.enable_log()
 
     @server.list_tools()
     async def handle_list_tools() -> list[types.Tool]:
         """List available tools"""
-        return [
-            types.Tool(
-                name="minium_get_system_info",
-                description="Get system info",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                }
-            ),
-            types.Tool(
-                name="minium_shutdown",
-                description="Shutdown the developer tool",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                }
-            ),
-            types.Tool(
-                name="minium_screen_shot",
-                description="Take a screenshot of the current page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                },
-            ),
-            types.Tool(
-                name="minium_get_all_pages_path_and_method",
-                description="Get paths of all pages and navigate method of each page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                }
-            ),
-            types.Tool(
-                name="minium_get_navigate_method_of_page",
-                description="Get navigate method of a page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "path": {"type": "string", "description": "Page path"},
-                    },
-                    "required": ["path"],
-                }
-            ),
-            types.Tool(
-                name="minium_go_home",
-                description="Go to the home page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                }
-            ),
-            types.Tool(
-                name="minium_navigate_to",
-                description="Navigate to a page. Please get path of all pages before using this tool.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "path": {"type": "string", "description": "Page path"},
-                        "query": {"type": "string", "description": "Query parameters"},
-                    },
-                    "required": ["path"],
-                }
-            ),
-            types.Tool(
-                name="minium_navigate_back",
-                description="Navigate back to the previous page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                }
-            ),
-            types.Tool(
-                name="minium_switch_tab",
-                description="Switch to a tab. Please get path of all pages before using this tool.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "path": {"type": "string", "description": "Page path"},
-                    },
-                    "required": ["path"],
-                }
-            ),
-            types.Tool(
-                name="minium_redirect_to",
-                description="Redirect to a page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "path": {"type": "string", "description": "Page path"},
-                        "query": {"type": "string", "description": "Query parameters"},
-                    },
-                    "required": ["path"],
-                }
-            ),
-            types.Tool(
-                name="minium_relaunch",
-                description="Close all pages and open a new one",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "path": {"type": "string", "description": "Page path"},
-                        "query": {"type": "string", "description": "Query parameters"},
-                    },
-                    "required": ["path"],
-                }
-            ),
-            # types.Tool(
-            #     name="evaluate",
-            #     description="Evaluate a JavaScript(es5) code",
-            #     inputSchema={
-            #         "type": "object",
-            #         "properties": {
-            #             "code": {"type": "string", "description": "Script code"},
-            #             "params": {"type": "string", "description": "Script parameters"},
-            #         },
-            #         "required": ["code", "params"],
-            #     }
-            # ),
-            types.Tool(
-                name="minium_call_method",
-                description="Call a method of page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "method": {"type": "string", "description": "Method name"},
-                        "params": {"type": "object", "description": "Method parameters"},
-                    },
-                    "required": ["method", "params"],
-                }
-            ),
-            types.Tool(
-                name="minium_page_scroll_to",
-                description="Scroll to the specified position of an page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "top": {"type": "number", "description": "Scroll to the top"},
-                        "duration": {"type": "number", "description": "Scroll duration"},
-                    },
-                    "required": ["top", "duration"],
-                }
-            ),
-            types.Tool(
-                name="page_get_wxml",
-                description="Get Dom structure of an page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                }
-            ),
-            types.Tool(
-                name="minium_page_get_data",
-                description="Get data of an page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                }
-            ),
-            types.Tool(
-                name="minium_page_set_data",
-                description="Set data of an page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "key": {"type": "string", "description": "key of data"},
-                        "value": {"type": "any", "description": "value of data"},
-                    },
-                    "required": [],
-                }
-            ),
-            types.Tool(
-                name="minium_tap",
-                description="Tap an element",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "selector": {
-                            "type": "string", 
-                            "description": "CSS selector or XPath expression"
-                        },
-                    },
-                    "required": ["selector"],
-                }
-            ),
-            types.Tool(
-                name="minium_long_press",
-                description="Long press an element",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "selector": {
-                            "type": "string", 
-                            "description": "CSS selector or XPath expression"
-                        },
-                    },
-                    "required": ["selector"],
-                }
-            ),
-            types.Tool(
-                name="minium_move",
-                description="Perform gestures on the element",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "selector": {
-                            "type": "string", 
-                            "description": "CSS selector or XPath expression"
-                        },
-                        "top": {
-                            "type": "number",
-                            "description": "Move to the top coordinate"
-                        },
-                        "left": {
-                            "type": "number", 
-                            "description": "Move to the left coordinate"
-                        },
-                    },
-                    "required": ["selector", "top", "left"],
-                }
-            ),
-            types.Tool(
-                name="minium_input",
-                description="Input text to an element",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "selector": {
-                            "type": "string", 
-                            "description": "CSS selector or XPath expression"
-                        },
-                        "text": {
-                            "type": "string", 
-                            "description": "Text to input"
-                        },
-                    },
-                    "required": ["selector", "text"],
-                }
-            ),
-            types.Tool(
-                name="minium_switch",
-                description="Change the switch status of an element",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "selector": {
-                            "type": "string", 
-                            "description": "CSS selector or XPath expression"
-                        },
-                    },
-                    "required": ["selector"],
-                }
-            ),
-            types.Tool(
-                name="minium_slide_to",
-                description="Slide to the specified position of an element",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "selector": {
-                            "type": "string", 
-                            "description": "CSS selector or XPath expression"
-                        },
-                        "value": {
-                            "type": "number", 
-                            "description": "Slide value"
-                        },
-                    },
-                    "required": ["selector", "value"],
-                }
-            ),
-            types.Tool(
-                name="minium_pick",
-                description="Pick an option of an element",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "selector": {
-                            "type": "string", 
-                            "description": "CSS selector or XPath expression"
-                        },
-                        "option": {
-                            "type": "string", 
-                            "description": "Option value"
-                        },
-                    },
-                    "required": ["selector", "option"],
-                }
-            )
-        ]
+        return TOOLS
 
     @server.call_tool()
     async def handle_call_tool(
@@ -343,161 +44,102 @@ async def main(project_path: str):
     ):
         """Handle tool execution requests"""
         logger.info(f"Received call tool request: {name} with args: {arguments}")
-        try:
-            match name.replace("minium_", ""):
-                case "get_system_info":
-                    return [types.TextContent(type="text", text=f"Error: {mini.get_system_info()}")]
-                case "shutdown":
-                    mini.shutdown()
-                    return [types.TextContent(type="text", text=f"Success: Shutdown")]
-                case "screen_shot":
-                    output_path = os.path.join(project_path, "screenshots/{}_screen_shot.png".format(mini.app.get_current_page().page_id))
-                    if not os.path.isdir(os.path.dirname(output_path)):
-                        os.mkdir(os.path.dirname(output_path))
-                    if os.path.isfile(output_path):
-                        os.remove(output_path)
-                    mini.app.screen_shot(output_path)
-                    # 获取截图
-                    with open(output_path, "rb") as f:
-                        image = f.read()
-                        # 返回base64编码的图片
-                        image_base64 = base64.b64encode(image).decode('utf-8')
-                    # 删除截图
-                    os.remove(output_path)
-                    return [types.ImageContent(type="image", mimeType="image/png", data=image_base64)]
-                
-                case "get_all_pages_path_and_method":
-                    all_pages_path = mini.app.get_all_pages_path()
-                    with open(os.path.join(project_path, "app.json"), "r", encoding="utf-8") as file:  # 建议指定 encoding
-                        app = json.load(file)  # 解析 JSON 文件 → Python 字典/列表
-                        tabbar = app.get('tabBar').get('list')
-                    result = []
-                    for path in all_pages_path:
-                        if path in [item.get('pagePath') for item in tabbar]:
-                            result.append({
-                                "path": f"/{path}",
-                                "method": "switch_tab"
-                            })
-                        else:
-                            result.append({
-                                "path": f"/{path}",
-                                "method": "navigate_to"
-                            })
-                    return [types.TextContent(type="text", text=f"```json\n{json.dumps(result, indent=4, ensure_ascii=False)}```")]
-                case "get_navigate_method_of_page":
-                    with open(os.path.join(project_path, "app.json"), "r", encoding="utf-8") as file:  # 建议指定 encoding
-                        app = json.load(file)  # 解析 JSON 文件 → Python 字典/列表
-                        tabbar = app.get('tabBar').get('list')
-                        print(tabbar)
-                        if arguments["path"] in [item.get('pagePath') for item in tabbar]:
-                            return [types.TextContent(type="text", text=f"Success: switch_tab")]
-                        else:
-                            return [types.TextContent(type="text", text=f"Success: navigate_to")]
+        command_label = label(name)
+        submitted = time.perf_counter()
+        started = False
 
-                case "go_home":
-                    mini.app.go_home()
-                    return [types.TextContent(type="text", text=f"Success: Go home")]
-                case "navigate_to":
-                    mini.app.navigate_to(arguments["path"], arguments["query"])
-                    return [types.TextContent(type="text", text=f"Success: Navigate to")]
-                case "navigate_back":
-                    mini.app.navigate_back()
-                    return [types.TextContent(type="text", text=f"Success: Navigate back")]
-                case "switch_tab":
-                    mini.app.switch_tab(arguments["path"])
-                    return [types.TextContent(type="text", text=f"Success: Switch tab")]
-                case "redirect_to":
-                    mini.app.redirect_to(arguments["path"], arguments["query"])
-                    return [types.TextContent(type="text", text=f"Success: Redirect to")]
+        def run(session, name, arguments):
+            nonlocal started
+            started = True
+            METRICS.observe(command_label, "queue", time.perf_counter() - submitted)
+            # 驱动线程中没有调用方的上下文，显式传入父 span
+            with METRICS.phase(command_label, "devtools"), TRACER.span("devtools", parent, command=command_label):
+                return dispatch(session, name, arguments)
 
-                case "evaluate":
-                    msg_id = mini.app.evaluate(arguments["code"], arguments["params"], sync=False)
-                    # 你可以做一些其他操作后, 再通过get_async_response方法获取前面注入代码的运行结果
-                    result = mini.app.get_async_response(msg_id, 5)
-                    return [types.TextContent(type="text", text=f"Success: Evaluate, Result: {result}")]
-                case "call_method":
-                    page = mini.app.get_current_page()
-                    result = page.call_method(arguments["method"], arguments["params"])
-                    return [types.TextContent(type="text", text=f"Success: Call method, Result: {result}")]
-                case "page_scroll_to":
-                    page = mini.app.get_current_page()
-                    page.scroll_to(arguments["top"], arguments["duration"])
-                    return [types.TextContent(type="text", text=f"Success: Page scroll to, Top: {arguments['top']}, Duration: {arguments['duration']}")]
-                case "page_get_wxml":
-                    page = mini.app.get_current_page()
-                    wxml = page.wxml
-                    # 分离wxml和css
-                    # 查询最后一个tag的位置
-                    last_tag_index = wxml.rfind("</")
-                    # 分割wxml和css
-                    wxml_content = wxml[:last_tag_index]
-                    css_content = wxml[last_tag_index:]
-                    first_tag_index = css_content.find(">")
-                    wxml_content += css_content[:first_tag_index+1]
-                    css_content = css_content[first_tag_index+1:]
+        with METRICS.track(command_label), TRACER.span("tool", command=command_label, session=project_path) as span:
+            parent = TRACER.context()
+            METRICS.observe_size(command_label, "request", size_of(arguments))
+            try:
+                command = get_command(name)
+                # 先校验参数，无效的 timeout 等返回参数错误
+                arguments = command.validate(arguments)
+                # timeout 保留在参数中，minium_wait_for 用它作为等待时间
+                deadline = command.deadline(arguments.get("timeout"))
+                if driver.session.mini is None and not command.stateless and command.name != "open":
+                    # 第一个命令会先启动开发者工具，启动时间不计入命令本身的截止时间
+                    deadline += TIMEOUTS["launch"]
+                # 超时或被 MCP 取消后，结束在线程中对连接恢复的等待
+                gate_cancelled = threading.Event()
+                recovering = not driver.session.health.healthy
+                try:
+                    # 超时或被 MCP 取消时，尚未开始执行的调用会从驱动线程的队列中移除；
+                    # 已在执行的调用无法中断，结束后才处理后续命令
+                    async with asyncio.timeout(deadline):
+                        if recovering:
+                            # 连接恢复期间在线程中等待，不阻塞事件循环；等待时间计入截止时间
+                            if not await asyncio.to_thread(driver.session.health.gate, command.name,
+                                                           time.monotonic() + deadline, gate_cancelled):
+                                raise TimeoutError
+                            recovering = False
+                        result = await driver.call(run, name, arguments)
+                except TimeoutError:
+                    phase = "recovery" if recovering else "devtools" if started else "queue"
+                    result = timed_out(command_label, deadline, phase)
+                finally:
+                    gate_cancelled.set()
+                RECORDER.record(command.name, command.tool_name, arguments, result, submitted)
+                if result.get("status") == "error":
+                    METRICS.error(command_label)
+                    if span is not None:
+                        span.fail(result.get("message"))
+                    return [types.TextContent(type="text", text=f"Error: {result.get('message')}")]
+                METRICS.observe_size(command_label, "response", size_of(result))
+                with METRICS.phase(command_label, "serialize"):
+                    return to_content(result)
+            except Exception as e:
+                METRICS.error(command_label)
+                if span is not None:
+                    span.fail(str(e))
+                logger.error(f"Error executing tool: {e}")
+                return [types.TextContent(type="text", text=f"Error: {str(e)}")]
 
-                    return [types.TextContent(type="text", text=f"```xml\n{wxml_content}```\n\n```css\n{css_content}```")]
-                case "page_get_data":
-                    page = mini.app.get_current_page()
-                    return [types.TextContent(type="text", text=f"```json\n{json.dumps(page.data, indent=4, ensure_ascii=False)}```")]
-                case "page_set_data":
-                    page = mini.app.get_current_page()
-                    data = page.data
-                    data[arguments['key']] = arguments['value']
-                    return [types.TextContent(type="text", text=f"```json\n{json.dumps(page.data, indent=4, ensure_ascii=False)}```")]
+    return server
 
-                case "tap":
-                    page = mini.app.get_current_page()
-                    el = page.get_element(arguments["element"])
-                    el.tap()
-                    return [types.TextContent(type="text", text=f"Success: Tap")]
-                case "long_press":
-                    page = mini.app.get_current_page()
-                    el = page.get_element(arguments["element"])
-                    el.long_press()
-                    return [types.TextContent(type="text", text=f"Success: Long press")]
-                case "move":
-                    page = mini.app.get_current_page()
-                    el = page.get_element(arguments["element"])
-                    el.move(arguments["left"], arguments["top"])
-                    return [types.TextContent(type="text", text=f"Success: Move to, Top: {arguments['top']}, Left: {arguments['left']}")]
-                case "input":
-                    page = mini.app.get_current_page()
-                    el = page.get_element(arguments["element"])
-                    el.input(arguments["text"])
-                    return [types.TextContent(type="text", text=f"Success: Input, Text: {arguments['text']}")]
-                case "switch":
-                    page = mini.app.get_current_page()
-                    el = page.get_element(arguments["element"])
-                    el.switch()
-                    return [types.TextContent(type="text", text=f"Success: Switch")]
-                case "slide_to":
-                    page = mini.app.get_current_page()
-                    el = page.get_element(arguments["element"])
-                    el.slide_to(arguments["value"])
-                    return [types.TextContent(type="text", text=f"Success: Slide to, Value: {arguments['value']}")]
-                case "pick":
-                    page = mini.app.get_current_page()
-                    el = page.get_element(arguments["element"])
-                    el.pick(arguments["option"])
-                    return [types.TextContent(type="text", text=f"Success: Pick, Option: {arguments['option']}")]
-                case _:
-                    raise ValueError(f"Unknown tool: {name}")
-        except Exception as e:
-            logger.error(f"Error executing tool: {e}")
-            return [types.TextContent(type="text", text=f"Error: {str(e)}")]
+async def main(project_path: str):
+    logger.info("Starting Minium MCP Server")
+    started = time.perf_counter()
+    # 所有 minium 调用都在独立的驱动线程中执行，避免阻塞事件循环
+    # 开发者工具在第一个需要它的命令（或 minium_open）时才启动，MCP 握手无需等待
+    # 重新打开项目时可以直接使用预热的实例
+    warm_pool = WarmPool(launch)
+    driver = MiniumDriver(Session(project_path, warm_pool=warm_pool, connect_on_demand=True))
+    server = create_server(driver, project_path)
+    # 开发者工具断开后在驱动线程中重连，与工具调用串行
+    watchdog = Watchdog(
+        lambda: [(project_path, driver.session)],
+        lambda name, session: driver.submit(Session.reconnect).result(),
+    ).start()
+
+    if metrics.METRICS_PORT:
+        metrics.serve(metrics.METRICS_PORT)
 
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        logger.info("Server running with stdio transport")
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="minium",
-                server_version="0.1.0",
-                capabilities=server.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
+    try:
+        async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+            logger.info(f"Server running with stdio transport, ready in {(time.perf_counter() - started) * 1000:.0f}ms; "
+                        f"the developer tool connects on the first call")
+            await server.run(
+                read_stream,
+                write_stream,
+                InitializationOptions(
+                    server_name="minium",
+                    server_version="0.1.0",
+                    capabilities=server.get_capabilities(
+                        notification_options=NotificationOptions(),
+                        experimental_capabilities={},
+                    ),
                 ),
-            ),
-        )
+            )
+    finally:
+        watchdog.close()
+        driver.close()
+        warm_pool.close()
\ No newline at end of file
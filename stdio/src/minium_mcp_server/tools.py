@@ -0,0 +1,489 @@
+"""
+Declarative registry of the Minium commands.
+
+Each command is described once here. The registry is built at import time and
+provides the cached MCP tool list, a precompiled argument validator per command
+and an O(1) lookup by either the MCP tool name or the bridge command name.
+"""
+import os
+import logging
+from dataclasses import dataclass, field
+from typing import Any
+
+from mcp import types
+
+logger = logging.getLogger('minium-mcp-server')
+
+SELECTOR = {"type": "string", "description": "CSS selector or XPath expression"}
+PAGE_PATH = {"type": "string", "description": "Page path"}
+QUERY = {"type": "object", "description": "Query parameters"}
+TIMEOUT = {"type": "number", "description": "Deadline of this call in seconds, instead of the tool's default"}
+
+# 各类命令的默认截止时间（秒）：只读、操作、导航、启动开发者工具
+TIMEOUTS = {
+    "read": float(os.environ.get('MINIUM_TIMEOUT_READ', 15)),
+    "action": float(os.environ.get('MINIUM_TIMEOUT_ACTION', 30)),
+    "navigate": float(os.environ.get('MINIUM_TIMEOUT_NAVIGATE', 60)),
+    "launch": float(os.environ.get('MINIUM_TIMEOUT_LAUNCH', 180)),
+}
+
+
+def parse_timeouts(spec: str) -> dict[str, float]:
+    """Parse `name=seconds;name=seconds`, skipping invalid entries."""
+    timeouts = {}
+    for item in spec.split(";"):
+        name, _, value = item.partition("=")
+        if not name.strip():
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            seconds = 0
+        if not seconds > 0:
+            logger.warning(f"Ignoring invalid MINIUM_TOOL_TIMEOUTS entry: {item.strip()!r}")
+            continue
+        timeouts[name.strip()] = seconds
+    return timeouts
+
+
+# 单个命令的截止时间，格式为 "navigate_to=90;screen_shot=20"
+TOOL_TIMEOUTS = parse_timeouts(os.environ.get('MINIUM_TOOL_TIMEOUTS', ''))
+
+# JSON Schema 类型 -> Python 类型
+JSON_TYPES = {
+    "string": (str,),
+    "number": (int, float),
+    "integer": (int,),
+    "boolean": (bool,),
+    "object": (dict,),
+    "array": (list,),
+}
+
+
+@dataclass
+class Command:
+    """A command that can be called as an MCP tool and on the web bridge."""
+    name: str
+    description: str
+    properties: dict[str, dict] = field(default_factory=dict)
+    required: tuple[str, ...] = ()
+    # MCP 工具名，默认为 minium_<name>
+    tool_name: str = ''
+    # 是否会改变当前页面
+    navigates: bool = False
+    # 是否只读取状态，不改变页面
+    readonly: bool = False
+    # 不使用开发者工具，未打开项目时也可以执行
+    stateless: bool = False
+    # 默认截止时间（秒），未设置时按命令类型取 TIMEOUTS
+    timeout: float | None = None
+    _checks: tuple = field(init=False, repr=False, default=())
+
+    def __post_init__(self):
+        if not self.tool_name:
+            self.tool_name = f"minium_{self.name}"
+        # 每个工具都可以指定本次调用的截止时间
+        self.properties = {**self.properties, "timeout": TIMEOUT}
+        if self.timeout is None:
+            self.timeout = TIMEOUTS["navigate" if self.navigates else "read" if self.readonly else "action"]
+        self.timeout = TOOL_TIMEOUTS.get(self.name, self.timeout)
+        checks = []
+        for key, schema in self.properties.items():
+            checks.append((
+                key,
+                JSON_TYPES.get(schema.get("type")),
+                key in self.required,
+                schema.get("default"),
+                tuple(schema["enum"]) if "enum" in schema else None,
+            ))
+        self._checks = tuple(checks)
+
+    @property
+    def input_schema(self) -> dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": self.properties,
+            "required": list(self.required),
+        }
+
+    def to_tool(self) -> types.Tool:
+        return types.Tool(
+            name=self.tool_name,
+            description=self.description,
+            inputSchema=self.input_schema,
+        )
+
+    def deadline(self, override: float | None = None) -> float:
+        """Seconds allowed for one call: the per-call `timeout` argument or the tool's default."""
+        if override is None:
+            return self.timeout
+        # bool 是 int 的子类，不能当作数字
+        if isinstance(override, bool) or not isinstance(override, (int, float)):
+            raise ValueError(f"Invalid arguments for {self.tool_name}: 'timeout' must be of type number")
+        return float(override) if override > 0 else self.timeout
+
+    def validate(self, arguments: dict[str, Any] | None) -> dict[str, Any]:
+        """Check `arguments` against the schema and fill in defaults."""
+        arguments = dict(arguments or {})
+        errors = []
+        for key, expected, required, default, choices in self._checks:
+            value = arguments.get(key)
+            # 必填参数可以显式传 null，交给下面的类型检查
+            if value is None and not (required and key in arguments):
+                if required:
+                    errors.append(f"missing '{key}'")
+                elif default is not None:
+                    arguments[key] = default
+                continue
+            if expected is None:
+                continue
+            # bool 是 int 的子类，不能当作数字
+            if not isinstance(value, expected) or (isinstance(value, bool) and bool not in expected):
+                errors.append(f"'{key}' must be of type {self.properties[key]['type']}")
+            elif choices is not None and value not in choices:
+                errors.append(f"'{key}' must be one of {', '.join(map(str, choices))}")
+        if errors:
+            raise ValueError(f"Invalid arguments for {self.tool_name}: {', '.join(errors)}")
+        return arguments
+
+
+COMMANDS: dict[str, Command] = {}
+TOOL_NAMES: dict[str, Command] = {}
+
+
+def register(*commands: Command) -> None:
+    for command in commands:
+        COMMANDS[command.name] = command
+        TOOL_NAMES[command.tool_name] = command
+
+
+def get_command(name: str) -> Command:
+    """Look up a command by MCP tool name or bridge command name."""
+    command = TOOL_NAMES.get(name) or COMMANDS.get(name)
+    if command is None:
+        raise ValueError(f"Unknown tool: {name}")
+    return command
+
+
+def to_content(result: dict[str, Any]) -> list[types.TextContent | types.ImageContent]:
+    """Convert a command result into MCP content."""
+    if result.get("images"):
+        # 批量命令的文本结果之后依次附上截图
+        return [types.TextContent(type="text", text=result.get("message"))] + [
+            types.ImageContent(type="image", mimeType=item.get("mimeType", "image/png"), data=item.get("data"))
+            for item in result["images"]
+        ]
+    if result.get("type") == "image":
+        content = [types.ImageContent(type="image", mimeType=result.get("mimeType", "image/png"), data=result.get("data"))]
+        if result.get("message"):
+            content.insert(0, types.TextContent(type="text", text=result.get("message")))
+        return content
+    return [types.TextContent(type="text", text=result.get("message"))]
+
+
+register(
+    Command(
+        name="open",
+        description="Open a project and connect to the developer tool. Without path, connects to the current project",
+        properties={
+            "path": {"type": "string", "description": "Project path"},
+        },
+        timeout=TIMEOUTS["launch"],
+    ),
+    Command(
+        name="get_system_info",
+        description="Get system info",
+        readonly=True,
+    ),
+    Command(
+        name="shutdown",
+        description="Shutdown the developer tool",
+        timeout=TIMEOUTS["launch"],
+    ),
+    Command(
+        name="screen_shot",
+        description="Take a screenshot of the current page. Use max_width, format and quality to get a smaller image.",
+        properties={
+            "max_width": {"type": "integer", "description": "Downscale the image to at most this width in pixels"},
+            "format": {"type": "string", "enum": ["png", "jpeg", "webp"], "description": "Image format", "default": "png"},
+            "quality": {"type": "integer", "description": "JPEG/WebP quality (1-100)"},
+            "grayscale": {"type": "boolean", "description": "Convert the image to grayscale", "default": False},
+            "skip_unchanged": {"type": "boolean", "description": "Return a short text instead of the image when the screen has not changed since the last screenshot taken with the same options", "default": False},
+            "threshold": {"type": "integer", "description": "Number of differing fingerprint bits (0-256) still treated as unchanged"},
+        },
+        readonly=True,
+    ),
+    Command(
+        name="get_logs",
+        description="Get console logs of the mini program. Pass the returned cursor as since to read only newer logs.",
+        properties={
+            "level": {"type": "string", "enum": ["debug", "log", "info", "warn", "error"], "description": "Minimum level"},
+            "contains": {"type": "string", "description": "Only logs containing this text"},
+            "pattern": {"type": "string", "description": "Only logs matching this regular expression"},
+            "since": {"type": "integer", "description": "Cursor returned by a previous call"},
+            "limit": {"type": "integer", "description": "Maximum number of logs", "default": 50},
+        },
+        readonly=True,
+    ),
+    Command(
+        name="get_all_pages_path_and_method",
+        description="Get paths of all pages and the method used to navigate to them",
+        readonly=True,
+    ),
+    Command(
+        name="get_navigate_method_of_page",
+        description="Get the method used to navigate to a page",
+        properties={"path": PAGE_PATH},
+        required=("path",),
+        readonly=True,
+    ),
+    Command(
+        name="get_current_page",
+        description="Get the path and query of the current page and the page stack",
+        properties={
+            "refresh": {"type": "boolean", "description": "Query the developer tool instead of using the tracked page", "default": False},
+        },
+        readonly=True,
+    ),
+    Command(
+        name="go_home",
+        description="Go to the home page",
+        navigates=True,
+    ),
+    Command(
+        name="navigate_to",
+        description="Navigate to a page. Please get path of all pages before using this tool.",
+        properties={"path": PAGE_PATH, "params": QUERY},
+        required=("path",),
+        navigates=True,
+    ),
+    Command(
+        name="navigate_back",
+        description="Navigate back to the previous page",
+        navigates=True,
+    ),
+    Command(
+        name="switch_tab",
+        description="Switch to a tab. Please get path of all pages before using this tool.",
+        properties={"path": PAGE_PATH},
+        required=("path",),
+        navigates=True,
+    ),
+    Command(
+        name="redirect_to",
+        description="Redirect to a page",
+        properties={"path": PAGE_PATH, "params": QUERY},
+        required=("path",),
+        navigates=True,
+    ),
+    Command(
+        name="relaunch",
+        description="Close all pages and open a new one",
+        properties={"path": PAGE_PATH, "params": QUERY},
+        required=("path",),
+        navigates=True,
+    ),
+    # Command(
+    #     name="evaluate",
+    #     description="Evaluate a JavaScript(es5) code",
+    #     properties={
+    #         "code": {"type": "string", "description": "Script code"},
+    #         "params": {"type": "object", "description": "Script parameters"},
+    #     },
+    #     required=("code", "params"),
+    # ),
+    Command(
+        name="call_method",
+        description="Call a method of page",
+        properties={
+            "method": {"type": "string", "description": "Method name"},
+            "params": {"type": "object", "description": "Method parameters"},
+        },
+        required=("method",),
+    ),
+    Command(
+        name="page_scroll_to",
+        description="Scroll to the specified position of an page",
+        properties={
+            "top": {"type": "number", "description": "Scroll to the top"},
+            "duration": {"type": "number", "description": "Scroll duration", "default": 300},
+        },
+        required=("top",),
+    ),
+    Command(
+        name="page_get_wxml",
+        tool_name="page_get_wxml",
+        description="Get Dom structure of an page. format=compact returns one line per node: tag#id.class [bindings] \"text\"",
+        properties={
+            "format": {"type": "string", "enum": ["xml", "compact"], "description": "Output format", "default": "xml"},
+            "diff": {"type": "boolean", "description": "Only return nodes inserted (+), removed (-) or changed (~) since the last read of this page", "default": False},
+        },
+        readonly=True,
+    ),
+    Command(
+        name="page_get_css",
+        tool_name="page_get_css",
+        description="Get CSS structure of an page",
+        properties={
+            "refresh": {"type": "boolean", "description": "Fetch the wxml again instead of reusing the one read by the last page_get_wxml", "default": False},
+        },
+        readonly=True,
+    ),
+    Command(
+        name="page_get_data",
+        description="Get data of an page. Use path, offset and limit to read only part of it, "
+                    "and changes to get a JSON Patch against the last read.",
+        properties={
+            "path": {"type": "string", "description": "JSONPath ($.list[0].name, $.list[*].id) or key path (list.0.name)"},
+            "offset": {"type": "integer", "description": "Index of the first item when the selected value is an array", "default": 0},
+            "limit": {"type": "integer", "description": "Maximum number of items when the selected value is an array"},
+            "changes": {"type": "boolean", "description": "Return a JSON Patch (RFC 6902) against the last read of the same path", "default": False},
+        },
+        readonly=True,
+    ),
+    Command(
+        name="wait_for",
+        description="Wait until a condition holds on the current page, polling on the server instead of "
+                    "reading the page repeatedly. Conditions: selector_exists and selector_visible (selector), "
+                    "text_present (text, optionally inside selector), data_equals (path and value), "
+                    "route_equals (path). timeout is how long to wait.",
+        properties={
+            "condition": {
+                "type": "string",
+                "description": "Condition to wait for",
+                "enum": ["selector_exists", "selector_visible", "text_present", "data_equals", "route_equals"],
+            },
+            "selector": SELECTOR,
+            "text": {"type": "string", "description": "Text to look for"},
+            "path": {"type": "string", "description": "Data path for data_equals, page path for route_equals"},
+            "value": {"description": "Expected value for data_equals"},
+        },
+        required=("condition",),
+        readonly=True,
+    ),
+    Command(
+        name="page_set_data",
+        description="Set data of an page",
+        properties={
+            "key": {"type": "string", "description": "key of data"},
+            "value": {"description": "value of data"},
+        },
+        required=("key", "value"),
+    ),
+    Command(
+        name="tap",
+        description="Tap an element",
+        properties={"selector": SELECTOR},
+        required=("selector",),
+    ),
+    Command(
+        name="long_press",
+        description="Long press an element",
+        properties={"selector": SELECTOR},
+        required=("selector",),
+    ),
+    Command(
+        name="move",
+        description="Perform gestures on the element",
+        properties={
+            "selector": SELECTOR,
+            "top": {"type": "number", "description": "Move to the top coordinate"},
+            "left": {"type": "number", "description": "Move to the left coordinate"},
+        },
+        required=("selector", "top", "left"),
+    ),
+    Command(
+        name="input",
+        description="Input text to an element",
+        properties={
+            "selector": SELECTOR,
+            "text": {"type": "string", "description": "Text to input"},
+        },
+        required=("selector", "text"),
+    ),
+    Command(
+        name="switch",
+        description="Change the switch status of an element",
+        properties={"selector": SELECTOR},
+        required=("selector",),
+    ),
+    Command(
+        name="slide_to",
+        description="Slide to the specified position of an element",
+        properties={
+            "selector": SELECTOR,
+            "value": {"type": "number", "description": "Slide value"},
+        },
+        required=("selector", "value"),
+    ),
+    Command(
+        name="pick",
+        description="Pick an option of an element",
+        properties={
+            "selector": SELECTOR,
+            "option": {"type": "string", "description": "Option value"},
+        },
+        required=("selector", "option"),
+    ),
+)
+
+register(
+    Command(
+        name="batch",
+        description="Run an ordered list of commands in one call and return all results. "
+                    "Each command is {\"name\": tool name, \"arguments\": {...}}.",
+        properties={
+            "commands": {
+                "type": "array",
+                "description": "Commands to run in order",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "name": {"type": "string", "description": "Tool name, e.g. minium_tap"},
+                        "arguments": {"type": "object", "description": "Tool arguments"},
+                    },
+                    "required": ["name"],
+                },
+            },
+            "stop_on_error": {"type": "boolean", "description": "Stop at the first failed command", "default": True},
+        },
+        required=("commands",),
+        # 整个批次共用一个截止时间
+        timeout=TIMEOUTS["navigate"] * 2,
+    ),
+    Command(
+        name="replay",
+        description="Replay a macro recorded with MINIUM_MACRO_FILE at machine speed. Checks each result against "
+                    "the recording and reports the timing drift of every step.",
+        properties={
+            "path": {"type": "string", "description": "Macro file, one recorded tool call per line"},
+            "steps": {
+                "type": "array",
+                "description": "Steps to replay instead of a file, as recorded: {\"name\", \"arguments\", \"status\", \"hash\", "
+                               "\"duration_ms\", \"expect\": {\"status\", \"hash\", \"contains\"}}",
+                "items": {"type": "object"},
+            },
+            "assert": {
+                "type": "string",
+                "description": "Compare nothing, the status, or the status and result hash of each step with the recording",
+                "enum": ["none", "status", "hash"],
+                "default": "status",
+            },
+            "stop_on_failure": {"type": "boolean", "description": "Stop at the first failed step", "default": True},
+        },
+        # 宏通常比批量命令长
+        timeout=TIMEOUTS["navigate"] * 5,
+    ),
+)
+
+register(
+    Command(
+        name="stats",
+        description="Get per-command call and error counts, p50/p99 latency by phase and average payload sizes",
+        readonly=True,
+        stateless=True,
+    ),
+)
+
+# 工具列表只构建一次，list_tools 直接返回
+TOOLS: list[types.Tool] = [command.to_tool() for command in COMMANDS.values()]
@@ -0,0 +1,200 @@
+"""
+Optional tracing of tool calls.
+
+With `MINIUM_TRACE_FILE` set, each MCP tool call, bridge request and devtools
+call is recorded as a span, one JSON object per line, in a rotating file.
+Spans of one call share a `trace_id`; the webapi server passes its span to
+the bridge in the `trace` field of the `/api/command` payload.
+
+`minium-trace-summary FILE...` prints the critical path of the slowest traces
+and where the time went for each session.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import argparse
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from logging.handlers import RotatingFileHandler
+
+# 追踪文件路径，未设置时不记录
+TRACE_FILE = os.environ.get('MINIUM_TRACE_FILE')
+# 单个文件的最大字节数与保留的历史文件数
+TRACE_MAX_BYTES = int(os.environ.get('MINIUM_TRACE_MAX_BYTES', 10 * 1024 * 1024))
+TRACE_BACKUPS = int(os.environ.get('MINIUM_TRACE_BACKUPS', 5))
+
+_current: ContextVar["Span | None"] = ContextVar("minium_span", default=None)
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    name: str
+    start: float
+    attrs: dict = field(default_factory=dict)
+    duration_ms: float = 0.0
+    status: str = "ok"
+
+    def fail(self, message: str) -> None:
+        self.status = "error"
+        self.attrs["error"] = message
+
+    def context(self) -> dict[str, str]:
+        """The ids to pass to another process."""
+        return {"trace_id": self.trace_id, "span_id": self.span_id}
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            **self.attrs,
+        }
+
+
+class Tracer:
+    """Writes spans to a rotating JSONL file; does nothing without a path."""
+
+    def __init__(self, path: str | None = TRACE_FILE, max_bytes: int = TRACE_MAX_BYTES,
+                 backups: int = TRACE_BACKUPS):
+        self.enabled = bool(path)
+        self._logger = None
+        if self.enabled:
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger = logging.getLogger(f"minium-mcp-server.trace.{id(self)}")
+            self._logger.propagate = False
+            self._logger.setLevel(logging.INFO)
+            self._logger.addHandler(handler)
+
+    def context(self) -> dict[str, str] | None:
+        """Ids of the current span, for propagation, or None."""
+        span = _current.get()
+        return span.context() if span is not None else None
+
+    @contextmanager
+    def span(self, name: str, parent: dict | None = None, **attrs):
+        """Record the enclosed block as a span.
+
+        The parent is `parent` (ids received from another thread or process)
+        or else the current span. Yields the span, or None when disabled.
+        """
+        if not self.enabled:
+            yield None
+            return
+        current = _current.get()
+        if parent:
+            trace_id, parent_id = parent.get("trace_id"), parent.get("span_id")
+        elif current is not None:
+            trace_id, parent_id = current.trace_id, current.span_id
+        else:
+            trace_id, parent_id = uuid.uuid4().hex, None
+        span = Span(trace_id or uuid.uuid4().hex, uuid.uuid4().hex[:16], parent_id, name, time.time(), attrs)
+        token = _current.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span.fail(str(e))
+            raise
+        finally:
+            span.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            _current.reset(token)
+            self._logger.info(json.dumps(span.to_dict(), ensure_ascii=False, default=str))
+
+
+TRACER = Tracer()
+
+
+def load(paths: list[str]) -> list[dict]:
+    """Read spans from trace files, including their rotated backups."""
+    spans = []
+    for path in paths:
+        backups = sorted(
+            (name for name in os.listdir(os.path.dirname(path) or ".")
+             if name.startswith(os.path.basename(path) + ".") and name.rpartition(".")[2].isdigit()),
+            key=lambda name: -int(name.rpartition(".")[2]),
+        )
+        for name in backups + [os.path.basename(path)]:
+            with open(os.path.join(os.path.dirname(path), name), encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        spans.append(json.loads(line))
+    return spans
+
+
+def critical_path(span: dict, children: dict[str, list[dict]]) -> list[tuple[dict, float]]:
+    """Follow the child that ends last; returns `(span, self_ms)` from the root down."""
+    path = []
+    while span is not None:
+        kids = children.get(span["span_id"])
+        last = max(kids, key=lambda kid: kid["start"] + kid["duration_ms"] / 1000) if kids else None
+        path.append((span, span["duration_ms"] - (last["duration_ms"] if last else 0)))
+        span = last
+    return path
+
+
+def failed(span: dict, children: dict[str, list[dict]]) -> bool:
+    """Whether the span or any of its descendants failed."""
+    return span.get("status") == "error" or any(failed(kid, children) for kid in children.get(span["span_id"], ()))
+
+
+def summarize(spans: list[dict], top: int = 5) -> str:
+    by_id = {span["span_id"]: span for span in spans}
+    children: dict[str, list[dict]] = {}
+    roots = []
+    for span in spans:
+        if span.get("parent_id") in by_id:
+            children.setdefault(span["parent_id"], []).append(span)
+        else:
+            roots.append(span)
+
+    sessions: dict[str, list[dict]] = {}
+    for root in roots:
+        session = root.get("session") or next(
+            (item[0].get("session") for item in critical_path(root, children) if item[0].get("session")), "-")
+        sessions.setdefault(session, []).append(root)
+
+    lines = []
+    for session, session_roots in sorted(sessions.items()):
+        total = sum(root["duration_ms"] for root in session_roots)
+        errors = sum(1 for root in session_roots if failed(root, children))
+        lines.append(f"Session {session}: {len(session_roots)} traces, {total:.1f} ms, {errors} errors")
+        # 关键路径上各类 span 自身耗时的合计
+        self_times: dict[str, float] = {}
+        for root in session_roots:
+            for span, self_ms in critical_path(root, children):
+                self_times[span["name"]] = self_times.get(span["name"], 0.0) + self_ms
+        for name, self_ms in sorted(self_times.items(), key=lambda item: -item[1]):
+            lines.append(f"  {name:<12} {self_ms:10.1f} ms  {self_ms / total * 100 if total else 0:5.1f}%")
+        lines.append("  Slowest:")
+        for root in sorted(session_roots, key=lambda root: -root["duration_ms"])[:top]:
+            path = " > ".join(
+                f"{span['name']}{'(' + span['command'] + ')' if span.get('command') else ''} {span['duration_ms']:.1f}ms"
+                for span, _ in critical_path(root, children)
+            )
+            lines.append(f"    {path}")
+    return "\n".join(lines) or "No spans"
+
+
+def main():
+    """Print a per-session critical path summary of trace files."""
+    parser = argparse.ArgumentParser(description='Summarize Minium MCP trace files')
+    parser.add_argument('files', nargs='+', help='Trace files written with MINIUM_TRACE_FILE')
+    parser.add_argument('--top', type=int, default=5, help='Number of slowest traces to show per session')
+    args = parser.parse_args()
+    print(summarize(load(args.files), args.top))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+WXML parsing.
+
+`page.wxml` is the page markup followed by the page's style text. `parse()`
+reads it once with an incremental `HTMLParser` and returns a `Document` that
+serves the markup, the styles and a compact one-line-per-node outline.
+`diff()` compares two documents by stable node paths.
+"""
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+
+# 紧凑输出中文本的最大长度
+MAX_TEXT_LENGTH = 80
+# 事件绑定属性前缀
+BINDING_PREFIXES = ("bind", "catch", "capture-bind", "capture-catch", "mut-bind")
+
+
+@dataclass
+class Node:
+    tag: str
+    attrs: dict[str, str]
+    # 稳定路径：有 id 时为 tag#id，否则为 tag.class 在兄弟节点中的序号，如 "view#root/view.list[0]/text[0]"
+    path: str
+    children: list["Node"] = field(default_factory=list)
+    text: str = ''
+
+    @property
+    def id(self) -> str:
+        return self.attrs.get("id", "")
+
+    @property
+    def classes(self) -> list[str]:
+        return self.attrs.get("class", "").split()
+
+    @property
+    def bindings(self) -> dict[str, str]:
+        return {key: value for key, value in self.attrs.items() if key.startswith(BINDING_PREFIXES)}
+
+    def outline(self) -> str:
+        """One-line summary: tag#id.class [bindings] "text"."""
+        line = self.tag
+        if self.id:
+            line += f"#{self.id}"
+        for name in self.classes:
+            line += f".{name}"
+        if self.bindings:
+            line += " [" + " ".join(f"{key}={value}" for key, value in self.bindings.items()) + "]"
+        if self.text:
+            text = self.text if len(self.text) <= MAX_TEXT_LENGTH else self.text[:MAX_TEXT_LENGTH] + "…"
+            line += f' "{text}"'
+        return line
+
+    def signature(self) -> tuple:
+        return self.tag, tuple(sorted(self.attrs.items())), self.text
+
+    def walk(self, depth: int = 0):
+        yield depth, self
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+
+@dataclass
+class Document:
+    nodes: list[Node]
+    markup: str
+    style: str
+
+    def walk(self):
+        for node in self.nodes:
+            yield from node.walk()
+
+    def compact(self) -> str:
+        return "\n".join("  " * depth + node.outline() for depth, node in self.walk())
+
+
+class _TreeBuilder(HTMLParser):
+
+    def __init__(self, source: str):
+        super().__init__(convert_charrefs=True)
+        self.source = source
+        self.roots: list[Node] = []
+        self.stack: list[Node] = []
+        self.styles: list[str] = []
+        # (父路径, tag.class) -> 已出现的无 id 节点数
+        self._counts: dict[tuple[str, str], int] = {}
+        # markup 在源文本中的结束位置
+        self.markup_end = None
+        self._line_starts = [0]
+        for index, char in enumerate(source):
+            if char == "\n":
+                self._line_starts.append(index + 1)
+
+    def _offset(self) -> int:
+        line, column = self.getpos()
+        return self._line_starts[line - 1] + column
+
+    def _open(self, tag: str, attrs) -> Node:
+        siblings = self.stack[-1].children if self.stack else self.roots
+        parent_path = self.stack[-1].path + "/" if self.stack else ""
+        attrs = {key: value or "" for key, value in attrs}
+        if attrs.get("id"):
+            segment = f"{tag}#{attrs['id']}"
+        else:
+            # 用标签和第一个 class 区分兄弟节点，插入其他类型的节点不会影响序号
+            classes = attrs.get("class", "").split()
+            key = f"{tag}.{classes[0]}" if classes else tag
+            index = self._counts.get((parent_path, key), 0)
+            self._counts[(parent_path, key)] = index + 1
+            segment = f"{key}[{index}]"
+        node = Node(tag, attrs, parent_path + segment)
+        siblings.append(node)
+        return node
+
+    def handle_starttag(self, tag, attrs):
+        self.stack.append(self._open(tag, attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self._open(tag, attrs)
+        if not self.stack:
+            self.markup_end = self._offset() + len(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        # 容错：关闭到最近的同名标签
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index].tag == tag:
+                del self.stack[index:]
+                break
+        else:
+            return
+        if not self.stack:
+            start = self._offset()
+            self.markup_end = self.source.find(">", start) + 1
+
+    def handle_data(self, data):
+        if self.stack:
+            node = self.stack[-1]
+            if node.tag == "style":
+                self.styles.append(data)
+            elif data.strip():
+                node.text = (node.text + " " + data.strip()).strip()
+
+
+def parse(source: str) -> Document:
+    builder = _TreeBuilder(source or "")
+    builder.feed(source or "")
+    builder.close()
+    if builder.markup_end is None:
+        return Document(builder.roots, source or "", "".join(builder.styles))
+    markup = source[:builder.markup_end]
+    style = "".join(builder.styles) + source[builder.markup_end:]
+    return Document(builder.roots, markup, style)
+
+
+def diff(old: Document, new: Document) -> str:
+    """Describe the changes from `old` to `new`, one entry per line.
+
+    `+ path` inserted subtree, `- path` removed subtree, `~ path` changed
+    attributes or text. Returns an empty string when nothing changed.
+    """
+    old_nodes = {node.path: node for _, node in old.walk()}
+    new_nodes = {node.path: node for _, node in new.walk()}
+    lines = []
+
+    # 只列出被删除/插入子树的根节点
+    for path in old_nodes:
+        parent = path.rpartition("/")[0]
+        if path not in new_nodes and (not parent or parent in new_nodes):
+            lines.append(f"- {path}")
+
+    for path, node in new_nodes.items():
+        before = old_nodes.get(path)
+        if before is None:
+            parent = path.rpartition("/")[0]
+            if not parent or parent in old_nodes:
+                lines.append(f"+ {path}")
+                lines.extend("    " + "  " * depth + child.outline() for depth, child in node.walk())
+            continue
+        if before.signature() == node.signature():
+            continue
+        changes = []
+        for key in sorted(before.attrs.keys() | node.attrs.keys()):
+            if before.attrs.get(key) != node.attrs.get(key):
+                changes.append(f'{key}: {before.attrs.get(key)!r} -> {node.attrs.get(key)!r}')
+        if before.text != node.text:
+            changes.append(f'text: {before.text!r} -> {node.text!r}')
+        lines.append(f"~ {path}: " + "; ".join(changes))
+
+    return "\n".join(lines)
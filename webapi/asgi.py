@@ -0,0 +1,276 @@
+"""
+ASGI mode of the web bridge, for production use:
+
+    python asgi.py
+
+Serves the same API as `web.py`, plus a WebSocket channel on `/api/channel`.
+Sessions live in this process, so uvicorn always runs a single worker
+process; devtools commands run on a bounded thread pool instead. Commands
+of one session are queued in order, commands of different sessions run in
+parallel, and shutdown waits for running commands.
+"""
+import os
+import json
+import asyncio
+import logging
+import weakref
+import threading
+from contextlib import asynccontextmanager
+
+import anyio
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from minium_mcp_server.commands import cancelled as cancelled_result, timed_out
+from minium_mcp_server.metrics import METRICS, label
+from minium_mcp_server.pool import DEFAULT_SESSION, SessionPool
+from minium_mcp_server.session import launch
+from minium_mcp_server.warmpool import WarmPool
+
+logger = logging.getLogger('minium-mcp-server')
+
+HOST = '0.0.0.0'
+PORT = 9188
+# 执行开发者工具命令的线程数，即同时执行命令的会话数上限
+WORKERS = int(os.environ.get('MINIUM_BRIDGE_WORKERS', 8))
+# 同时处理的请求数上限，超出时直接返回 503
+MAX_CONCURRENCY = int(os.environ.get('MINIUM_BRIDGE_MAX_CONCURRENCY', 64))
+# 关闭时等待进行中命令完成的最长时间（秒）
+DRAIN_TIMEOUT = float(os.environ.get('MINIUM_BRIDGE_DRAIN_TIMEOUT', 30))
+# 每个通道积压的待发送事件上限，超出后丢弃新事件
+MAX_PENDING_EVENTS = 1000
+
+pool = SessionPool(warm_pool=WarmPool(launch))
+# session id -> asyncio.Lock，排队的请求在事件循环中等待，不占用工作线程
+session_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+limiter = None
+in_flight = 0
+idle = asyncio.Event()
+idle.set()
+draining = False
+# request_id -> (排队时的取消标记, 执行时的取消标记)
+waiting: dict[str, tuple[asyncio.Event, threading.Event]] = {}
+
+
+async def run_command(command: dict) -> dict:
+    global in_flight
+    if draining:
+        return {"status": "error", "message": "The bridge is shutting down"}
+    logger.info(f"COMMAND: {json.dumps(command)}")
+    session_id = command.get('session') or DEFAULT_SESSION
+    lock = session_locks.get(session_id)
+    if lock is None:
+        lock = session_locks[session_id] = asyncio.Lock()
+    deadline = pool.deadline(command)
+    loop = asyncio.get_running_loop()
+    expires = loop.time() + deadline if deadline else None
+    request_id = command.get('request_id')
+    queued, cancelled = asyncio.Event(), threading.Event()
+    if request_id:
+        waiting[request_id] = (queued, cancelled)
+    in_flight += 1
+    idle.clear()
+    try:
+        try:
+            async with asyncio.timeout_at(expires):
+                acquired = await acquire(lock, queued)
+        except TimeoutError:
+            return timed_out(label(command.get('name')), deadline, "queue")
+        if not acquired:
+            return cancelled_result(label(command.get('name')))
+        try:
+            if expires is not None:
+                # 排队已用去的时间从截止时间中扣除
+                command = {**command, "timeout": max(expires - loop.time(), 0.001)}
+            # 执行中的命令不随请求取消，超时或取消时由 pool 放弃等待
+            return await anyio.to_thread.run_sync(pool.run, command, cancelled, limiter=limiter)
+        finally:
+            lock.release()
+    finally:
+        if request_id:
+            waiting.pop(request_id, None)
+        in_flight -= 1
+        if not in_flight:
+            idle.set()
+
+
+async def acquire(lock: asyncio.Lock, queued: asyncio.Event) -> bool:
+    """Wait for `lock`; returns False, without holding it, once `queued` is set."""
+    acquiring = asyncio.ensure_future(lock.acquire())
+    stopping = asyncio.ensure_future(queued.wait())
+    held = False
+    try:
+        await asyncio.wait((acquiring, stopping), return_when=asyncio.FIRST_COMPLETED)
+        held = acquiring.done() and not queued.is_set()
+        return held
+    finally:
+        stopping.cancel()
+        if not acquiring.done():
+            # 未取得锁时退出排队，asyncio.Lock 会唤醒下一个等待者
+            acquiring.cancel()
+        elif not held and not acquiring.cancelled():
+            # 取得锁的同时被取消或等待超时
+            lock.release()
+
+
+def cancel_request(request_id: str) -> bool:
+    """Cancel a queued or running command; returns False when it is unknown."""
+    flags = waiting.get(request_id)
+    if flags is None:
+        return False
+    queued, cancelled = flags
+    # 排队中的请求离开队列，执行中的请求由 pool 放弃等待；不取消处理 HTTP 请求的任务
+    queued.set()
+    cancelled.set()
+    return True
+
+
+def respond(name: str, request_size: int, result: dict) -> JSONResponse:
+    name = label(name)
+    METRICS.observe_size(name, "request", request_size)
+    with METRICS.phase(name, "serialize"):
+        response = JSONResponse(result)
+    METRICS.observe_size(name, "response", len(response.body))
+    return response
+
+
+async def handle_command(request: Request):
+    body = await request.body()
+    command = json.loads(body)
+    return respond(command.get('name', ''), len(body), await run_command(command))
+
+
+async def handle_batch(request: Request):
+    body = await request.body()
+    return respond("batch", len(body), await run_command({
+        "name": "batch",
+        "arguments": json.loads(body),
+        "session": request.query_params.get("session"),
+    }))
+
+
+async def handle_cancel(request: Request):
+    request_id = (await request.json()).get('request_id')
+    return JSONResponse({"status": "success", "cancelled": bool(request_id) and cancel_request(request_id)})
+
+
+async def handle_metrics(request: Request):
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+async def handle_sessions(request: Request):
+    await anyio.to_thread.run_sync(pool.evict_idle, limiter=limiter)
+    return JSONResponse({"status": "success", "sessions": pool.sessions(), "warm": pool.warm_pool.ready()})
+
+
+async def handle_channel(websocket: WebSocket):
+    """Multiplexed commands and pushed events over one WebSocket.
+
+    Client -> bridge: `{"id", "name", "arguments", "session"}` runs a command,
+    `{"id", "type": "subscribe", "sessions": [...]}` selects the sessions
+    whose events are pushed (all when omitted) and
+    `{"type": "cancel", "request_id"}` cancels a command.
+    Bridge -> client: `{"id", "result"}` as soon as each command finishes, and
+    `{"event": "log" | "route", "session", "data"}`.
+    """
+    await websocket.accept()
+    loop = asyncio.get_running_loop()
+    outgoing = asyncio.Queue()
+    pending_events = 0
+    # None 表示未订阅
+    subscribed: set[str] | None = None
+    tasks = set()
+
+    def push_event(message):
+        nonlocal pending_events
+        if pending_events < MAX_PENDING_EVENTS:
+            pending_events += 1
+            outgoing.put_nowait(message)
+
+    def on_event(session_id, event, data):
+        # 在 minium 的回调线程中调用
+        if subscribed is not None and (not subscribed or session_id in subscribed):
+            loop.call_soon_threadsafe(push_event, {"event": event, "session": session_id, "data": data})
+
+    async def writer():
+        nonlocal pending_events
+        while True:
+            message = await outgoing.get()
+            if "event" in message:
+                pending_events -= 1
+            await websocket.send_text(json.dumps(message))
+
+    async def run(message):
+        try:
+            result = await run_command(message)
+        except Exception as e:
+            result = {"status": "error", "message": str(e)}
+        outgoing.put_nowait({"id": message.get("id"), "result": result})
+
+    pool.subscribe(on_event)
+    writer_task = asyncio.create_task(writer())
+    try:
+        while True:
+            message = json.loads(await websocket.receive_text())
+            if message.get("type") == "subscribe":
+                subscribed = {session_id or DEFAULT_SESSION for session_id in message.get("sessions") or ()}
+                outgoing.put_nowait({"id": message.get("id"), "result": {"status": "success", "message": "Subscribed"}})
+                continue
+            if message.get("type") == "cancel":
+                cancel_request(message.get("request_id"))
+                continue
+            # 每条命令独立执行，结果就绪即返回，不按请求顺序
+            task = asyncio.create_task(run(message))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        pool.unsubscribe(on_event)
+        for task in tasks:
+            task.cancel()
+        writer_task.cancel()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global limiter, draining
+    limiter = anyio.CapacityLimiter(WORKERS)
+    yield
+    draining = True
+    with anyio.move_on_after(DRAIN_TIMEOUT):
+        await idle.wait()
+    if in_flight:
+        logger.warning(f"Shutting down with {in_flight} commands still running")
+    await anyio.to_thread.run_sync(pool.close_all)
+
+
+app = Starlette(
+    routes=[
+        Route('/api/command', handle_command, methods=['POST']),
+        Route('/api/batch', handle_batch, methods=['POST']),
+        Route('/api/cancel', handle_cancel, methods=['POST']),
+        Route('/api/sessions', handle_sessions, methods=['GET']),
+        Route('/metrics', handle_metrics, methods=['GET']),
+        WebSocketRoute('/api/channel', handle_channel),
+    ],
+    lifespan=lifespan,
+)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logger.setLevel(logging.INFO)
+    logger.info("Starting Minium MCP ASGI Server")
+    uvicorn.run(
+        app,
+        host=HOST,
+        port=PORT,
+        # 会话保存在进程内存中，多进程会把同一会话的请求分到不同进程
+        workers=1,
+        limit_concurrency=MAX_CONCURRENCY,
+        timeout_graceful_shutdown=DRAIN_TIMEOUT,
+    )
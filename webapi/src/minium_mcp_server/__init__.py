@@ -1,8 +1,13 @@
+import logging
+
 from . import server
 import asyncio
 
 def main():
     """Main entry point for the package."""
+    # stdout 用于 MCP 协议，日志输出到 stderr
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logging.getLogger('minium-mcp-server').setLevel(logging.INFO)
     asyncio.run(server.main())
 
 # Optionally expose other important items at package level
@@ -0,0 +1,110 @@
+"""
+Mini-program console logs.
+
+`LogBuffer` keeps the most recent `App.logAdded` entries of a session, bounded
+by count and by size. Every entry gets an increasing sequence number that
+callers pass back as `since` to read only newer entries.
+"""
+import os
+import re
+import json
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+# 保留的日志条数与总字节数上限
+MAX_ENTRIES = int(os.environ.get('MINIUM_LOG_MAX_ENTRIES', 1000))
+MAX_BYTES = int(os.environ.get('MINIUM_LOG_MAX_BYTES', 1024 * 1024))
+# 单条日志的最大长度，超出部分截断
+MAX_ENTRY_LENGTH = 4096
+
+# console 方法 -> 严重程度
+LEVELS = {"debug": 0, "log": 1, "info": 1, "warn": 2, "error": 3}
+
+
+@dataclass
+class LogEntry:
+    seq: int
+    time: float
+    level: str
+    text: str
+    size: int
+
+    def format(self) -> str:
+        clock = time.strftime("%H:%M:%S", time.localtime(self.time)) + f".{int(self.time * 1000) % 1000:03d}"
+        return f"[{self.seq}] {clock} {self.level.upper()} {self.text}"
+
+
+def _text(args) -> str:
+    parts = [arg if isinstance(arg, str) else json.dumps(arg, ensure_ascii=False, default=str) for arg in args or ()]
+    text = " ".join(parts)
+    return text if len(text) <= MAX_ENTRY_LENGTH else text[:MAX_ENTRY_LENGTH] + "…"
+
+
+class LogBuffer:
+    """A ring buffer of log entries, safe to append from minium's callback thread."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: deque[LogEntry] = deque()
+        self._bytes = 0
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cursor(self) -> int:
+        """Sequence number of the latest entry."""
+        return self._seq
+
+    def append(self, level: str, args) -> LogEntry:
+        text = _text(args)
+        with self._lock:
+            self._seq += 1
+            entry = LogEntry(self._seq, time.time(), level or "log", text, len(text.encode()))
+            self._entries.append(entry)
+            self._bytes += entry.size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._bytes -= self._entries.popleft().size
+        return entry
+
+    def clear(self) -> None:
+        # 序号不重置，旧的 since 仍然有效
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def query(self, level: str | None = None, contains: str | None = None, pattern: str | None = None,
+              since: int | None = None, limit: int | None = None) -> tuple[list[LogEntry], int, int]:
+        """Entries matching the filters.
+
+        With `since`, returns the oldest entries after that cursor; otherwise
+        the most recent ones. Returns `(entries, cursor, missed)` where
+        `cursor` is the value to pass as `since` next time and `missed` counts
+        entries after `since` that were already evicted.
+        """
+        regex = re.compile(pattern) if pattern else None
+        minimum = LEVELS.get(level, 0) if level else 0
+        with self._lock:
+            entries = list(self._entries)
+            cursor = self._seq
+        missed = 0
+        if since is not None:
+            first = entries[0].seq if entries else cursor + 1
+            missed = max(0, min(first, cursor + 1) - since - 1)
+            entries = [entry for entry in entries if entry.seq > since]
+        entries = [
+            entry for entry in entries
+            if LEVELS.get(entry.level, 1) >= minimum
+            and (contains is None or contains in entry.text)
+            and (regex is None or regex.search(entry.text))
+        ]
+        if limit is not None and len(entries) > limit:
+            if since is not None:
+                # 增量读取按顺序分页，游标停在最后返回的条目
+                entries = entries[:limit]
+                cursor = entries[-1].seq if entries else cursor
+            else:
+                entries = entries[-limit:]
+        return entries, cursor, missed
@@ -0,0 +1,246 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import itertools
+from typing import Any, Callable
+
+import httpx
+from websockets.asyncio.client import ClientConnection, connect
+from websockets.exceptions import InvalidStatus, WebSocketException
+
+from .commands import timed_out
+from .tracing import TRACER
+
+logger = logging.getLogger('minium-mcp-server')
+
+# 单次命令的默认截止时间（秒），可通过环境变量覆盖
+DEFAULT_TIMEOUT = float(os.environ.get('MINIUM_BRIDGE_TIMEOUT', 120))
+# 建立连接的超时时间（秒）
+CONNECT_TIMEOUT = float(os.environ.get('MINIUM_BRIDGE_CONNECT_TIMEOUT', 5))
+# 连接池大小，决定同时在途的请求数量
+MAX_CONNECTIONS = int(os.environ.get('MINIUM_BRIDGE_MAX_CONNECTIONS', 8))
+# channel：优先使用 WebSocket 通道（asgi.py 提供），不可用时退回 HTTP；http：只使用 HTTP
+TRANSPORT = os.environ.get('MINIUM_BRIDGE_TRANSPORT', 'channel')
+# 通道不可用时，两次连接尝试之间的最短间隔（秒）
+RECONNECT_INTERVAL = 5
+# web 服务在截止时间到达时返回超时结果，客户端多等待这段时间以收到该结果
+RESPONSE_GRACE = 2
+
+
+class BridgeError(Exception):
+    """Raised when the web bridge answers with an HTTP or command error."""
+
+
+class BridgeChannel:
+    """Multiplexed WebSocket connection to `/api/channel` of the ASGI bridge.
+
+    Requests carry an id and any number can be in flight; each result is
+    matched to its request when it arrives. Pushed events go to `on_event`.
+    """
+
+    def __init__(self, url: str, on_event: Callable[[dict], None] | None = None):
+        self.url = url
+        self.on_event = on_event
+        self._connection: ClientConnection | None = None
+        self._reader: asyncio.Task | None = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+
+    @property
+    def connected(self) -> bool:
+        return self._connection is not None
+
+    async def connect(self) -> None:
+        self._connection = await connect(self.url, max_size=None, open_timeout=CONNECT_TIMEOUT)
+        self._reader = asyncio.create_task(self._read(self._connection))
+
+    async def request(self, message: dict[str, Any]) -> dict[str, Any]:
+        if self._connection is None:
+            raise ConnectionError("Bridge channel is not connected")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self._connection.send(json.dumps({**message, "id": request_id}))
+            return await future
+        finally:
+            # 超时或取消后到达的结果会被忽略
+            self._pending.pop(request_id, None)
+
+    async def send(self, message: dict[str, Any]) -> None:
+        """Send a message that has no reply."""
+        if self._connection is None:
+            raise ConnectionError("Bridge channel is not connected")
+        await self._connection.send(json.dumps(message))
+
+    async def aclose(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+        if self._reader is not None:
+            await self._reader
+
+    async def _read(self, connection: ClientConnection) -> None:
+        try:
+            async for raw in connection:
+                # 单条消息的错误只记录，不影响其他在途请求
+                try:
+                    self._receive(json.loads(raw))
+                except Exception as e:
+                    logger.error(f"Error handling a bridge channel message: {e!r}")
+        except (WebSocketException, OSError) as e:
+            logger.warning(f"Bridge channel closed: {e}")
+        except Exception as e:
+            logger.error(f"Bridge channel reader failed: {e!r}")
+        finally:
+            self._connection = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Bridge channel closed"))
+
+    def _receive(self, message: dict) -> None:
+        if "event" in message:
+            if self.on_event is not None:
+                self.on_event(message)
+            return
+        future = self._pending.get(message.get("id"))
+        if future is not None and not future.done():
+            future.set_result(message.get("result") or {})
+
+
+class BridgeClient:
+    """Async client for the `web.py` bridge.
+
+    Commands go over the WebSocket channel when the bridge offers one, and
+    otherwise over HTTP connections kept alive in a pool. Either way several
+    commands can be in flight at once without blocking the MCP event loop.
+    Every call is bounded by a deadline covering the whole round trip.
+    """
+
+    def __init__(self, base_url: str, timeout: float = DEFAULT_TIMEOUT,
+                 max_connections: int = MAX_CONNECTIONS, transport: str = TRANSPORT,
+                 on_event: Callable[[dict], None] | None = None):
+        self.timeout = timeout
+        self.transport = transport
+        # 通道推送的事件回调，可在创建后设置
+        self.on_event = on_event
+        self._channel = BridgeChannel(base_url.replace("http", "ws", 1) + "/api/channel", self._deliver)
+        self._channel_lock = asyncio.Lock()
+        self._last_attempt = None
+        # web.py 没有通道，握手返回 404 后不再尝试
+        self._channel_unsupported = False
+        # 已订阅事件的会话
+        self._sessions: set[str | None] = set()
+        # 正在发送的取消请求
+        self._cancels: set[asyncio.Task] = set()
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+
+    async def __aenter__(self) -> "BridgeClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._channel.aclose()
+        await self._client.aclose()
+
+    def _deliver(self, message: dict) -> None:
+        if self.on_event is not None:
+            self.on_event(message)
+
+    async def _get_channel(self, session: str | None) -> BridgeChannel | None:
+        """The connected channel, subscribed to `session`, or None to use HTTP."""
+        if self.transport != "channel" or self._channel_unsupported:
+            return None
+        async with self._channel_lock:
+            if not self._channel.connected:
+                if self._last_attempt is not None and time.monotonic() - self._last_attempt < RECONNECT_INTERVAL:
+                    return None
+                self._last_attempt = time.monotonic()
+                try:
+                    await self._channel.connect()
+                except (WebSocketException, OSError, TimeoutError) as e:
+                    if isinstance(e, InvalidStatus) and e.response.status_code == 404:
+                        self._channel_unsupported = True
+                    logger.info(f"Bridge channel unavailable, using HTTP: {e}")
+                    return None
+                self._sessions.clear()
+            if session not in self._sessions:
+                self._sessions.add(session)
+                await self._channel.request({"type": "subscribe", "sessions": list(self._sessions)})
+        return self._channel
+
+    async def command(self, name: str, arguments: dict[str, Any] | None = None,
+                      timeout: float | None = None, session: str | None = None) -> dict[str, Any]:
+        """Send a command to `/api/command` and return the decoded response.
+
+        `timeout` overrides the client's default deadline for this call only;
+        the bridge gets the same deadline. `session` selects the developer
+        tool instance on the bridge. When the call is cancelled or times out,
+        the bridge is told to stop waiting for it so the session lock is
+        released. Raises `TimeoutError`, with the JSON timeout result as
+        message, when the deadline passes, and `BridgeError` when the bridge
+        reports a failure.
+        """
+        deadline = timeout or self.timeout
+        request_id = uuid.uuid4().hex
+        payload = {
+            "name": name,
+            "arguments": arguments or {},
+            "session": session,
+            "timeout": deadline,
+            "request_id": request_id,
+            "trace": TRACER.context(),
+        }
+        channel = None
+        try:
+            async with asyncio.timeout(deadline + RESPONSE_GRACE):
+                channel = await self._get_channel(session)
+                if channel is not None:
+                    response_data = await channel.request(payload)
+                else:
+                    response = await self._client.post(
+                        "/api/command",
+                        json=payload,
+                        timeout=httpx.Timeout(deadline + RESPONSE_GRACE, connect=CONNECT_TIMEOUT),
+                    )
+                    if response.status_code != 200:
+                        raise BridgeError(f"HTTP error: {response.status_code}")
+                    response_data = response.json()
+        except (httpx.TimeoutException, TimeoutError) as e:
+            self._cancel(request_id, channel)
+            raise TimeoutError(timed_out(name, deadline, "bridge")["message"]) from e
+        except asyncio.CancelledError:
+            self._cancel(request_id, channel)
+            raise
+
+        if response_data.get("error") == "timeout":
+            raise TimeoutError(response_data["message"])
+        if response_data.get("status") == "error":
+            raise BridgeError(response_data.get("message", "Unknown error"))
+        return response_data
+
+    def _cancel(self, request_id: str, channel: BridgeChannel | None) -> None:
+        """Tell the bridge in the background to stop waiting for `request_id`."""
+        async def send():
+            try:
+                if channel is not None and channel.connected:
+                    await channel.send({"type": "cancel", "request_id": request_id})
+                else:
+                    await self._client.post("/api/cancel", json={"request_id": request_id}, timeout=CONNECT_TIMEOUT)
+            except Exception as e:
+                logger.info(f"Failed to cancel request {request_id}: {e}")
+
+        task = asyncio.create_task(send())
+        self._cancels.add(task)
+        task.add_done_callback(self._cancels.discard)
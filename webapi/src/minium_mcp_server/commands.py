@@ -0,0 +1,452 @@
+"""
+Implementations of the commands declared in `tools.py`.
+
+Handlers take a `Session` and validated arguments and return a result dict:
+`{"status": "success"|"error", "message": str}` or, for images,
+`{"status": "success", "type": "image", "mimeType": str, "data": str}`.
+"""
+import re
+import json
+import time
+import base64
+from typing import Any, Callable
+
+from . import datapath, macro, screenshot, wxml
+from .metrics import METRICS
+from .routes import normalize
+from .session import Session
+from .tools import get_command
+
+HANDLERS: dict[str, Callable[[Session, dict[str, Any]], dict[str, Any]]] = {}
+
+# minium_wait_for 的轮询间隔（秒）：从最短间隔开始按倍数加长，观察值变化时回到最短间隔
+POLL_MIN = 0.05
+POLL_MAX = 1.0
+POLL_GROWTH = 1.5
+# 等待在截止时间之前结束，留出返回结果的时间（秒）
+WAIT_MARGIN = 1.0
+# wait_for 各条件需要的参数
+WAIT_ARGUMENTS = {
+    "selector_exists": ("selector",),
+    "selector_visible": ("selector",),
+    "text_present": ("text",),
+    "data_equals": ("path", "value"),
+    "route_equals": ("path",),
+}
+
+
+def handler(name: str):
+    def decorator(fn):
+        HANDLERS[name] = fn
+        return fn
+    return decorator
+
+
+def success(message: str) -> dict[str, Any]:
+    return {"status": "success", "message": message}
+
+
+def error(message: str) -> dict[str, Any]:
+    return {"status": "error", "message": message}
+
+
+def timed_out(name: str, seconds: float, phase: str) -> dict[str, Any]:
+    """Result of a command that missed its deadline while in `phase` (recovery, queue, devtools or bridge)."""
+    return {
+        "status": "error",
+        "error": "timeout",
+        # 消息为 JSON，调用方可以解析出超时的阶段
+        "message": json.dumps({"error": "timeout", "command": name, "timeout": round(seconds, 3), "phase": phase}),
+    }
+
+
+def cancelled(name: str) -> dict[str, Any]:
+    """Result of a command whose caller stopped waiting for it."""
+    return {"status": "error", "error": "cancelled", "message": f"Command {name} was cancelled"}
+
+
+def image(data: bytes, mime_type: str = "image/png", message: str = '') -> dict[str, Any]:
+    return {
+        "status": "success",
+        "type": "image",
+        "message": message,
+        "mimeType": mime_type,
+        "data": base64.b64encode(data).decode('utf-8')
+    }
+
+
+def dispatch(session: Session, name: str, arguments: dict[str, Any] | None) -> dict[str, Any]:
+    """Validate the arguments and run the handler of `name`."""
+    command = get_command(name)
+    if command.navigates:
+        # 导航失败时页面状态未知，先清空，成功后由处理函数记录新页面
+        session.forget_page()
+    if not command.readonly:
+        session.touch()
+    if command.stateless:
+        return HANDLERS[command.name](session, command.validate(arguments))
+    # 执行期间看门狗不检查该会话，成功结束说明开发者工具有响应
+    with session.health.command():
+        return HANDLERS[command.name](session, command.validate(arguments))
+
+
+@handler("stats")
+def stats(session: Session, arguments):
+    return success(f"```json\n{json.dumps(METRICS.summary(), indent=4)}```")
+
+
+@handler("open")
+def open_project(session: Session, arguments):
+    session.open(arguments.get("path"))
+    return success("Opened")
+
+
+@handler("get_system_info")
+def get_system_info(session: Session, arguments):
+    return success(json.dumps(session.require().get_system_info(), ensure_ascii=False))
+
+
+@handler("shutdown")
+def shutdown(session: Session, arguments):
+    session.shutdown()
+    return success("Closed")
+
+
+@handler("screen_shot")
+def screen_shot(session: Session, arguments):
+    raw = screenshot.capture(session.app)
+    threshold = arguments.get("threshold", screenshot.DEFAULT_THRESHOLD)
+    # 只有相同编码参数的上一张截图才能代替本次结果
+    options = (arguments.get("max_width"), arguments["format"], arguments.get("quality"), arguments["grayscale"])
+    if arguments["skip_unchanged"] and session.screens.unchanged(raw, threshold, options):
+        return success(f"Unchanged since screenshot {session.screens.last_id}")
+    shot_id = session.screens.record(raw, options)
+    data, mime_type = screenshot.encode(
+        raw,
+        max_width=arguments.get("max_width"),
+        format=arguments["format"],
+        quality=arguments.get("quality"),
+        grayscale=arguments["grayscale"],
+    )
+    message = f"Screenshot {shot_id}"
+    if screenshot.Image is None and screenshot.needs_encoding(arguments.get("max_width"), arguments["format"], arguments["grayscale"]):
+        message += " (original PNG, Pillow is not installed: install minium-mcp-server[image] to re-encode)"
+    return image(data, mime_type, message)
+
+
+@handler("get_logs")
+def get_logs(session: Session, arguments):
+    session.require()
+    try:
+        entries, cursor, missed = session.logs.query(
+            arguments.get("level"), arguments.get("contains"), arguments.get("pattern"),
+            arguments.get("since"), max(arguments["limit"], 1),
+        )
+    except re.error as e:
+        return error(f"Invalid pattern {arguments['pattern']!r}: {e}")
+    lines = [entry.format() for entry in entries] or ["No logs"]
+    if missed:
+        lines.insert(0, f"({missed} older logs were dropped)")
+    lines.append(f"Cursor: {cursor}")
+    return success("\n".join(lines))
+
+
+@handler("get_all_pages_path_and_method")
+def get_all_pages_path_and_method(session: Session, arguments):
+    # 优先使用 app.json 索引，读不到时再询问开发者工具
+    all_pages_path = session.routes.all_pages() or session.app.get_all_pages_path()
+    result = [{
+        "path": f"/{path}",
+        "method": session.routes.navigate_method(path)
+    } for path in all_pages_path]
+    return success(f"```json\n{json.dumps(result, indent=4, ensure_ascii=False)}```")
+
+
+@handler("get_navigate_method_of_page")
+def get_navigate_method_of_page(session: Session, arguments):
+    return success(session.routes.navigate_method(arguments["path"]))
+
+
+@handler("go_home")
+def go_home(session: Session, arguments):
+    session.set_page(session.app.go_home())
+    return success("Successfully enter the home page")
+
+
+@handler("navigate_to")
+def navigate_to(session: Session, arguments):
+    session.set_page(session.app.navigate_to(arguments["path"], arguments.get("params")))
+    return success(f"Successfully enter the {arguments['path']} page")
+
+
+@handler("navigate_back")
+def navigate_back(session: Session, arguments):
+    session.set_page(session.app.navigate_back())
+    return success("Successful return to the previous page")
+
+
+@handler("switch_tab")
+def switch_tab(session: Session, arguments):
+    session.set_page(session.app.switch_tab(arguments["path"]))
+    return success("Successfully switch tab")
+
+
+@handler("redirect_to")
+def redirect_to(session: Session, arguments):
+    session.set_page(session.app.redirect_to(arguments["path"], arguments.get("params")))
+    return success("Successfully redirect to")
+
+
+@handler("relaunch")
+def relaunch(session: Session, arguments):
+    session.set_page(session.app.relaunch(arguments["path"], arguments.get("params")))
+    return success(f"Successfully relaunch to the {arguments['path']} page")
+
+
+@handler("get_current_page")
+def get_current_page(session: Session, arguments):
+    page = session.sync_page() if arguments["refresh"] else session.current_page()
+    result = {
+        "path": "/" + page.path.lstrip("/"),
+        "query": page.query,
+        "stack": session.get_page_stack(),
+    }
+    return success(f"```json\n{json.dumps(result, indent=4, ensure_ascii=False)}```")
+
+
+# @handler("evaluate")
+# def evaluate(session: Session, arguments):
+#     msg_id = session.app.evaluate(arguments["code"], arguments["params"], sync=False)
+#     result = session.app.get_async_response(msg_id, 5)
+#     return success(f"Evaluate, Result: {result}")
+
+
+@handler("call_method")
+def call_method(session: Session, arguments):
+    result = session.current_page().call_method(arguments["method"], arguments.get("params") or {})
+    return success(f"Call method, Result: {result}")
+
+
+@handler("page_scroll_to")
+def page_scroll_to(session: Session, arguments):
+    session.current_page().scroll_to(arguments["top"], arguments["duration"])
+    return success(f"Page scroll to, Top: {arguments['top']}, Duration: {arguments['duration']}")
+
+
+@handler("page_get_wxml")
+def page_get_wxml(session: Session, arguments):
+    # 页面可能在没有命令的情况下自行变化（异步数据、定时器），每次都重新读取
+    document = session.get_document(refresh=True)
+    previous = session.remember_document(session.current_page().page_id, document)
+    full = document.compact() if arguments["format"] == "compact" else document.markup
+    if arguments["diff"] and previous is not None:
+        changes = wxml.diff(previous, document)
+        if not changes:
+            return success("No changes since last read")
+        # 差异比完整文档还大时直接返回完整文档
+        if len(changes) < len(full):
+            return success(f"Changes since last read:\n```diff\n{changes}\n```")
+    if arguments["format"] == "compact":
+        return success(f"```\n{full}\n```")
+    return success(f"```xml\n{full}```")
+
+
+@handler("page_get_css")
+def page_get_css(session: Session, arguments):
+    document = session.get_document(arguments["refresh"])
+    return success(f"```css\n{document.style}```")
+
+
+@handler("page_get_data")
+def page_get_data(session: Session, arguments):
+    page = session.current_page()
+    path = arguments.get("path") or ""
+    data = datapath.select(page.data, datapath.parse_path(path))
+    data, page_info = datapath.paginate(data, arguments["offset"], arguments.get("limit"))
+
+    key = f"{path}|{arguments['offset']}|{arguments.get('limit')}"
+    previous = session.remember_data(page.page_id, key, data)
+    if arguments["changes"] and previous is not None:
+        patch = datapath.diff(previous, data)
+        if not patch:
+            return success("No changes since last read")
+        return success(f"JSON Patch since last read:\n```json\n{json.dumps(patch, indent=4, ensure_ascii=False)}```")
+
+    if page_info is not None:
+        data = {"items": data, **page_info}
+    return success(f"```json\n{json.dumps(data, indent=4, ensure_ascii=False)}```")
+
+
+def _observe(session: Session, arguments) -> tuple[bool, Any]:
+    """Check the wait_for condition once; returns (met, observed value)."""
+    condition = arguments["condition"]
+    if condition == "route_equals":
+        path = normalize(session.sync_page().path)
+        return path == normalize(arguments["path"]), "/" + path
+    page = session.current_page()
+    if condition == "data_equals":
+        try:
+            value = datapath.select(page.data, datapath.parse_path(arguments["path"]))
+        except ValueError as e:
+            return False, str(e)
+        return value == arguments["value"], value
+    if condition == "text_present":
+        if arguments.get("selector"):
+            elements = page.get_elements(arguments["selector"], max_timeout=0, text_contains=arguments["text"])
+            return bool(elements), len(elements)
+        texts = [node.text for _, node in session.get_document(refresh=True).walk() if node.text]
+        return any(arguments["text"] in text for text in texts), len(texts)
+    elements = page.get_elements(arguments["selector"], max_timeout=0)
+    if condition == "selector_exists" or not elements:
+        return bool(elements), len(elements)
+    # selector_visible：有尺寸且未被 display / visibility 隐藏
+    element = elements[0]
+    size = element.size
+    styles = element.styles(["display", "visibility"]) or []
+    observed = {"width": size["width"], "height": size["height"], "styles": styles}
+    visible = size["width"] > 0 and size["height"] > 0 and "none" not in styles and "hidden" not in styles
+    return visible, observed
+
+
+@handler("wait_for")
+def wait_for(session: Session, arguments):
+    condition = arguments["condition"]
+    # value 可以是 null，其余参数必须有值
+    missing = [key for key in WAIT_ARGUMENTS[condition]
+               if key not in arguments or (key != "value" and arguments[key] is None)]
+    if missing:
+        return error(f"Condition {condition} requires {', '.join(missing)}")
+    deadline = get_command("wait_for").deadline(arguments.get("timeout"))
+    started = time.monotonic()
+    expires = started + max(deadline - min(WAIT_MARGIN, deadline / 5), 0)
+    interval = POLL_MIN
+    polls = 0
+    observed = last_error = None
+    while True:
+        polls += 1
+        previous = observed
+        try:
+            met, observed = _observe(session, arguments)
+            last_error = None
+        except Exception as e:
+            # 页面切换中查询可能失败，继续轮询
+            met, last_error = False, str(e)
+        result = {
+            "condition": condition,
+            "met": met,
+            "elapsed": round(time.monotonic() - started, 3),
+            "polls": polls,
+            "value": observed,
+        }
+        if met:
+            return success(json.dumps(result, ensure_ascii=False, default=str))
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            if last_error is not None:
+                result["error"] = last_error
+            return error(json.dumps(result, ensure_ascii=False, default=str))
+        # 观察值在变化说明页面仍在更新，尽快再次检查；否则逐步拉长间隔
+        interval = POLL_MIN if polls > 1 and observed != previous else min(interval * POLL_GROWTH, POLL_MAX)
+        time.sleep(min(interval, remaining))
+
+
+@handler("page_set_data")
+def page_set_data(session: Session, arguments):
+    page = session.current_page()
+    page.data = {arguments['key']: arguments['value']}
+    return success(f"```json\n{json.dumps(page.data, indent=4, ensure_ascii=False)}```")
+
+
+@handler("tap")
+def tap(session: Session, arguments):
+    session.with_element(arguments["selector"], lambda el: el.tap())
+    return success("Tapped")
+
+
+@handler("long_press")
+def long_press(session: Session, arguments):
+    session.with_element(arguments["selector"], lambda el: el.long_press())
+    return success("Long pressed")
+
+
+@handler("move")
+def move(session: Session, arguments):
+    session.with_element(arguments["selector"], lambda el: el.move(arguments["left"], arguments["top"]))
+    return success(f"Moved to, Top: {arguments['top']}, Left: {arguments['left']}")
+
+
+@handler("input")
+def input_text(session: Session, arguments):
+    session.with_element(arguments["selector"], lambda el: el.input(arguments["text"]))
+    return success(f"Input, Text: {arguments['text']}")
+
+
+@handler("switch")
+def switch(session: Session, arguments):
+    session.with_element(arguments["selector"], lambda el: el.switch())
+    return success("Switched")
+
+
+@handler("slide_to")
+def slide_to(session: Session, arguments):
+    session.with_element(arguments["selector"], lambda el: el.slide_to(arguments["value"]))
+    return success(f"Slided to, Value: {arguments['value']}")
+
+
+@handler("pick")
+def pick(session: Session, arguments):
+    session.with_element(arguments["selector"], lambda el: el.pick(arguments["option"]))
+    return success(f"Picked, Option: {arguments['option']}")
+
+
+@handler("batch")
+def batch(session: Session, arguments):
+    results = []
+    images = []
+    stopped = False
+    for index, item in enumerate(arguments["commands"]):
+        name = item.get("name", "") if isinstance(item, dict) else ""
+        try:
+            if get_command(name).name == "batch":
+                raise ValueError("Nested batch is not allowed")
+            result = dispatch(session, name, item.get("arguments"))
+        except Exception as e:
+            result = error(str(e))
+
+        if result.get("type") == "image":
+            images.append({"mimeType": result["mimeType"], "data": result["data"]})
+            result = success(result.get("message") or f"Image {len(images)}")
+        results.append({"index": index, "name": name, **result})
+        if result["status"] == "error" and arguments["stop_on_error"]:
+            stopped = True
+            break
+
+    failed = sum(1 for result in results if result["status"] == "error")
+    summary = {
+        "total": len(arguments["commands"]),
+        "executed": len(results),
+        "failed": failed,
+        "stopped": stopped,
+        "results": results,
+    }
+    return {
+        "status": "success",
+        "message": f"```json\n{json.dumps(summary, indent=4, ensure_ascii=False)}```",
+        "images": images,
+    }
+
+
+@handler("replay")
+def replay(session: Session, arguments):
+    steps = arguments.get("steps") or (macro.load(arguments["path"]) if arguments.get("path") else None)
+    if not steps:
+        return error("Replay requires path or steps")
+
+    def call(name, step_arguments):
+        if get_command(name).name == "replay":
+            raise ValueError("Nested replay is not allowed")
+        return dispatch(session, name, step_arguments)
+
+    report = macro.replay(steps, call, arguments["assert"], arguments["stop_on_failure"])
+    message = f"```json\n{json.dumps(report, indent=4, ensure_ascii=False)}```"
+    return error(message) if report["failed"] else success(message)
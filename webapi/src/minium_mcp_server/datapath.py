@@ -0,0 +1,146 @@
+"""
+Projection and change tracking for page data.
+
+Paths accept a JSONPath subset (`$.list[0].name`, `$.list[*].id`,
+`$.list[2:5]`) or a plain key path (`list.0.name`, `list[0].name`).
+`diff()` produces RFC 6902 JSON Patch operations.
+"""
+import re
+from typing import Any
+
+_TOKEN = re.compile(r"""
+    \.?(?P<key>[^.\[\]]+)             # .key / key
+    | \[(?P<index>-?\d+)\]            # [0]
+    | \[(?P<slice>-?\d*:-?\d*)\]      # [1:3]
+    | \[(?P<wildcard>\*)\]            # [*]
+    | \[['"](?P<quoted>[^'"]*)['"]\]  # ['key']
+""", re.VERBOSE)
+
+# 路径不存在时的标记，区别于值为 None
+_MISSING = object()
+
+
+def parse_path(path: str) -> list[tuple[str, Any]]:
+    """Split a path into `(kind, value)` tokens."""
+    path = (path or "").strip()
+    if path.startswith("$"):
+        path = path[1:]
+    tokens = []
+    position = 0
+    while position < len(path):
+        match = _TOKEN.match(path, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Invalid data path at position {position}: {path}")
+        position = match.end()
+        if match.group("key") is not None:
+            key = match.group("key")
+            tokens.append(("index", int(key)) if key.lstrip("-").isdigit() else ("key", key))
+        elif match.group("index") is not None:
+            tokens.append(("index", int(match.group("index"))))
+        elif match.group("slice") is not None:
+            start, _, stop = match.group("slice").partition(":")
+            tokens.append(("slice", slice(int(start) if start else None, int(stop) if stop else None)))
+        elif match.group("wildcard") is not None:
+            tokens.append(("wildcard", None))
+        else:
+            tokens.append(("key", match.group("quoted")))
+    return tokens
+
+
+def to_key_path(tokens: list[tuple[str, Any]]) -> str:
+    """Format tokens as `a.b[0].c` for messages."""
+    path = ""
+    for kind, value in tokens:
+        if kind == "key":
+            path += f".{value}" if path else value
+        elif kind == "index":
+            path += f"[{value}]"
+        elif kind == "slice":
+            path += f"[{value.start if value.start is not None else ''}:{value.stop if value.stop is not None else ''}]"
+        else:
+            path += "[*]"
+    return path
+
+
+def _step(value, kind, arg):
+    if kind == "key":
+        return value.get(arg, _MISSING) if isinstance(value, dict) else _MISSING
+    if kind == "index":
+        if isinstance(value, list) and -len(value) <= arg < len(value):
+            return value[arg]
+        if isinstance(value, dict):
+            return value.get(str(arg), _MISSING)
+        return _MISSING
+    if kind == "slice":
+        return value[arg] if isinstance(value, list) else _MISSING
+    # wildcard
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return list(value.values())
+    return _MISSING
+
+
+def select(data: Any, tokens: list[tuple[str, Any]]) -> Any:
+    """Apply path tokens to `data`. Wildcards and slices map over the rest of the path."""
+    for position, (kind, arg) in enumerate(tokens):
+        data = _step(data, kind, arg)
+        if data is _MISSING:
+            raise ValueError(f"Path not found: {to_key_path(tokens[:position + 1]) or '$'}")
+        if kind in ("slice", "wildcard"):
+            rest = tokens[position + 1:]
+            if not rest:
+                return data
+            result = []
+            for item in data:
+                try:
+                    result.append(select(item, rest))
+                except ValueError:
+                    continue
+            return result
+    return data
+
+
+def paginate(value: Any, offset: int = 0, limit: int | None = None) -> tuple[Any, dict | None]:
+    """Slice a list value; returns the page and `{offset, limit, total}`."""
+    if not isinstance(value, list) or (not offset and limit is None):
+        return value, None
+    end = None if limit is None else offset + limit
+    return value[offset:end], {"offset": offset, "limit": limit, "total": len(value)}
+
+
+def _pointer(parts: list) -> str:
+    return "".join("/" + str(part).replace("~", "~0").replace("/", "~1") for part in parts)
+
+
+def diff(old: Any, new: Any, parts: list | None = None) -> list[dict[str, Any]]:
+    """JSON Patch operations turning `old` into `new`."""
+    parts = parts or []
+    if type(old) is not type(new):
+        return [{"op": "replace", "path": _pointer(parts), "value": new}]
+    if isinstance(old, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": _pointer(parts + [key])})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": _pointer(parts + [key]), "value": value})
+            elif old[key] != value:
+                ops.extend(diff(old[key], value, parts + [key]))
+        return ops
+    if isinstance(old, list):
+        ops = []
+        common = min(len(old), len(new))
+        for index in range(common):
+            if old[index] != new[index]:
+                ops.extend(diff(old[index], new[index], parts + [index]))
+        # 从尾部删除，保证下标有效
+        for index in range(len(old) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": _pointer(parts + [index])})
+        for index in range(common, len(new)):
+            ops.append({"op": "add", "path": _pointer(parts + ["-"]), "value": new[index]})
+        return ops
+    if old != new:
+        return [{"op": "replace", "path": _pointer(parts), "value": new}]
+    return []
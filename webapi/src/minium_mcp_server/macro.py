@@ -0,0 +1,186 @@
+"""
+Recording and replay of tool calls.
+
+With `MINIUM_MACRO_FILE` set, every MCP tool call is appended to the file as
+one JSON line: tool name, arguments, result status and hash, and timings.
+`minium_replay` runs such a macro in one session at machine speed, checks the
+results and reports how the duration of each step drifted from the recording.
+`minium-replay FILE` does the same from the command line.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+import urllib.request
+from typing import Any, Callable
+
+logger = logging.getLogger('minium-mcp-server')
+
+# 宏文件路径，未设置时不记录
+MACRO_FILE = os.environ.get('MINIUM_MACRO_FILE')
+# 不记录的命令：统计结果每次都不同，回放本身由其中的步骤组成
+UNRECORDED = ("stats", "replay")
+# 回放时的校验方式：不校验、只比较状态、比较状态和结果哈希
+ASSERTIONS = ("none", "status", "hash")
+
+
+def result_hash(result: dict[str, Any]) -> str:
+    """Short hash of the content of a command result."""
+    content = {key: result.get(key) for key in ("status", "message", "data", "images")}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, ensure_ascii=False, default=str).encode()).hexdigest()[:16]
+
+
+class Recorder:
+    """Appends tool calls to a macro file; does nothing without a path."""
+
+    def __init__(self, path: str | None = MACRO_FILE):
+        self.path = path
+        self.enabled = bool(path)
+        self._lock = threading.Lock()
+
+    def record(self, name: str, tool_name: str, arguments: dict[str, Any] | None,
+               result: dict[str, Any], started: float) -> None:
+        """Append the call of command `name`, started at `started` (`time.perf_counter()`)."""
+        if not self.enabled or name in UNRECORDED:
+            return
+        duration = time.perf_counter() - started
+        step = {
+            "name": tool_name,
+            "arguments": arguments or {},
+            "status": result.get("status"),
+            "hash": result_hash(result),
+            # 调用开始的时间
+            "at": round(time.time() - duration, 3),
+            "duration_ms": round(duration * 1000, 3),
+        }
+        line = json.dumps(step, ensure_ascii=False, default=str)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as file:
+                file.write(line + "\n")
+        except OSError as e:
+            logger.error(f"Error recording macro step: {e}")
+
+
+RECORDER = Recorder()
+
+
+def load(path: str) -> list[dict]:
+    """Read the steps of a macro file."""
+    steps = []
+    with open(path, encoding="utf-8") as file:
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                steps.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid macro step at {path}:{number}: {e}") from e
+    return steps
+
+
+def check(step: dict, result: dict[str, Any], assertion: str) -> list[str]:
+    """Failures of `result` against the recorded `step` and its optional `expect`."""
+    failures = []
+    # 步骤中可以手动加入 expect: {"status", "hash", "contains"}
+    expect = step.get("expect") or {}
+    # 手写的步骤没有记录状态时应当成功
+    status = expect.get("status") or (step.get("status") or "success" if assertion != "none" else None)
+    if status and result.get("status") != status:
+        failures.append(f"status {result.get('status')} != {status}: {result.get('message')}")
+    digest = expect.get("hash") or (step.get("hash") if assertion == "hash" else None)
+    if digest and result_hash(result) != digest:
+        failures.append(f"hash {result_hash(result)} != {digest}")
+    contains = expect.get("contains")
+    if contains and contains not in (result.get("message") or ""):
+        failures.append(f"result does not contain {contains!r}")
+    return failures
+
+
+def replay(steps: list[dict], call: Callable[[str, dict], dict[str, Any]],
+           assertion: str = "status", stop_on_failure: bool = True) -> dict[str, Any]:
+    """Run `steps` one after another through `call(name, arguments)` and report the results."""
+    results = []
+    stopped = False
+    started = time.perf_counter()
+    for index, step in enumerate(steps):
+        name = step.get("name", "") if isinstance(step, dict) else ""
+        step_started = time.perf_counter()
+        try:
+            result = call(name, dict(step.get("arguments") or {}))
+        except Exception as e:
+            result = {"status": "error", "message": str(e)}
+        duration = round((time.perf_counter() - step_started) * 1000, 3)
+        failures = check(step, result, assertion) if name else ["missing name"]
+        recorded = step.get("duration_ms") if isinstance(step, dict) else None
+        results.append({
+            "index": index,
+            "name": name,
+            "status": result.get("status"),
+            "ok": not failures,
+            "failures": failures,
+            "duration_ms": duration,
+            "recorded_ms": recorded,
+            "drift_ms": round(duration - recorded, 3) if recorded is not None else None,
+        })
+        if failures and stop_on_failure:
+            stopped = True
+            break
+
+    recorded = [step for step in steps if isinstance(step, dict) and step.get("at") is not None]
+    report = {
+        "total": len(steps),
+        "executed": len(results),
+        "failed": sum(1 for result in results if not result["ok"]),
+        "stopped": stopped,
+        "replayed_ms": round((time.perf_counter() - started) * 1000, 3),
+        # 录制时从第一步开始到最后一步结束的时间，包括两次调用之间的等待
+        "recorded_ms": round((recorded[-1]["at"] - recorded[0]["at"]) * 1000 + recorded[-1].get("duration_ms", 0), 3)
+        if recorded else None,
+        "steps": results,
+    }
+    return report
+
+
+def main():
+    """Replay a macro file against a session and print the report."""
+    parser = argparse.ArgumentParser(description='Replay a Minium MCP macro file')
+    parser.add_argument('file', help='Macro file written with MINIUM_MACRO_FILE')
+    parser.add_argument('--project', help='Open this project and replay in-process, instead of through the web service')
+    parser.add_argument('--bridge', default='http://127.0.0.1:9188', help='URL of the web service')
+    parser.add_argument('--session', help='Session of the web service to replay in')
+    parser.add_argument('--assert', dest='assertion', choices=ASSERTIONS, default='status',
+                        help='Compare the status, or the status and result hash, of each step with the recording')
+    parser.add_argument('--keep-going', action='store_true', help='Run every step even after a failure')
+    args = parser.parse_args()
+
+    steps = load(args.file)
+    if args.project:
+        from .commands import dispatch
+        from .session import Session
+        session = Session(args.project, connect_on_demand=True)
+        try:
+            report = replay(steps, lambda name, arguments: dispatch(session, name, arguments),
+                            args.assertion, not args.keep_going)
+        finally:
+            session.shutdown()
+        message, failed = json.dumps(report, indent=4, ensure_ascii=False), report["failed"]
+    else:
+        payload = {
+            "name": "replay",
+            "arguments": {"steps": steps, "assert": args.assertion, "stop_on_failure": not args.keep_going},
+            "session": args.session,
+        }
+        request = urllib.request.Request(f"{args.bridge}/api/command", data=json.dumps(payload).encode(),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request) as response:
+            result = json.loads(response.read())
+        message, failed = result.get("message"), result.get("status") != "success"
+    print(message)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Per-command metrics in Prometheus text format.
+
+Latency histograms are split by phase, for example `queue` (waiting for the
+devtools), `devtools` (the Minium calls), `bridge` (the HTTP round trip) and
+`serialize` (building the response); `total` covers the whole call. Payload
+histograms count request and response bytes. `METRICS` is shared by
+everything in the process.
+"""
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .tools import get_command
+
+logger = logging.getLogger('minium-mcp-server')
+
+# 没有 web 服务的进程（MCP 服务）在该端口提供 /metrics，0 表示不提供
+METRICS_PORT = int(os.environ.get('MINIUM_METRICS_PORT', 0))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class Histogram:
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float) -> None:
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                # 桶的边界收窄到实际观测到的最小值和最大值
+                lower = max(self.buckets[index - 1] if index else 0.0, self.min)
+                upper = min(self.buckets[index] if index < len(self.buckets) else self.max, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+
+def label(name: str | None) -> str:
+    """Metric label of a tool or command name; unknown names share one label."""
+    try:
+        return get_command(name or "").name
+    except ValueError:
+        return "unknown"
+
+
+def size_of(result) -> int:
+    """Approximate size in bytes of a command result, without serializing it."""
+    if isinstance(result, str):
+        return len(result)
+    if isinstance(result, dict):
+        return sum(size_of(value) for value in result.values())
+    if isinstance(result, list):
+        return sum(size_of(value) for value in result)
+    return 0
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{key}="{value}"' for key, value in labels.items())
+
+
+class Metrics:
+    """Latency, payload size, error and in-flight metrics per command."""
+
+    def __init__(self, prefix: str = "minium"):
+        self.prefix = prefix
+        # (command, phase) -> Histogram
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        # (command, direction) -> Histogram
+        self.payload: dict[tuple[str, str], Histogram] = {}
+        self.calls: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        self.in_flight: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, command: str, phase: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.latency.get((command, phase))
+            if histogram is None:
+                histogram = self.latency[(command, phase)] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+
+    def observe_size(self, command: str, direction: str, size: int) -> None:
+        with self._lock:
+            histogram = self.payload.get((command, direction))
+            if histogram is None:
+                histogram = self.payload[(command, direction)] = Histogram(SIZE_BUCKETS)
+            histogram.observe(size)
+
+    @contextmanager
+    def phase(self, command: str, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(command, phase, time.perf_counter() - start)
+
+    @contextmanager
+    def track(self, command: str):
+        """Count a call, its errors and time it as the `total` phase."""
+        with self._lock:
+            self.calls[command] = self.calls.get(command, 0) + 1
+            self.in_flight[command] = self.in_flight.get(command, 0) + 1
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.error(command)
+            raise
+        finally:
+            self.observe(command, "total", time.perf_counter() - start)
+            with self._lock:
+                self.in_flight[command] -= 1
+
+    def error(self, command: str) -> None:
+        with self._lock:
+            self.errors[command] = self.errors.get(command, 0) + 1
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        prefix = self.prefix
+        lines = []
+        with self._lock:
+            lines.append(f"# HELP {prefix}_command_calls_total Commands received.")
+            lines.append(f"# TYPE {prefix}_command_calls_total counter")
+            for command, count in sorted(self.calls.items()):
+                lines.append(f"{prefix}_command_calls_total{{{_labels(command=command)}}} {count}")
+            lines.append(f"# HELP {prefix}_command_errors_total Commands that failed.")
+            lines.append(f"# TYPE {prefix}_command_errors_total counter")
+            for command, count in sorted(self.errors.items()):
+                lines.append(f"{prefix}_command_errors_total{{{_labels(command=command)}}} {count}")
+            lines.append(f"# HELP {prefix}_command_in_flight Commands currently running.")
+            lines.append(f"# TYPE {prefix}_command_in_flight gauge")
+            for command, count in sorted(self.in_flight.items()):
+                lines.append(f"{prefix}_command_in_flight{{{_labels(command=command)}}} {count}")
+            for name, help_text, histograms, label in (
+                ("command_duration_seconds", "Command latency by phase.", self.latency, "phase"),
+                ("command_payload_bytes", "Request and response size.", self.payload, "direction"),
+            ):
+                lines.append(f"# HELP {prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {prefix}_{name} histogram")
+                for (command, value), histogram in sorted(histograms.items()):
+                    labels = _labels(**{"command": command, label: value})
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{prefix}_{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f"{prefix}_{name}_sum{{{labels}}} {histogram.sum}")
+                    lines.append(f"{prefix}_{name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        """Calls, errors and p50/p99 milliseconds by phase for each command."""
+        with self._lock:
+            result = {}
+            for command, count in sorted(self.calls.items()):
+                result[command] = {
+                    "calls": count,
+                    "errors": self.errors.get(command, 0),
+                    "in_flight": self.in_flight.get(command, 0),
+                }
+            for (command, phase), histogram in sorted(self.latency.items()):
+                result.setdefault(command, {})[phase] = {
+                    "mean_ms": round(histogram.sum / histogram.count * 1000, 1),
+                    "p50_ms": round(histogram.quantile(0.5) * 1000, 1),
+                    "p99_ms": round(histogram.quantile(0.99) * 1000, 1),
+                }
+            for (command, direction), histogram in sorted(self.payload.items()):
+                result.setdefault(command, {})[f"{direction}_bytes"] = round(histogram.sum / histogram.count)
+            return result
+
+
+METRICS = Metrics()
+
+
+def serve(port: int, host: str = "127.0.0.1", metrics: Metrics = METRICS) -> ThreadingHTTPServer:
+    """Serve `/metrics` on a background thread, for processes without a web server."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="minium-metrics", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
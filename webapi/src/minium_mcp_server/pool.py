@@ -0,0 +1,336 @@
+import os
+import time
+import logging
+import threading
+from functools import partial
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from .commands import cancelled as cancelled_result, dispatch, timed_out
+from .health import HEALTH_INTERVAL, UNGATED, Watchdog
+from .metrics import METRICS, label
+from .session import Session, launch
+from .tools import get_command
+from .tracing import TRACER
+from .warmpool import Factory, WarmPool
+
+logger = logging.getLogger('minium-mcp-server')
+
+DEFAULT_SESSION = 'default'
+# 同时打开的会话上限，超出时关闭最久未使用的会话
+MAX_SESSIONS = int(os.environ.get('MINIUM_MAX_SESSIONS', 4))
+# 会话空闲超过该时间（秒）后关闭，0 表示不限制
+IDLE_TIMEOUT = float(os.environ.get('MINIUM_SESSION_IDLE_TIMEOUT', 1800))
+# 等待会话锁或命令结果时检查取消的间隔（秒）
+CANCEL_POLL = 0.1
+
+
+@dataclass
+class PoolEntry:
+    session: Session
+    # 同一会话的命令串行执行，不同会话之间互不阻塞
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    last_used: float = field(default_factory=time.monotonic)
+    # 已被关闭（淘汰或关闭全部），在持有 lock 时检查
+    closed: bool = False
+
+
+class SessionPool:
+    """Sessions keyed by id, with LRU and idle eviction and a health watchdog.
+
+    Eviction is lazy: it runs when a session is looked up (`get()`) and when
+    `evict_idle()` is called, e.g. by `GET /api/sessions`. There is no timer,
+    so an idle session stays open until the next request.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_timeout: float = IDLE_TIMEOUT,
+                 warm_pool: WarmPool | None = None, factory: Factory = launch,
+                 health_interval: float = HEALTH_INTERVAL):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.factory = factory
+        # 新会话从预热池中获取开发者工具实例
+        self.warm_pool = warm_pool
+        self._entries: OrderedDict[str, PoolEntry] = OrderedDict()
+        # project_path -> 正在打开该项目的会话，打开结束后释放
+        self._opening: dict[str, str] = {}
+        self._lock = threading.Lock()
+        # 事件订阅者 callback(session_id, event, data)
+        self._subscribers = []
+        # request_id -> 取消标记
+        self._cancels: dict[str, threading.Event] = {}
+        # 执行命令的线程，调用方超时后命令在这里继续运行到结束
+        self._calls = ThreadPoolExecutor(max_workers=max(8, max_sessions * 2), thread_name_prefix="minium-call")
+        self.watchdog = Watchdog(self._open_sessions, self._recover, interval=health_interval).start()
+
+    def get(self, session_id: str, create: bool = False) -> PoolEntry:
+        """Return the entry of `session_id`, creating an empty session if asked."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                if not create:
+                    raise RuntimeError(f"Unknown session: {session_id}, please call minium_open first")
+                entry = self._entries[session_id] = PoolEntry(Session(factory=self.factory, warm_pool=self.warm_pool))
+                entry.session.on_event = partial(self._emit, session_id)
+            self._entries.move_to_end(session_id)
+            entry.last_used = time.monotonic()
+            evicted = self._select_evictions(keep=session_id)
+        for victim_id, victim in evicted:
+            self._close(victim_id, victim)
+        return entry
+
+    def prepare(self, command: dict) -> tuple[str, str, PoolEntry | None]:
+        """Resolve the session id, command name and pool entry of a bridge request."""
+        session_id = command.get('session') or DEFAULT_SESSION
+        definition = get_command(command['name'])
+        name = definition.name
+        if definition.stateless:
+            return session_id, name, None
+        path = (command.get('arguments') or {}).get("path") if name == "open" else None
+        if path:
+            # 检查和占用在同一次加锁中完成，并发打开同一项目时只有一个会话成功
+            with self._lock:
+                owner = self._owner(path)
+                if owner is not None and owner != session_id:
+                    raise RuntimeError(f"Project {path} is already open in session {owner}")
+                self._opening[path] = session_id
+        # 宏通常以 minium_open 开始，回放也可以创建会话
+        return session_id, name, self.get(session_id, create=name in ("open", "replay"))
+
+    def execute(self, session_id: str, name: str, entry: PoolEntry | None, arguments: dict | None,
+                deadline: float | None = None, cancelled: threading.Event | None = None) -> dict:
+        """Run a prepared command under the session lock.
+
+        Gives up when `deadline` seconds pass or `cancelled` is set: a command
+        still waiting for the lock is dropped, a running one finishes in the
+        background and releases the lock when the devtools answer.
+        """
+        if entry is None:
+            return dispatch(None, name, arguments)
+        expires = time.monotonic() + deadline if deadline else None
+        cancelled = cancelled or threading.Event()
+        dispatched = False
+        try:
+            while True:
+                # 连接恢复期间等待恢复完成或直接失败，不在失效的连接上等到超时
+                if not entry.session.health.gate(name, expires, cancelled):
+                    return self._abandoned(name, deadline, "recovery", cancelled)
+                with METRICS.phase(name, "lock"), TRACER.span("lock"):
+                    acquired = self._wait(lambda timeout: entry.lock.acquire(timeout=timeout), expires, cancelled)
+                if not acquired:
+                    return self._abandoned(name, deadline, "queue", cancelled)
+                if entry.closed:
+                    # 排队期间会话被淘汰，开发者工具已关闭
+                    entry.lock.release()
+                    raise RuntimeError(f"Session {session_id} was closed, please call minium_open first")
+                if entry.session.health.healthy or name in UNGATED:
+                    break
+                # 排队期间连接失效，释放锁让恢复先执行
+                entry.lock.release()
+            future = self._calls.submit(self._dispatch, session_id, entry, name, arguments, TRACER.context())
+            dispatched = True
+        finally:
+            if not dispatched and name == "open":
+                # 没有执行的打开命令不再占用项目
+                self._release_project(session_id, arguments)
+        if not self._wait(lambda timeout: bool(wait([future], timeout).done), expires, cancelled):
+            logger.warning(f"Command {name} of session {session_id} is still running, the session stays locked")
+            return self._abandoned(name, deadline, "devtools", cancelled)
+        result = future.result()
+        if name == "shutdown":
+            self.remove(session_id)
+        return result
+
+    def run(self, command: dict, cancelled: threading.Event | None = None) -> dict:
+        """Run a bridge request `{"name", "arguments", "session", "timeout", "request_id"}` and return its result.
+
+        Setting `cancelled`, or calling `cancel()` with the request id, stops waiting for the result.
+        """
+        name = label(command.get('name'))
+        session_id = command.get('session') or DEFAULT_SESSION
+        # request_id 用于取消请求
+        request_id = command.get('request_id')
+        cancelled = cancelled or threading.Event()
+        if request_id:
+            with self._lock:
+                self._cancels[request_id] = cancelled
+        # 调用方通过 trace 字段传入父 span
+        with METRICS.track(name), TRACER.span("command", command.get('trace'), command=name, session=session_id) as span:
+            try:
+                result = self.execute(*self.prepare(command), command.get('arguments'), self.deadline(command), cancelled)
+            except Exception as e:
+                result = {
+                    "status": "error",
+                    "message": str(e)
+                }
+            finally:
+                if request_id:
+                    with self._lock:
+                        self._cancels.pop(request_id, None)
+            if result.get("status") == "error":
+                METRICS.error(name)
+                if span is not None:
+                    span.fail(result.get("message"))
+        return result
+
+    def cancel(self, request_id: str) -> bool:
+        """Stop waiting for the request `request_id`; returns False when it is unknown."""
+        with self._lock:
+            cancelled = self._cancels.get(request_id)
+        if cancelled is None:
+            return False
+        cancelled.set()
+        return True
+
+    def deadline(self, command: dict) -> float | None:
+        """Seconds allowed for a bridge request, from its `timeout` or the command's default."""
+        try:
+            definition = get_command(command.get('name') or '')
+            return definition.deadline(command.get('timeout') or (command.get('arguments') or {}).get('timeout'))
+        except ValueError:
+            # 未知命令或无效的 timeout 在执行时返回参数错误
+            return None
+
+    @staticmethod
+    def _wait(wait, expires: float | None, cancelled: threading.Event) -> bool:
+        """Call `wait(timeout)` in short slices until it returns True, `expires` passes or `cancelled` is set."""
+        if wait(0):
+            return True
+        while not cancelled.is_set():
+            remaining = CANCEL_POLL if expires is None else min(CANCEL_POLL, expires - time.monotonic())
+            if remaining <= 0:
+                return False
+            if wait(remaining):
+                return True
+        return False
+
+    @staticmethod
+    def _abandoned(name: str, deadline: float | None, phase: str, cancelled: threading.Event) -> dict:
+        if cancelled.is_set():
+            return cancelled_result(name)
+        return timed_out(name, deadline, phase)
+
+    def _dispatch(self, session_id: str, entry: PoolEntry, name: str, arguments: dict | None,
+                  parent: dict | None) -> dict:
+        # 在执行线程中运行，结束后释放会话锁；调用方超时放弃等待后也是如此
+        try:
+            with METRICS.phase(name, "devtools"), TRACER.span("devtools", parent, command=name):
+                return dispatch(entry.session, name, arguments)
+        finally:
+            if name == "open":
+                self._release_project(session_id, arguments)
+                if entry.session.mini is None:
+                    # 打开失败的会话不占用会话数，排队的命令看到 closed 后失败
+                    entry.closed = True
+                    with self._lock:
+                        if self._entries.get(session_id) is entry:
+                            del self._entries[session_id]
+            entry.lock.release()
+
+    def _release_project(self, session_id: str, arguments: dict | None) -> None:
+        path = (arguments or {}).get("path")
+        with self._lock:
+            if path and self._opening.get(path) == session_id:
+                del self._opening[path]
+
+    def subscribe(self, callback) -> None:
+        """Call `callback(session_id, event, data)` for log and route events of every session."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _emit(self, session_id: str, event: str, data: dict) -> None:
+        for callback in list(self._subscribers):
+            callback(session_id, event, data)
+
+    def owner(self, project_path: str) -> str | None:
+        """Id of the session holding or opening `project_path`, if any."""
+        with self._lock:
+            return self._owner(project_path)
+
+    def _owner(self, project_path: str) -> str | None:
+        # 调用方持有 self._lock
+        if project_path in self._opening:
+            return self._opening[project_path]
+        for session_id, entry in self._entries.items():
+            if entry.session.mini is not None and entry.session.project_path == project_path:
+                return session_id
+        return None
+
+    def remove(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def sessions(self) -> list[dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "session": session_id,
+                "project_path": entry.session.project_path,
+                "open": entry.session.mini is not None,
+                "busy": entry.lock.locked(),
+                "health": entry.session.health.state,
+                "idle": round(now - entry.last_used, 1),
+            } for session_id, entry in self._entries.items()]
+
+    def evict_idle(self) -> None:
+        with self._lock:
+            evicted = self._select_evictions()
+        for victim_id, victim in evicted:
+            self._close(victim_id, victim)
+
+    def close_all(self) -> None:
+        self.watchdog.close()
+        self._calls.shutdown(wait=False)
+        with self._lock:
+            entries = list(self._entries.items())
+            self._entries.clear()
+        for session_id, entry in entries:
+            self._close(session_id, entry)
+        if self.warm_pool is not None:
+            self.warm_pool.close()
+
+    def _open_sessions(self) -> list[tuple[str, Session]]:
+        with self._lock:
+            return [(session_id, entry.session) for session_id, entry in self._entries.items()
+                    if entry.session.mini is not None or not entry.session.health.healthy]
+
+    def _recover(self, session_id: str, session: Session) -> None:
+        with self._lock:
+            entry = self._entries.get(session_id)
+        if entry is None or entry.session is not session:
+            # 会话已关闭，无需恢复
+            session.health.restored()
+            return
+        with entry.lock:
+            if entry.closed:
+                session.health.restored()
+                return
+            session.reconnect()
+
+    def _select_evictions(self, keep: str | None = None) -> list[tuple[str, PoolEntry]]:
+        """Pop idle and over-capacity sessions. Caller holds `self._lock`."""
+        now = time.monotonic()
+        victims = []
+        for session_id, entry in list(self._entries.items()):
+            if session_id == keep or entry.lock.locked():
+                continue
+            idle = self.idle_timeout and now - entry.last_used > self.idle_timeout
+            # 淘汰的会话已从 _entries 中移除
+            over = len(self._entries) > self.max_sessions
+            if idle or over:
+                victims.append((session_id, self._entries.pop(session_id)))
+        return victims
+
+    def _close(self, session_id: str, entry: PoolEntry) -> None:
+        # 等待已取得该会话的命令执行完，之后排队的命令看到 closed 后不再执行
+        with entry.lock:
+            entry.closed = True
+            logger.info(f"Closing session {session_id} ({entry.session.project_path})")
+            try:
+                entry.session.shutdown()
+            except Exception as e:
+                logger.error(f"Error closing session {session_id}: {e}")
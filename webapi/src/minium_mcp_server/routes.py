@@ -0,0 +1,91 @@
+import os
+import json
+import time
+import logging
+
+logger = logging.getLogger('minium-mcp-server')
+
+# 两次检查 app.json 修改时间之间的最小间隔（秒）
+CHECK_INTERVAL = 1.0
+
+
+def normalize(path: str) -> str:
+    """Make a page path root-relative: `/pages/a/index?x=1` -> `pages/a/index`."""
+    return path.split("?", 1)[0].strip().lstrip("/")
+
+
+class RouteIndex:
+    """Page routes declared in a project's `app.json`.
+
+    The file is parsed once and only reloaded when its mtime changes; the
+    mtime itself is checked at most every `CHECK_INTERVAL` seconds. Where
+    `app.json` lives is resolved from `project.config.json` only once. Lookups
+    are set/dict operations and never touch the devtools.
+    """
+
+    def __init__(self, project_path: str):
+        self.project_path = project_path
+        self.pages: list[str] = []
+        self.tabs: frozenset[str] = frozenset()
+        # 分包根目录 -> 分包页面
+        self.subpackages: dict[str, list[str]] = {}
+        self._mtime = None
+        self._checked_at = 0.0
+        self._app_json_path: str | None = None
+
+    @property
+    def app_json_path(self) -> str:
+        if self._app_json_path is None:
+            # 使用第三方框架的项目会在 project.config.json 中指定小程序根目录
+            root = self.project_path
+            config_path = os.path.join(root, "project.config.json")
+            if os.path.isfile(config_path):
+                with open(config_path, "r", encoding="utf-8") as file:
+                    root = os.path.join(root, json.load(file).get("miniprogramRoot", ""))
+            self._app_json_path = os.path.join(root, "app.json")
+        return self._app_json_path
+
+    def refresh(self) -> None:
+        now = time.monotonic()
+        if self._mtime is not None and now - self._checked_at < CHECK_INTERVAL:
+            return
+        self._checked_at = now
+
+        path = self.app_json_path
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            logger.warning(f"app.json not found: {path}")
+            mtime = 0
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        self._load(path if mtime else None)
+
+    def _load(self, path: str | None) -> None:
+        app = {}
+        if path:
+            with open(path, "r", encoding="utf-8") as file:
+                app = json.load(file)
+
+        pages = [normalize(page) for page in app.get("pages", [])]
+        subpackages = {}
+        for package in app.get("subpackages") or app.get("subPackages") or []:
+            root = normalize(package.get("root", ""))
+            subpackages[root] = [f"{root.rstrip('/')}/{normalize(page)}" for page in package.get("pages", [])]
+            pages.extend(subpackages[root])
+
+        self.pages = pages
+        self.subpackages = subpackages
+        self.tabs = frozenset(normalize(item.get("pagePath", "")) for item in (app.get("tabBar") or {}).get("list", []))
+
+    def is_tab(self, path: str) -> bool:
+        self.refresh()
+        return normalize(path) in self.tabs
+
+    def navigate_method(self, path: str) -> str:
+        return "minium_switch_tab" if self.is_tab(path) else "minium_navigate_to"
+
+    def all_pages(self) -> list[str]:
+        self.refresh()
+        return self.pages
@@ -0,0 +1,151 @@
+"""
+Screenshot capture and optional re-encoding, without going through the
+project directory.
+
+Re-encoding (downscale, JPEG/WebP, grayscale) needs Pillow, installed with the
+`image` extra; without it the original PNG is returned unchanged.
+"""
+import io
+import os
+import uuid
+import hashlib
+import shutil
+import atexit
+import logging
+import tempfile
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger('minium-mcp-server')
+
+# 感知哈希允许的最大差异位数（共 256 位），未设置时只有完全相同的截图才视为未变化
+DEFAULT_THRESHOLD = int(os.environ["MINIUM_SCREENSHOT_THRESHOLD"]) if os.environ.get("MINIUM_SCREENSHOT_THRESHOLD") else None
+# 差异哈希的边长
+HASH_SIZE = 16
+
+MIME_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
+
+_private_dir = None
+
+
+def private_dir() -> str:
+    """A per-process temp directory, on tmpfs when available."""
+    global _private_dir
+    if _private_dir is None:
+        base = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        _private_dir = tempfile.mkdtemp(prefix="minium-screenshots-", dir=base)
+        atexit.register(shutil.rmtree, _private_dir, True)
+    return _private_dir
+
+
+def capture(app) -> bytes:
+    """Return the PNG bytes of the current screen."""
+    if app.platform == "ide":
+        # 开发者工具直接返回 base64 数据，全程在内存中完成
+        raw = app.screen_shot()
+    else:
+        # 真机截图需要落盘，使用唯一文件名避免并发冲突
+        path = os.path.join(private_dir(), f"{uuid.uuid4().hex}.png")
+        try:
+            raw = app.screen_shot(path)
+        finally:
+            if os.path.isfile(path):
+                os.remove(path)
+    if not raw:
+        raise RuntimeError("Failed to take a screenshot")
+    return raw
+
+
+def needs_encoding(max_width: int | None = None, format: str = "png", grayscale: bool = False) -> bool:
+    """Whether these options change the original PNG."""
+    return bool(max_width) or grayscale or format != "png"
+
+
+def encode(raw: bytes, max_width: int | None = None, format: str = "png",
+           quality: int | None = None, grayscale: bool = False) -> tuple[bytes, str]:
+    """Downscale and re-encode a PNG screenshot. Returns `(data, mime_type)`."""
+    if not needs_encoding(max_width, format, grayscale):
+        return raw, MIME_TYPES["png"]
+    if Image is None:
+        logger.warning("Pillow is not installed, returning the original screenshot")
+        return raw, MIME_TYPES["png"]
+
+    with Image.open(io.BytesIO(raw)) as image:
+        if grayscale:
+            image = image.convert("L")
+        if max_width and image.width > max_width:
+            height = max(1, round(image.height * max_width / image.width))
+            image = image.resize((max_width, height), Image.LANCZOS)
+        if format != "png" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        buffer = io.BytesIO()
+        if format == "png":
+            image.save(buffer, format="PNG", optimize=True)
+        else:
+            image.save(buffer, format=format.upper(), quality=min(max(quality or 75, 1), 100))
+    return buffer.getvalue(), MIME_TYPES[format]
+
+
+def fingerprint(raw: bytes) -> int | None:
+    """A 256-bit difference hash of the image, or None without Pillow."""
+    if Image is None:
+        return None
+    with Image.open(io.BytesIO(raw)) as image:
+        pixels = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR).tobytes()
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+class ScreenHistory:
+    """Remembers the last screenshot of a session to detect unchanged screens.
+
+    Exact repeats are found by a hash of the raw bytes. The perceptual
+    fingerprint needs decoding the PNG, so it is only computed when a
+    similarity threshold is requested.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.last_id = None
+        self._digest = None
+        # 上一张截图的原始数据，需要比较相似度时才计算指纹
+        self._raw = None
+        self._fingerprint = None
+        # 上一张截图返回时的编码参数
+        self._options = None
+
+    def unchanged(self, raw: bytes, threshold: int | None = None, options: tuple = ()) -> bool:
+        """Whether `raw` matches the last screenshot, taken with the same `options`, within `threshold` bits."""
+        if self.last_id is None or options != self._options:
+            return False
+        if hashlib.sha1(raw).digest() == self._digest:
+            return True
+        if threshold is None:
+            return False
+        if self._fingerprint is None:
+            self._fingerprint = fingerprint(self._raw)
+        current = fingerprint(raw)
+        if current is None or self._fingerprint is None:
+            return False
+        return (current ^ self._fingerprint).bit_count() <= threshold
+
+    def record(self, raw: bytes, options: tuple = ()) -> int:
+        self.count += 1
+        self.last_id = self.count
+        self._options = options
+        self._digest = hashlib.sha1(raw).digest()
+        self._raw = raw
+        self._fingerprint = None
+        return self.last_id
@@ -1,9 +1,9 @@
 import os
 import sys
-import logging
 import json
+import time
 import asyncio
-import requests
+import logging
 from mcp.server import NotificationOptions, Server
 from mcp.server.models import InitializationOptions
 
@@ -11,6 +11,13 @@ from mcp import types
 from typing import Any
 import mcp.server.stdio
 
+from . import metrics
+from .bridge import BridgeClient
+from .macro import RECORDER
+from .metrics import METRICS, label, size_of
+from .tools import TOOLS, get_command, to_content
+from .tracing import TRACER
+
 HOST = 'http://127.0.0.1'
 # HOST = 'http://192.168.3.42'
 PORT = 9188
@@ -22,369 +29,106 @@ if sys.platform == "win32" and os.environ.get('PYTHONIOENCODING') is None:
     sys.stderr.reconfigure(encoding="utf-8")
 
 logger = logging.getLogger('minium-mcp-server')
-print("Starting Minium MCP Server")
 
-async def main():
+# 未在调用中指定会话时使用的会话 id，多个客户端共用一个 web 服务时各自配置
+DEFAULT_SESSION = os.environ.get('MINIUM_SESSION')
+SESSION = {"type": "string", "description": "Session id. Each session has its own developer tool instance and project"}
+
+# 每个工具都可以指定会话
+SESSION_TOOLS = [
+    tool.model_copy(update={"inputSchema": {
+        **tool.inputSchema,
+        "properties": {**tool.inputSchema["properties"], "session": SESSION},
+    }})
+    for tool in TOOLS
+]
+
+# 小程序 log 类型 -> MCP 日志级别
+LOG_LEVELS = {"debug": "debug", "log": "info", "info": "info", "warn": "warning", "error": "error"}
+
+def create_server(bridge: BridgeClient) -> Server:
+    """The MCP server, forwarding every tool call to `bridge`."""
     server = Server("minium-mcp-server")
+    # 最近一次调用工具的客户端会话，web 服务推送的事件通过它转发为 MCP 日志通知
+    client = None
+    notifications = set()
+
+    async def send_event(level: str, message: dict):
+        try:
+            await client.send_log_message(level=level, data=message, logger="minium")
+        except Exception as e:
+            logger.error(f"Error forwarding event: {e}")
+
+    def forward_event(message: dict):
+        if client is None:
+            return
+        data = message.get("data") or {}
+        level = LOG_LEVELS.get(data.get("type"), "info") if message.get("event") == "log" else "info"
+        task = asyncio.create_task(send_event(level, message))
+        notifications.add(task)
+        task.add_done_callback(notifications.discard)
 
     @server.list_tools()
     async def handle_list_tools() -> list[types.Tool]:
         """List available tools"""
-        return [
-            types.Tool(
-                name="minium_open",
-                description="Open a project",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "path": {"type": "string", "description": "Project path"},
-                    },
-                    "required": ["path"],
-                }
-            ),
-            types.Tool(
-                name="minium_get_system_info",
-                description="Get system info",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                }
-            ),
-            types.Tool(
-                name="minium_shutdown",
-                description="Shutdown the developer tool",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                }
-            ),
-            types.Tool(
-                name="minium_screen_shot",
-                description="Take a screenshot of the current page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                },
-            ),
-            types.Tool(
-                name="minium_get_all_pages_path_and_method",
-                description="Get paths of all pages and the method used to navigate to them",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                }
-            ),
-            types.Tool(
-                name="minium_get_navigate_method_of_page",
-                description="Get the method used to navigate to a page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "path": {"type": "string", "description": "Page path"},
-                    },
-                    "required": ["path"],
-                }
-            ),
-            types.Tool(
-                name="minium_go_home",
-                description="Go to the home page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                }
-            ),
-            types.Tool(
-                name="minium_navigate_to",
-                description="Navigate to a page. Please get path of all pages before using this tool.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "path": {"type": "string", "description": "Page path"},
-                        "params": {"type": "object", "description": "Query parameters"},
-                    },
-                    "required": ["path"],
-                }
-            ),
-            types.Tool(
-                name="minium_navigate_back",
-                description="Navigate back to the previous page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                }
-            ),
-            types.Tool(
-                name="minium_switch_tab",
-                description="Switch to a tab. Please get path of all pages before using this tool.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "path": {"type": "string", "description": "Page path"},
-                    },
-                    "required": ["path"],
-                }
-            ),
-            types.Tool(
-                name="minium_redirect_to",
-                description="Redirect to a page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "path": {"type": "string", "description": "Page path"},
-                        "params": {"type": "object", "description": "Query parameters"},
-                    },
-                    "required": ["path"],
-                }
-            ),
-            types.Tool(
-                name="minium_relaunch",
-                description="Close all pages and open a new one",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "path": {"type": "string", "description": "Page path"},
-                        "params": {"type": "object", "description": "Query parameters"},
-                    },
-                    "required": ["path"],
-                }
-            ),
-            # types.Tool(
-            #     name="evaluate",
-            #     description="Evaluate a JavaScript(es5) code",
-            #     inputSchema={
-            #         "type": "object",
-            #         "properties": {
-            #             "code": {"type": "string", "description": "Script code"},
-            #             "params": {"type": "object", "description": "Script parameters"},
-            #         },
-            #         "required": ["code", "params"],
-            #     }
-            # ),
-            types.Tool(
-                name="minium_call_method",
-                description="Call a method of page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "method": {"type": "string", "description": "Method name"},
-                        "params": {"type": "object", "description": "Method parameters"},
-                    },
-                    "required": ["method", "params"],
-                }
-            ),
-            types.Tool(
-                name="minium_page_scroll_to",
-                description="Scroll to the specified position of an page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "top": {"type": "number", "description": "Scroll to the top"},
-                        "duration": {"type": "number", "description": "Scroll duration"},
-                    },
-                    "required": ["top", "duration"],
-                }
-            ),
-            types.Tool(
-                name="page_get_wxml",
-                description="Get Dom structure of an page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                }
-            ),
-            types.Tool(
-                name="page_get_css",
-                description="Get CSS structure of an page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                }
-            ),
-            types.Tool(
-                name="minium_page_get_data",
-                description="Get data of an page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
-                }
-            ),
-            types.Tool(
-                name="minium_page_set_data",
-                description="Set data of an page",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "key": {"type": "string", "description": "key of data"},
-                        "value": {"type": "string", "description": "value of data"},
-                    },
-                    "required": ["key", "value"],
-                }
-            ),
-            types.Tool(
-                name="minium_tap",
-                description="Tap an element",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "selector": {
-                            "type": "string", 
-                            "description": "CSS selector or XPath expression"
-                        },
-                    },
-                    "required": ["selector"],
-                }
-            ),
-            types.Tool(
-                name="minium_long_press",
-                description="Long press an element",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "selector": {
-                            "type": "string", 
-                            "description": "CSS selector or XPath expression"
-                        },
-                    },
-                    "required": ["selector"],
-                }
-            ),
-            types.Tool(
-                name="minium_move",
-                description="Perform gestures on the element",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "selector": {
-                            "type": "string", 
-                            "description": "CSS selector or XPath expression"
-                        },
-                        "top": {
-                            "type": "number",
-                            "description": "Move to the top coordinate"
-                        },
-                        "left": {
-                            "type": "number", 
-                            "description": "Move to the left coordinate"
-                        },
-                    },
-                    "required": ["selector", "top", "left"],
-                }
-            ),
-            types.Tool(
-                name="minium_input",
-                description="Input text to an element",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "selector": {
-                            "type": "string", 
-                            "description": "CSS selector or XPath expression"
-                        },
-                        "text": {
-                            "type": "string", 
-                            "description": "Text to input"
-                        },
-                    },
-                    "required": ["selector", "text"],
-                }
-            ),
-            types.Tool(
-                name="minium_switch",
-                description="Change the switch status of an element",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "selector": {
-                            "type": "string", 
-                            "description": "CSS selector or XPath expression"
-                        },
-                    },
-                    "required": ["selector"],
-                }
-            ),
-            types.Tool(
-                name="minium_slide_to",
-                description="Slide to the specified position of an element",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "selector": {
-                            "type": "string", 
-                            "description": "CSS selector or XPath expression"
-                        },
-                        "value": {
-                            "type": "number", 
-                            "description": "Slide value"
-                        },
-                    },
-                    "required": ["selector", "value"],
-                }
-            ),
-            types.Tool(
-                name="minium_pick",
-                description="Pick an option of an element",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "selector": {
-                            "type": "string", 
-                            "description": "CSS selector or XPath expression"
-                        },
-                        "option": {
-                            "type": "string", 
-                            "description": "Option value"
-                        },
-                    },
-                    "required": ["selector", "option"],
-                }
-            )
-        ]
+        return SESSION_TOOLS
 
     @server.call_tool()
     async def handle_call_tool(
         name: str, arguments: dict[str, Any] | None
     ):
         """Handle tool execution requests"""
-        print(f"Received call tool request: {name} with args: {arguments}")
+        logger.info(f"Received call tool request: {name} with args: {arguments}")
+        nonlocal client
+        client = server.request_context.session
 
+        command_label = label(name)
         try:
-            # Send HTTP request to web server
-            response = requests.post(
-                f"{HOST}:{PORT}/api/command",
-                json={
-                    "name": name.replace("minium_", ""),
-                    "arguments": arguments or {}
-                },
-                timeout=600000
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"HTTP error: {response.status_code}")
-                
-            response_data = response.json()
-            if response_data.get("status") == "error":
-                raise Exception(response_data.get("message", "Unknown error"))
+            with METRICS.track(command_label), TRACER.span("tool", command=command_label) as span:
+                # 先在本地校验参数，避免无效请求到达 web 服务
+                command = get_command(name)
+                arguments = command.validate(arguments)
+                session = arguments.pop("session", None) or DEFAULT_SESSION
+                # timeout 保留在参数中，minium_wait_for 用它作为等待时间
+                deadline = command.deadline(arguments.get("timeout"))
+                if span is not None and session:
+                    span.attrs["session"] = session
+                METRICS.observe_size(command_label, "request", size_of(arguments))
+                # 通过连接池异步转发到 web 服务，不阻塞 MCP 事件循环
+                started = time.perf_counter()
+                try:
+                    with METRICS.phase(command_label, "bridge"), TRACER.span("bridge"):
+                        response_data = await bridge.command(command.name, arguments, timeout=deadline, session=session)
+                except Exception as e:
+                    RECORDER.record(command.name, command.tool_name, arguments, {"status": "error", "message": str(e)}, started)
+                    raise
+                RECORDER.record(command.name, command.tool_name, arguments, response_data, started)
+                if command.name == "stats":
+                    # web 服务的统计之后附上本进程的统计
+                    response_data["message"] = (
+                        f"Bridge:\n{response_data['message']}\n"
+                        f"MCP server:\n```json\n{json.dumps(METRICS.summary(), indent=4)}```"
+                    )
+                METRICS.observe_size(command_label, "response", size_of(response_data))
+                with METRICS.phase(command_label, "serialize"):
+                    return to_content(response_data)
 
-            if response_data.get("type") == "image":
-                return [types.ImageContent(type="image", mimeType="image/png", data=response_data.get("data"))]
-                
-            return [types.TextContent(type="text", text=response_data.get("message"))]
-            
         except Exception as e:
             logger.error(f"Error handling tool request: {str(e)}")
             raise
 
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        print("Server running with stdio transport")
+    bridge.on_event = forward_event
+    return server
+
+async def main():
+    logger.info("Starting Minium MCP Server")
+    if metrics.METRICS_PORT:
+        metrics.serve(metrics.METRICS_PORT)
+
+    async with BridgeClient(f"{HOST}:{PORT}") as bridge, \
+            mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+        server = create_server(bridge)
+        logger.info("Server running with stdio transport")
         await server.run(
             read_stream,
             write_stream,
@@ -0,0 +1,378 @@
+import os
+import sys
+import time
+import logging
+from collections import deque
+
+from .applog import LogBuffer
+from .health import Health
+from .routes import RouteIndex, normalize
+from .screenshot import ScreenHistory
+from .warmpool import Factory, WarmPool, close_instance, launch_with_retry
+from . import wxml
+
+logger = logging.getLogger('minium-mcp-server')
+
+# 每个会话最多缓存的元素数量
+MAX_CACHED_ELEMENTS = 256
+# page_get_css 复用 page_get_wxml 刚读取的 wxml 的最长时间（秒），期间没有执行修改命令
+WXML_MAX_AGE = float(os.environ.get('MINIUM_WXML_MAX_AGE', 10))
+# 为增量输出保留的快照数量
+MAX_SNAPSHOTS = 8
+
+_MISSING = object()
+
+
+def get_dev_tool_path() -> str:
+    """Return the WeChat devtools cli path for the current OS."""
+    # 根据操作系统设置开发者工具cli路径
+    if sys.platform == 'darwin':  # macOS
+        return '/Applications/wechatwebdevtools.app/Contents/MacOS/cli'
+    elif sys.platform == 'win32':  # Windows
+        return 'C:/Program Files (x86)/Tencent/微信web开发者工具/cli.bat'
+    else:
+        raise Exception("Unsupported operating system")
+
+
+def launch(project_path: str):
+    """Launch the devtools for `project_path` and connect to it."""
+    # minium 的导入耗时较长，推迟到第一次启动开发者工具时
+    import minium
+    return minium.Minium({
+        "project_path": project_path,
+        "dev_tool_path": get_dev_tool_path(),
+        "debug_mode": "error"
+    })
+
+
+def _remember(snapshots: dict, key, value):
+    """Store `value` under `key`, keeping only the most recent entries."""
+    previous = snapshots.pop(key, _MISSING)
+    while len(snapshots) >= MAX_SNAPSHOTS:
+        snapshots.pop(next(iter(snapshots)))
+    snapshots[key] = value
+    return None if previous is _MISSING else previous
+
+
+class Session:
+    """A devtools connection and the project it was opened for.
+
+    Not thread-safe: callers must serialize access (the stdio driver thread,
+    or the command lock in `web.py`). Route events from minium's callback
+    thread are only queued; the calling thread applies them before reading
+    the page, the page stack or the route.
+    """
+
+    def __init__(self, project_path: str = '', factory: Factory = launch, warm_pool: WarmPool | None = None,
+                 connect_on_demand: bool = False):
+        self.project_path = project_path
+        self.mini = None
+        # 为 True 时，第一个需要开发者工具的命令才启动并连接开发者工具
+        self.connect_on_demand = connect_on_demand
+        # 创建 Minium 实例的函数，测试时可替换
+        self.factory = factory
+        self.warm_pool = warm_pool
+        # 从预热池取用的项目，关闭时归还，预热池随后补充实例
+        self.leased = None
+        self.routes = RouteIndex(project_path)
+        self.screens = ScreenHistory()
+        # 小程序 console 日志
+        self.logs = LogBuffer()
+        # (page_id, selector) -> 元素
+        self.elements = {}
+        # 当前页面与页面栈由导航结果和路由事件维护，避免每次都查询开发者工具
+        self.page = None
+        # [(webview_id, path), ...]
+        self.page_stack = []
+        # 最近一次进入的页面 (path, query)，重连后回到该页面
+        self.route = None
+        # 回调线程收到的 onAppRouteDone 参数，deque 的 append/popleft 是线程安全的
+        self.pending_routes = deque()
+        self.health = Health()
+        # 每次执行可能修改页面的命令后递增
+        self.revision = 0
+        # (page_id, revision, fetched_at, wxml.Document)
+        self.document = None
+        # page_id -> 上次返回给调用方的 wxml.Document，用于增量输出
+        self.returned_documents = {}
+        # (page_id, path) -> 上次返回的 data，用于 JSON Patch 输出
+        self.data_snapshots = {}
+        # 小程序事件回调 on_event(event, data)，在 minium 的回调线程中调用
+        self.on_event = None
+
+    def open(self, project_path: str | None = None):
+        if project_path and project_path != self.project_path:
+            self.project_path = project_path
+            self.routes = RouteIndex(project_path)
+        if not self.project_path:
+            raise ValueError("Project path is required")
+        # 先占用新项目再归还旧项目：重新打开同一项目时，预热池不会在两者之间启动新实例
+        previous, self.leased = self.leased, None
+        mini = None
+        if self.warm_pool is not None:
+            mini = self.warm_pool.acquire(self.project_path)
+            self.leased = self.project_path
+        if self.mini is not None:
+            try:
+                self._close()
+            except Exception as e:
+                # 连接已经断开时无法正常关闭，直接重新启动
+                logger.warning(f"Error closing the previous developer tool: {e}")
+                self.mini = None
+        if previous is not None:
+            self.warm_pool.release(previous)
+
+        started = time.perf_counter()
+        if mini is not None:
+            try:
+                self._attach(mini)
+                logger.info(f"Using warm developer tool for {self.project_path}")
+                return mini
+            except Exception as e:
+                # 预热的实例可能已经断开，改为重新启动
+                logger.warning(f"Warm instance for {self.project_path} is unusable: {e}")
+                close_instance(mini)
+                self.mini = None
+        try:
+            self._attach(launch_with_retry(self.factory, self.project_path))
+        except Exception:
+            self._release()
+            raise
+        logger.info(f"Developer tool for {self.project_path} connected in {time.perf_counter() - started:.1f}s")
+        return self.mini
+
+    def ping(self) -> None:
+        """Raise when the devtools do not answer; safe to call from another thread."""
+        mini = self.mini
+        if mini is not None:
+            mini.get_system_info()
+
+    def reconnect(self) -> None:
+        """Relaunch the devtools after the connection was lost and return to the last page."""
+        if self.health.healthy:
+            # 排队期间已通过 minium_open 重新连接
+            return
+        self.apply_routes()
+        route = self.route
+        mini, self.mini = self.mini, None
+        if mini is not None:
+            try:
+                mini.shutdown()
+            except Exception as e:
+                logger.info(f"Error closing the lost developer tool: {e}")
+        self._attach(launch_with_retry(self.factory, self.project_path))
+        if route is not None:
+            path, query = route
+            self.set_page(self.app.relaunch("/" + path, query or None))
+
+    def _attach(self, mini):
+        self.mini = mini
+        # 新连接可用：预热实例和重新启动都会结束 DOWN 状态，之后排队的恢复在 reconnect 中直接返回
+        self.health.restored()
+        self.route = None
+        self.screens = ScreenHistory()
+        self.logs.clear()
+        self.forget_page()
+        self.page_stack = []
+        self.pending_routes.clear()
+        self.returned_documents.clear()
+        self.data_snapshots.clear()
+        self.mini.app.enable_log()
+        self.mini.app.add_observer("App.logAdded", self.log_added)
+        self.mini.app.add_observer("onAppRouteDone", self.route_changed)
+        # 连接之前的导航（包括 appLaunch）没有事件，从开发者工具读取初始页面栈
+        self.page_stack = self._query_page_stack()
+        return self.mini
+
+    def require(self):
+        """The Minium instance; with `connect_on_demand`, connects on first use."""
+        if self.mini is None:
+            if not (self.connect_on_demand and self.project_path):
+                raise RuntimeError("No project is open, please call minium_open first")
+            self.open()
+        return self.mini
+
+    @property
+    def app(self):
+        return self.require().app
+
+    def current_page(self):
+        """The tracked current page; only queries the devtools when unknown."""
+        self.apply_routes()
+        page = self.page
+        if page is None:
+            page = self.sync_page()
+        return page
+
+    def sync_page(self):
+        self.page = self.app.get_current_page()
+        return self.page
+
+    def set_page(self, page) -> None:
+        """Record the page returned by a navigation command."""
+        self.apply_routes()
+        if page is not None and getattr(page, "page_id", None) is not None:
+            self.page = page
+            self.route = (normalize(page.path), getattr(page, "query", None))
+        else:
+            self.page = None
+
+    def forget_page(self) -> None:
+        self.page = None
+        self.invalidate()
+
+    def get_page_stack(self) -> list[str]:
+        """The tracked page stack; queries the devtools when it is unknown (empty)."""
+        self.apply_routes()
+        if not self.page_stack:
+            self.page_stack = self._query_page_stack()
+        return [path for _, path in self.page_stack]
+
+    def _query_page_stack(self) -> list[tuple]:
+        return [(page.page_id, "/" + normalize(page.path)) for page in self.app.get_page_stack()]
+
+    def get_element(self, selector: str, cached: bool = True):
+        return self._resolve(selector, cached)[0]
+
+    def _resolve(self, selector: str, cached: bool = True):
+        import minium
+        self.apply_routes()
+        tracked = self.page is not None
+        page = self.current_page()
+        key = (page.page_id, selector)
+        element = self.elements.get(key) if cached else None
+        if element is not None:
+            return element, True
+        try:
+            element = page.get_element(selector)
+        except (minium.MiniAppError, minium.MiniElementNotFoundError):
+            if not tracked:
+                raise
+            # 记录的页面可能已过期，同步后再查找一次
+            page = self.sync_page()
+            key = (page.page_id, selector)
+            element = page.get_element(selector)
+        if len(self.elements) >= MAX_CACHED_ELEMENTS:
+            self.elements.clear()
+        self.elements[key] = element
+        return element, False
+
+    def with_element(self, selector: str, action):
+        """Run `action(element)`, re-resolving the element once if the cached handle is stale."""
+        import minium
+        element, from_cache = self._resolve(selector)
+        if not from_cache:
+            return action(element)
+        try:
+            return action(element)
+        except minium.MiniAppError as e:
+            logger.info(f"Element {selector} may be stale, resolving again: {e}")
+            # 页面可能已经变化，重新同步当前页面
+            self.forget_page()
+            return action(self.get_element(selector, cached=False))
+
+    def get_document(self, refresh: bool = False) -> wxml.Document:
+        """The parsed wxml of the current page.
+
+        Without `refresh`, the document read by the last call is reused while
+        the page and revision are the same and it is younger than `WXML_MAX_AGE`.
+        """
+        page = self.current_page()
+        cached = self.document
+        if (not refresh and cached is not None and cached[0] == page.page_id
+                and cached[1] == self.revision and time.monotonic() - cached[2] < WXML_MAX_AGE):
+            return cached[3]
+        document = wxml.parse(page.wxml)
+        self.document = (page.page_id, self.revision, time.monotonic(), document)
+        return document
+
+    def remember_document(self, page_id, document: wxml.Document):
+        """Remember the document returned for `page_id`; returns the previous one."""
+        return _remember(self.returned_documents, page_id, document)
+
+    def remember_data(self, page_id, path: str, data):
+        """Remember the data returned for `path` on `page_id`; returns the previous value."""
+        return _remember(self.data_snapshots, (page_id, path), data)
+
+    def touch(self) -> None:
+        """Mark the page as possibly modified by a command."""
+        self.revision += 1
+
+    def invalidate(self) -> None:
+        """Forget everything that depends on the current page."""
+        self.elements.clear()
+        self.document = None
+
+    def shutdown(self) -> None:
+        try:
+            self._close()
+        finally:
+            self._release()
+
+    def _close(self) -> None:
+        if self.mini is not None:
+            self.mini.shutdown()
+            self.mini = None
+            self.forget_page()
+            self.page_stack = []
+            self.pending_routes.clear()
+            self.returned_documents.clear()
+            self.data_snapshots.clear()
+
+    def _release(self) -> None:
+        if self.leased is not None:
+            self.warm_pool.release(self.leased)
+            self.leased = None
+
+    def route_changed(self, message):
+        """onAppRouteDone 回调，在 minium 的回调线程中只记录事件"""
+        options = dict(message.args[0])
+        self.pending_routes.append(options)
+        self.emit("route", dict(options))
+
+    def apply_routes(self) -> None:
+        """Apply queued route events: update the page stack, drop caches of a left page."""
+        while self.pending_routes:
+            self._apply_route(self.pending_routes.popleft())
+
+    def _apply_route(self, options: dict) -> None:
+        webview_id = options.get("webviewId")
+        entry = (webview_id, "/" + normalize(options.get("path", "")))
+        ids = [item[0] for item in self.page_stack]
+        match options.get("openType"):
+            case "navigateTo" if webview_id in ids:
+                # 读取初始页面栈时已经包含了这个页面
+                del self.page_stack[ids.index(webview_id) + 1:]
+            case "navigateTo" if self.page_stack:
+                self.page_stack.append(entry)
+            case "redirectTo" if self.page_stack:
+                self.page_stack[-1] = entry
+            case "navigateBack" if webview_id in ids:
+                del self.page_stack[ids.index(webview_id) + 1:]
+            case "navigateTo" | "redirectTo" | "navigateBack":
+                # 无法应用到记录的页面栈，清空后下次读取时重新同步
+                self.page_stack = []
+            case _:
+                # switchTab / reLaunch / appLaunch 会清空页面栈
+                self.page_stack = [entry]
+
+        self.route = (normalize(options.get("path", "")), options.get("query"))
+        page = self.page
+        if page is None or page.page_id != webview_id:
+            self.forget_page()
+
+    def log_added(self, message):
+        """
+        小程序 log 监听回调函数，记录到日志缓冲区
+        :param message: {"type": "log|warn|error", "args": [str, ..., ]}
+        :return:
+        """
+        self.logs.append(message.get("type"), message.get("args"))
+        self.emit("log", dict(message))
+
+    def emit(self, event: str, data: dict) -> None:
+        if self.on_event is not None:
+            try:
+                self.on_event(event, data)
+            except Exception as e:
+                logger.error(f"Error delivering {event} event: {e}")
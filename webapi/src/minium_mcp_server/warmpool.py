@@ -0,0 +1,144 @@
+"""
+Pre-launched developer tool instances.
+
+Launching the devtools and connecting to it takes several seconds. `WarmPool`
+keeps connected instances ready per project and hands one out on `open`.
+The devtools automate a project on one port, so no replacement is launched
+while a session uses the project; the pool is refilled in the background
+once the session releases it. Failed launches are retried with exponential
+backoff.
+"""
+import os
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Any, Callable
+
+logger = logging.getLogger('minium-mcp-server')
+
+# 每个项目预先启动的实例数量，0 表示不预热
+WARM_POOL_SIZE = int(os.environ.get('MINIUM_WARM_POOL_SIZE', 0))
+# 按项目配置的数量，格式为 "项目路径=数量;项目路径=数量"，启动时即开始预热
+WARM_POOL_PROJECTS = os.environ.get('MINIUM_WARM_POOL_PROJECTS', '')
+# 启动失败后的重试次数与首次重试间隔（秒），间隔每次翻倍
+LAUNCH_RETRIES = int(os.environ.get('MINIUM_LAUNCH_RETRIES', 2))
+LAUNCH_BACKOFF = float(os.environ.get('MINIUM_LAUNCH_BACKOFF', 1))
+MAX_BACKOFF = 30
+
+Factory = Callable[[str], Any]
+
+
+def parse_projects(spec: str) -> dict[str, int]:
+    """Parse `path=count;path=count` into a dict."""
+    projects = {}
+    for item in spec.split(";"):
+        path, _, count = item.strip().rpartition("=")
+        if path:
+            projects[path] = int(count)
+    return projects
+
+
+def launch_with_retry(factory: Factory, project_path: str, retries: int = LAUNCH_RETRIES,
+                      backoff: float = LAUNCH_BACKOFF, stop: threading.Event | None = None):
+    """Call `factory(project_path)`, retrying failures with exponential backoff."""
+    stop = stop or threading.Event()
+    delay = backoff
+    for attempt in range(retries + 1):
+        try:
+            return factory(project_path)
+        except Exception as e:
+            if attempt == retries or stop.is_set():
+                raise
+            logger.warning(f"Failed to launch {project_path} (attempt {attempt + 1}), retrying in {delay}s: {e}")
+            if stop.wait(delay):
+                raise
+            delay = min(delay * 2, MAX_BACKOFF)
+
+
+def close_instance(instance) -> None:
+    try:
+        instance.shutdown()
+    except Exception as e:
+        logger.error(f"Error closing a warm instance: {e}")
+
+
+class WarmPool:
+    """Ready developer tool instances per project, refilled in the background."""
+
+    def __init__(self, factory: Factory, size: int = WARM_POOL_SIZE, projects: dict[str, int] | None = None,
+                 retries: int = LAUNCH_RETRIES, backoff: float = LAUNCH_BACKOFF):
+        self.factory = factory
+        self.size = size
+        self.sizes = parse_projects(WARM_POOL_PROJECTS) if projects is None else dict(projects)
+        self.retries = retries
+        self.backoff = backoff
+        self._ready: dict[str, deque] = defaultdict(deque)
+        self._launching: dict[str, int] = defaultdict(int)
+        # 正在被会话使用的项目，使用期间不启动新实例，避免占用同一个自动化端口
+        self._in_use: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        for project_path in self.sizes:
+            self._fill(project_path)
+
+    def target(self, project_path: str) -> int:
+        return self.sizes.get(project_path, self.size)
+
+    def launch(self, project_path: str):
+        """Launch an instance now, with retries."""
+        return launch_with_retry(self.factory, project_path, self.retries, self.backoff, self._stop)
+
+    def acquire(self, project_path: str):
+        """Take a ready instance of `project_path`, or None, and mark the project as in use.
+
+        Every call must be paired with `release` when the session stops using
+        the project, whether or not an instance was returned.
+        """
+        with self._lock:
+            self._in_use[project_path] += 1
+            ready = self._ready.get(project_path)
+            return ready.popleft() if ready else None
+
+    def release(self, project_path: str) -> None:
+        """The session acquired for `project_path` closed its instance; refill the pool."""
+        with self._lock:
+            self._in_use[project_path] = max(self._in_use[project_path] - 1, 0)
+        self._fill(project_path)
+
+    def ready(self) -> dict[str, int]:
+        with self._lock:
+            return {project_path: len(ready) for project_path, ready in self._ready.items() if ready}
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._lock:
+            instances = [instance for ready in self._ready.values() for instance in ready]
+            self._ready.clear()
+        for instance in instances:
+            close_instance(instance)
+
+    def _fill(self, project_path: str) -> None:
+        with self._lock:
+            if self._stop.is_set() or self._in_use[project_path]:
+                return
+            missing = self.target(project_path) - len(self._ready[project_path]) - self._launching[project_path]
+            if missing <= 0:
+                return
+            self._launching[project_path] += missing
+        for _ in range(missing):
+            threading.Thread(target=self._launch, args=(project_path,), name="minium-warm-pool", daemon=True).start()
+
+    def _launch(self, project_path: str) -> None:
+        try:
+            instance = self.launch(project_path)
+        except Exception as e:
+            logger.error(f"Failed to pre-launch {project_path}: {e}")
+            instance = None
+        with self._lock:
+            self._launching[project_path] -= 1
+            if instance is not None and not self._stop.is_set():
+                self._ready[project_path].append(instance)
+                logger.info(f"Warm instance ready for {project_path}")
+                return
+        if instance is not None:
+            close_instance(instance)
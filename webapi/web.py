@@ -1,363 +1,61 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import json
-import os
-import sys
-import minium
-import base64
+import atexit
+
+from minium_mcp_server.metrics import METRICS, label
+from minium_mcp_server.pool import SessionPool
+from minium_mcp_server.session import launch
+from minium_mcp_server.warmpool import WarmPool
 
 app = Flask(__name__)
 print("Starting Minium MCP Web Server")
 
-mini = None
-project_path = ''
 HOST = '0.0.0.0'
 PORT = 9188
-
-def mini_log_added(message):
-    """
-    小程序 log 监听回调函数
-    将小程序的 log 格式化然后保存起来
-    :param message: {"type": "log|warn|error", "args": [str, ..., ]}
-    :return:
-    """
-    print({message})
+# 每个会话对应一个开发者工具实例；同一会话的命令串行执行，不同会话可以并行
+pool = SessionPool(warm_pool=WarmPool(launch))
+atexit.register(pool.close_all)
 
 @app.route('/api/command', methods=['POST'])
 def handle_command():
-    global mini, project_path
-    try:
-        command = request.json
-        arguments = command['arguments']
-
-        print(f"COMMAND: {json.dumps(command)}")
-        
-        match command['name']:
-            case "open":
-                if sys.platform == 'darwin':  # macOS
-                    dev_tool_path = '/Applications/wechatwebdevtools.app/Contents/MacOS/cli'
-                elif sys.platform == 'win32':  # Windows
-                    dev_tool_path = 'C:/Program Files (x86)/Tencent/微信web开发者工具/cli.bat'
-                else:
-                    raise Exception("Unsupported operating system")
-
-                project_path = arguments['path']
-                try:
-                    mini = minium.Minium({
-                        "project_path": project_path,
-                        "dev_tool_path": dev_tool_path,
-                        "debug_mode": "error"
-                    })
-                    mini.app.enable_log()
-                    mini.app.add_observer("App.logAdded", mini_log_added)
-                except Exception as e:
-                    # 重试
-                    return jsonify({
-                        "status": "error",
-                        "message": str(e)
-                    })
-
-                return jsonify({
-                    "status": "success",
-                    "message": "Opened"
-                })
-
-            case "get_system_info":
-                return jsonify({
-                    "status": "success",
-                    "message": mini.get_system_info()
-                })
-
-            case "shutdown":
-                mini.shutdown()
-                return jsonify({
-                    "status": "success", 
-                    "message": "Closed"
-                })
-
-            case "screen_shot":
-                output_path = os.path.join(project_path, "screenshots/{}_screen_shot.png".format(mini.app.get_current_page().page_id))
-                if not os.path.isdir(os.path.dirname(output_path)):
-                    os.makedirs(os.path.dirname(output_path))
-                if os.path.isfile(output_path):
-                    os.remove(output_path)
-                mini.app.screen_shot(output_path)
-                # 获取截图
-                with open(output_path, "rb") as f:
-                    image = f.read()
-                    # 返回base64编码的图片
-                    image_base64 = base64.b64encode(image).decode('utf-8')
-                # 删除截图
-                os.remove(output_path)
-                return jsonify({
-                    "status": "success",
-                    "type": "image",
-                    "data": image_base64
-                })
-            
-            case "get_all_pages_path_and_method":
-                all_pages_path = mini.app.get_all_pages_path()
-                with open(os.path.join(project_path, "app.json"), "r", encoding="utf-8") as file:  # 建议指定 encoding
-                    app = json.load(file)  # 解析 JSON 文件 → Python 字典/列表
-                    tabbar = app.get('tabBar').get('list')
-                
-                result = []
-                for path in all_pages_path:
-                    if path in [item.get('pagePath') for item in tabbar]:
-                        result.append({
-                            "path": f"/{path}",
-                            "method": "minium_switch_tab"
-                        })
-                    else:
-                        result.append({
-                            "path": f"/{path}",
-                            "method": "minium_navigate_to"
-                        })
-                return jsonify({
-                    "status": "success",
-                    "message": f"```json\n{json.dumps(result, indent=4, ensure_ascii=False)}```"
-                })
-            
-            case "get_navigate_method_of_page":
-                with open(os.path.join(project_path, "app.json"), "r", encoding="utf-8") as file:  # 建议指定 encoding
-                    app = json.load(file)  # 解析 JSON 文件 → Python 字典/列表
-                    tabbar = app.get('tabBar').get('list')
-                    if arguments["path"] in [item.get('pagePath') for item in tabbar]:
-                        return jsonify({
-                            "status": "success",
-                            "message": "minium_switch_tab"
-                        })
-                    else:
-                        return jsonify({    
-                            "status": "success",
-                            "message": "minium_navigate_to"
-                        })
-
-            case "go_home":
-                page = mini.app.go_home()
-                if page is None:
-                    return jsonify({
-                        "status": "success",
-                        "message": "Successfully enter the home page"
-                    })
-                else:
-                    return jsonify({
-                        "status": "error",
-                        "message": "Failed to enter the home page"
-                    })
-
-            case "navigate_to":
-                # 如果arguments中没有params，则默认为空字符串
-                if arguments.get("params") is None:
-                    arguments["params"] = {}
-                page = mini.app.navigate_to(arguments["path"], arguments["params"])
-                if page is None:
-                    return jsonify({
-                        "status": "success",
-                        "message": f"Successfully enter the {arguments['path']} page"
-                    })
-                else:
-                    return jsonify({
-                        "status": "error",
-                        "message": f"Failed to enter the {arguments['path']} page"
-                    })
-
-            case "navigate_back":
-                page = mini.app.navigate_back()
-                if page is None:
-                    return jsonify({
-                        "status": "success",
-                        "message": "Successful return to the previous page"
-                    })
-                else:
-                    return jsonify({
-                        "status": "error",
-                        "message": f"Failed to return to the previous page"
-                    })
-
-            case "switch_tab":
-                page = mini.app.switch_tab(arguments["path"])
-                if page is None:
-                    return jsonify({
-                        "status": "success",
-                        "message": "Successfully switch tab"
-                    })
-                else:
-                    return jsonify({
-                        "status": "error",
-                        "message": "Failed to switch tab"
-                    })
-
-            case "redirect_to":
-                if arguments.get("params") is None:
-                    arguments["params"] = {}
-                page = mini.app.redirect_to(arguments["path"], arguments["params"])
-                if page is None:
-                    return jsonify({
-                        "status": "success",
-                        "message": "Successfully redirect to"
-                    })
-                else:
-                    return jsonify({
-                        "status": "error",
-                        "message": "Failed to redirect to"
-                    })
-
-            # case "evaluate":
-            #     msg_id = mini.app.evaluate(arguments["code"], arguments["params"], sync=False)
-            #     result = mini.app.get_async_response(msg_id, 5)
-            #     return jsonify({
-            #         "status": "success",
-            #         "message": f"Evaluate, Result: {result}"
-            #     })
-
-            case "call_method":
-                if arguments.get("params") is None:
-                    arguments["params"] = {}
-                page = mini.app.get_current_page()
-                result = page.call_method(arguments["method"], arguments["params"])
-                return jsonify({
-                    "status": "success",
-                    "message": f"Call method, Result: {result}"
-                })
-
-            case "page_scroll_to":
-                page = mini.app.get_current_page()
-                page.scroll_to(arguments["top"], arguments["duration"])
-                return jsonify({
-                    "status": "success",
-                    "message": f"Page scroll to, Top: {arguments['top']}, Duration: {arguments['duration']}"
-                })
-
-            case "page_get_wxml":
-                page = mini.app.get_current_page()
-                wxml = page.wxml
-                # 分离wxml和css
-                # 查询最后一个tag的位置
-                last_tag_index = wxml.rfind("</")
-                # 分割wxml和css
-                wxml_content = wxml[:last_tag_index]
-                css_content = wxml[last_tag_index:]
-                first_tag_index = css_content.find(">")
-                wxml_content += css_content[:first_tag_index+1]
-                css_content = css_content[first_tag_index+1:]
-                
-                # 格式化输出
-
-                return jsonify({
-                    "status": "success",
-                    "message": f"```xml\n{wxml_content}```"
-                })
-
-            case "page_get_css":
-                page = mini.app.get_current_page()
-                wxml = page.wxml
-                # 分离wxml和css
-                # 查询最后一个tag的位置
-                last_tag_index = wxml.rfind("</")
-                # 分割wxml和css
-                wxml_content = wxml[:last_tag_index]
-                css_content = wxml[last_tag_index:]
-                first_tag_index = css_content.find(">")
-                wxml_content += css_content[:first_tag_index+1]
-                css_content = css_content[first_tag_index+1:]
-                
-                # 格式化输出
-
-                return jsonify({
-                    "status": "success",
-                    "message": f"```css\n{css_content}```"
-                })
-            
-            case "page_get_data":
-                page = mini.app.get_current_page()
-                return jsonify({
-                    "status": "success",
-                    "message": f"```json\n{page.data}```"
-                })
-            
-            case "page_set_data":
-                page = mini.app.get_current_page()
-                data = page.data
-                data[arguments['key']] = json.load(arguments['value'])
-                return jsonify({
-                    "status": "success",
-                    "message": f"```json\n{page.data}```"
-                })
-
-            case "tap":
-                page = mini.app.get_current_page()
-                el = page.get_element(arguments["selector"])
-                el.tap()
-                return jsonify({
-                    "status": "success",
-                    "message": "Tapped"
-                })
-
-            case "long_press":
-                page = mini.app.get_current_page()
-                el = page.get_element(arguments["selector"])
-                el.long_press()
-                return jsonify({
-                    "status": "success",
-                    "message": "Long pressed"
-                })
-
-            case "move":
-                page = mini.app.get_current_page()
-                el = page.get_element(arguments["selector"])
-                el.move(arguments["left"], arguments["top"])
-                return jsonify({
-                    "status": "success",
-                    "message": f"Moved to, Top: {arguments['top']}, Left: {arguments['left']}"
-                })
-
-            case "input":
-                page = mini.app.get_current_page()
-                el = page.get_element(arguments["selector"])
-                el.input(arguments["text"])
-                return jsonify({
-                    "status": "success",
-                    "message": f"Input, Text: {arguments['text']}"
-                })
-
-            case "switch":
-                page = mini.app.get_current_page()
-                el = page.get_element(arguments["selector"])
-                el.switch()
-                return jsonify({
-                    "status": "success",
-                    "message": "Switched"
-                })
-
-            case "slide_to":
-                page = mini.app.get_current_page()
-                el = page.get_element(arguments["selector"])
-                el.slide_to(arguments["value"])
-                return jsonify({
-                    "status": "success",
-                    "message": f"Slided to, Value: {arguments['value']}"
-                })
-
-            case "pick":
-                page = mini.app.get_current_page()
-                el = page.get_element(arguments["selector"])
-                el.pick(arguments["option"])
-                return jsonify({
-                    "status": "success",
-                    "message": f"Picked, Option: {arguments['option']}"
-                })
-
-            case _:
-                return jsonify({
-                    "status": "error",
-                    "message": f"Unknown command: {command['name']}"
-                })
-
-    except Exception as e:
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        })
+    command = request.json
+    return respond(command.get('name'), run_command(command))
+
+@app.route('/api/batch', methods=['POST'])
+def handle_batch():
+    # 整个批次只获取一次会话锁，中间不会插入其他请求的命令
+    return respond("batch", run_command({
+        "name": "batch",
+        "arguments": request.json,
+        "session": request.args.get("session"),
+    }))
+
+@app.route('/api/cancel', methods=['POST'])
+def handle_cancel():
+    # 停止等待该请求；已在执行的命令在后台结束后释放会话锁
+    request_id = request.json.get('request_id')
+    return jsonify({"status": "success", "cancelled": bool(request_id) and pool.cancel(request_id)})
+
+@app.route('/metrics', methods=['GET'])
+def handle_metrics():
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/api/sessions', methods=['GET'])
+def handle_sessions():
+    pool.evict_idle()
+    return jsonify({"status": "success", "sessions": pool.sessions(), "warm": pool.warm_pool.ready()})
+
+def respond(name, result):
+    name = label(name)
+    METRICS.observe_size(name, "request", request.content_length or 0)
+    with METRICS.phase(name, "serialize"):
+        response = jsonify(result)
+    METRICS.observe_size(name, "response", response.content_length or 0)
+    return response
+
+def run_command(command):
+    print(f"COMMAND: {json.dumps(command)}")
+    return pool.run(command)
 
 if __name__ == "__main__":
-    app.run(host=HOST, port=PORT)
+    app.run(host=HOST, port=PORT, threaded=True)